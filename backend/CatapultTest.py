@@ -1,10 +1,24 @@
-import subprocess
 import asyncio
 import os
-from pyppeteer import connect
+import platform
 
-# Waits up to 10 minutes for a tab matching a keyword
-async def wait_for_tab(browser, keyword, timeout=600, interval=2):
+from chrome_launcher import ChromeSupervisor
+from page_profiler import PageProfiler
+from tracing import instant, span, traced, tracer
+
+# Waits up to 10 minutes for a tab matching a keyword.
+# mode="events" resolves as soon as Chrome reports a matching target URL,
+# mode="poll" re-enumerates browser.pages() every `interval` seconds.
+async def wait_for_tab(browser, keyword, timeout=600, interval=2, mode="events"):
+    with span('tab.discover', mode=mode, keyword=keyword) as discover:
+        if mode == "events":
+            page = await wait_for_tab_events(browser, keyword, timeout, interval)
+        else:
+            page = await wait_for_tab_poll(browser, keyword, timeout, interval)
+        discover.set(found=page is not None)
+        return page
+
+async def wait_for_tab_poll(browser, keyword, timeout=600, interval=2):
     elapsed = 0
     while elapsed < timeout:
         pages = await browser.pages()
@@ -14,35 +28,87 @@ async def wait_for_tab(browser, keyword, timeout=600, interval=2):
         await asyncio.sleep(interval)
         elapsed += interval
         print(f"⏳ Still waiting... {elapsed}/{timeout} seconds")
+        instant('tab.still_waiting', elapsed=elapsed)
     return None
 
+async def wait_for_tab_events(browser, keyword, timeout=600, interval=2):
+    """Wait for a matching tab using Target.targetCreated/targetInfoChanged events"""
+    keyword = keyword.lower()
+    loop = asyncio.get_event_loop()
+    found = loop.create_future()
+
+    def check_target(target):
+        if not found.done() and target.type == 'page' and keyword in target.url.lower():
+            found.set_result(target)
+
+    # pyppeteer already has target discovery enabled, so these fire for every
+    # new tab and every URL change without any extra CDP traffic from us
+    browser.on('targetcreated', check_target)
+    browser.on('targetchanged', check_target)
+    try:
+        # The tab may already be open before we start listening
+        for target in browser.targets():
+            check_target(target)
+
+        start = loop.time()
+        elapsed = 0
+        while not found.done() and elapsed < timeout:
+            await asyncio.wait([found], timeout=min(interval, timeout - elapsed))
+            elapsed = loop.time() - start
+            if not found.done():
+                print(f"⏳ Still waiting... {int(elapsed)}/{timeout} seconds")
+                instant('tab.still_waiting', elapsed=int(elapsed))
+    finally:
+        browser.remove_listener('targetcreated', check_target)
+        browser.remove_listener('targetchanged', check_target)
+
+    if not found.done():
+        return None
+    # Only the matching target gets attached to
+    with span('tab.attach'):
+        return await found.result().page()
+
+async def open_brightspace(progress=print, timeout=600, profiler=None):
+    """Launch or reuse Chrome and wait for the logged-in Brightspace tab"""
+    progress("📤 Launching Chrome...")
+    supervisor = ChromeSupervisor(
+        start_url='https://purdue.brightspace.com/d2l/login',
+        headless=os.environ.get('BRIGHTSPACE_HEADLESS') == '1',
+        # BRIGHTSPACE_CDP_RECORD=session.cdp.gz captures a run for offline replay;
+        # BRIGHTSPACE_CDP_REPLAY=session.cdp.gz plays one back without Chrome
+        record_path=os.environ.get('BRIGHTSPACE_CDP_RECORD'),
+        replay_path=os.environ.get('BRIGHTSPACE_CDP_REPLAY'),
+        replay_speed=float(os.environ.get('BRIGHTSPACE_CDP_REPLAY_SPEED', '1')),
+    )
+
+    progress("🔌 Connecting to Chrome...")
+    with span('chrome.connect') as connecting:
+        browser = await supervisor.connect()
+        connecting.set(reused=supervisor.reused)
+    if supervisor.replay_path:
+        source = "replaying recorded session"
+    else:
+        source = "reused running instance" if supervisor.reused else "launched new instance"
+    progress(f"⚡ Connected in {supervisor.metrics['time_to_connected']:.2f}s ({source})")
+
+    if platform.system() == 'Darwin' and not supervisor.headless and not supervisor.replay_path:
+        # Immediately force the Chrome window to reset its size and position via AppleScript.
+        # Adjust the numbers as needed for your display.
+        # This command sets the front window's bounds to: left=0, top=22, right=1440, bottom=900.
+        with span('chrome.position_window'):
+            os.system('osascript -e \'tell application "Google Chrome" to set bounds of front window to {0, 22, 1440, 900}\'')
+            await asyncio.sleep(2)  # Allow time for the window to update
+
+    progress("⏳ Waiting for Brightspace tab to appear...")
+    target_page = await wait_for_tab(browser, "brightspace.com/d2l/home", timeout=timeout)
+    if profiler is not None and target_page is not None:
+        sample = await profiler.measure(target_page)
+        progress(f"📈 Home page: {sample['load_ms'] or 0:.0f} ms load, {sample['script_ms']:.0f} ms script")
+    return supervisor, target_page
+
+@traced('main')
 async def main():
-    print("📤 Launching Chrome via subprocess...")
-    subprocess.Popen([
-        '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-        '--remote-debugging-port=9222',
-        '--user-data-dir=/tmp/chrome-debug',
-        '--no-first-run',
-        '--no-default-browser-check',
-        '--new-window',
-        '--start-maximized',
-        '--disable-backgrounding-occluded-windows',
-        'https://purdue.brightspace.com/d2l/login'
-    ])
-
-    await asyncio.sleep(5)
-
-    print("🔌 Connecting to Chrome...")
-    browser = await connect(browserURL='http://localhost:9222')
-
-    # Immediately force the Chrome window to reset its size and position via AppleScript.
-    # Adjust the numbers as needed for your display.
-    # This command sets the front window's bounds to: left=0, top=22, right=1440, bottom=900.
-    os.system('osascript -e \'tell application "Google Chrome" to set bounds of front window to {0, 22, 1440, 900}\'')
-    await asyncio.sleep(2)  # Allow time for the window to update
-
-    print("⏳ Waiting for Brightspace tab to appear...")
-    target_page = await wait_for_tab(browser, "brightspace.com/d2l/home")
+    supervisor, target_page = await open_brightspace(profiler=PageProfiler.from_env())
 
     if target_page:
         print("✅ Brightspace tab found!")
@@ -50,12 +116,17 @@ async def main():
         # Trigger a CDP repaint command (optional)
         await target_page._client.send("Emulation.clearDeviceMetricsOverride")
         # Test interaction
-        await target_page.evaluate('''() => {
-            alert("Automation script connected!");
-        }''')
+        with span('page.evaluate'):
+            await target_page.evaluate('''() => {
+                alert("Automation script connected!");
+            }''')
     else:
         print("❌ Could not find Brightspace tab within 10 minutes.")
 
-    await browser.disconnect()
+    await supervisor.stop()
+    if tracer.enabled:
+        for name, (total_ms, count) in tracer.summary():
+            print(f"  {name:<24} {total_ms:9.1f} ms  x{count}")
 
-asyncio.get_event_loop().run_until_complete(main())
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from pyppeteer import connect
+
+from fake_cdp import FakeCDPServer
+from standin_server import StandInServer
+from tab_crawler import TabCrawler
+
+# Crawl throughput against tab-pool size. The fake CDP endpoint loads each
+# navigated URL from a local stand-in site with a fixed per-page latency, so
+# the only thing that changes between runs is how many tabs load at once.
+# Usage: python bench_crawl.py [pages] [latency_ms]
+async def run(concurrency, urls, server, cdp, recycle_after=10):
+    browser = await connect(browserWSEndpoint=cdp.ws_endpoint)
+    await asyncio.sleep(0.1)
+    crawler = TabCrawler(browser, concurrency=concurrency, recycle_after=recycle_after)
+    results = await crawler.crawl(urls)
+    failed = [result for result in results if not result.ok]
+    stats = (crawler.pages_per_second(len(urls)), crawler.pool.opened, crawler.pool.recycled, len(failed))
+    await crawler.close()
+    await browser.disconnect()
+    return stats, failed
+
+async def main(pages=48, latency_ms=100):
+    server = StandInServer(latency=latency_ms / 1000).start()
+    for i in range(pages):
+        server.add_bytes(f"/d2l/home/{i}", f"<title>Course {i}</title>".encode())
+    urls = [f"{server.base_url}/d2l/home/{i}" for i in range(pages)]
+
+    executor = ThreadPoolExecutor(max_workers=32)
+
+    async def load(url):
+        def fetch():
+            with urllib.request.urlopen(url) as response:
+                return response.read()
+        await asyncio.get_event_loop().run_in_executor(executor, fetch)
+
+    cdp = await FakeCDPServer().start()
+    cdp.loader = load
+
+    print(f"📊 Crawling {pages} pages, {latency_ms} ms per page load")
+    baseline = None
+    for concurrency in (1, 2, 4, 8, 16):
+        (rate, opened, recycled, failures), failed = await run(concurrency, urls, server, cdp)
+        baseline = baseline or rate
+        print(f"  {concurrency:>2} tabs: {rate:6.1f} pages/s ({rate / baseline:4.1f}x), "
+              f"{opened} tabs opened, {recycled} recycled, {failures} failed")
+        for result in failed[:3]:
+            print(f"     ❌ {result.url}: {result.error}")
+
+    await cdp.stop()
+    server.stop()
+    executor.shutdown()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.get_event_loop().run_until_complete(main(*args))
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import time
+import urllib.request
+
+from chrome_launcher import ChromeSupervisor, find_chrome
+from http_fetcher import BrightspaceFetcher
+from standin_server import StandInServer
+
+# Compares direct pooled fetching with per-request connections and with page.goto
+# against a local stand-in for Brightspace.
+# Usage: python bench_fetch.py [requests] [latency_ms]
+def build_site(server, count):
+    asset = b"x" * 50000
+    for i in range(count):
+        server.add_json(f'/d2l/api/le/1.74/{i}/news/', [{'Id': n, 'Title': f"Announcement {n}"} for n in range(20)])
+        assets = ''.join(f'<img src="/assets/{i}-{n}.png">' for n in range(8))
+        server.add_bytes(f'/d2l/home/{i}', f"<html><body><h1>Course {i}</h1>{assets}</body></html>".encode())
+        for n in range(8):
+            server.add_bytes(f'/assets/{i}-{n}.png', asset, content_type='image/png')
+
+def naive_fetch(server, paths):
+    for path in paths:
+        with urllib.request.urlopen(server.base_url + path) as response:
+            response.read()
+
+async def pooled_fetch(server, paths, concurrency):
+    fetcher = BrightspaceFetcher(server.base_url, [{'name': 'd2lSessionVal', 'value': 'bench', 'domain': server.host, 'path': '/'}],
+                                 max_concurrency=concurrency)
+    responses = await fetcher.get_many(paths)
+    fetcher.close()
+    assert all(r.ok for r in responses)
+
+async def goto_fetch(server, count):
+    supervisor = ChromeSupervisor(port=9333, user_data_dir='/tmp/chrome-bench', headless=True)
+    browser = await supervisor.connect()
+    page = await browser.newPage()
+    start = time.perf_counter()
+    for i in range(count):
+        await page.goto(f"{server.base_url}/d2l/home/{i}")
+    elapsed = time.perf_counter() - start
+    await supervisor.stop(kill=True)
+    return elapsed
+
+async def main(count=50, latency_ms=20):
+    server = StandInServer(latency=latency_ms / 1000).start()
+    build_site(server, count)
+    paths = [f'/d2l/api/le/1.74/{i}/news/' for i in range(count)]
+    results = []
+
+    def record(name, elapsed):
+        results.append((name, elapsed, server.request_count, server.connection_count))
+        server.reset_counters()
+
+    server.reset_counters()
+    start = time.perf_counter()
+    naive_fetch(server, paths)
+    record("urllib, new connection each", time.perf_counter() - start)
+
+    for concurrency in (1, 8):
+        start = time.perf_counter()
+        await pooled_fetch(server, paths, concurrency)
+        record(f"pooled fetcher, concurrency {concurrency}", time.perf_counter() - start)
+
+    if find_chrome():
+        record("page.goto in headless Chrome", await goto_fetch(server, count))
+    else:
+        print("⚠️ No Chrome binary found, skipping the page.goto comparison")
+    server.stop()
+
+    print(f"\n📊 {count} lookups, {latency_ms} ms simulated latency")
+    for name, elapsed, requests, connections in results:
+        print(f"  {name:>34}: {elapsed * 1000:8.1f} ms total, {elapsed * 1000 / count:6.1f} ms/lookup, "
+              f"{requests:4d} requests, {connections:3d} connections")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.get_event_loop().run_until_complete(main(*args))
@@ -0,0 +1,65 @@
+import asyncio
+import random
+import statistics
+import sys
+
+from pyppeteer import connect
+
+from CatapultTest import wait_for_tab
+from fake_cdp import FakeCDPServer
+
+LOGIN_URL = "https://purdue.brightspace.com/d2l/login"
+HOME_URL = "https://purdue.brightspace.com/d2l/home"
+
+# Compares polling vs event-driven tab discovery against a local fake CDP endpoint.
+# Usage: python bench_tab_discovery.py [trials] [extra_tabs]
+async def run_trial(mode, extra_tabs):
+    server = await FakeCDPServer().start()
+    login_tab = await server.open_page(LOGIN_URL)
+    for i in range(extra_tabs):
+        await server.open_page(f"https://example.com/tab{i}")
+
+    browser = await connect(browserWSEndpoint=server.ws_endpoint)
+    await asyncio.sleep(0.1)  # let the initial targetCreated events settle
+    server.reset_counters()
+
+    loop = asyncio.get_event_loop()
+    waiter = loop.create_task(wait_for_tab(browser, "brightspace.com/d2l/home", timeout=30, mode=mode))
+
+    # The login redirect lands at a random point relative to the poll interval
+    await asyncio.sleep(random.uniform(0.5, 3.0))
+    landed_at = loop.time()
+    await server.navigate(login_tab, HOME_URL)
+    page = await waiter
+    latency = loop.time() - landed_at
+    messages = server.message_count
+
+    await browser.disconnect()
+    await server.stop()
+    return page is not None, latency, messages
+
+async def main(trials=5, extra_tabs=5):
+    results = {}
+    for mode in ("poll", "events"):
+        latencies = []
+        messages = []
+        for _ in range(trials):
+            found, latency, count = await run_trial(mode, extra_tabs)
+            if not found:
+                print(f"❌ {mode}: tab was not found")
+                continue
+            latencies.append(latency * 1000)
+            messages.append(count)
+        results[mode] = (latencies, messages)
+
+    print(f"\n📊 Tab discovery ({trials} trials, {extra_tabs + 1} open tabs)")
+    for mode, (latencies, messages) in results.items():
+        if not latencies:
+            continue
+        print(f"  {mode:>6}: latency mean {statistics.mean(latencies):8.1f} ms, "
+              f"max {max(latencies):8.1f} ms, CDP messages mean {statistics.mean(messages):6.1f}")
+    return results
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.get_event_loop().run_until_complete(main(*args))
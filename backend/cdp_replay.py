@@ -0,0 +1,254 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict
+
+import websockets
+
+FORMAT_VERSION = 1
+
+def load_recording(path):
+    """Return (header, [(t, direction, message dict)]) from a .cdp.gz file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        messages = [(t, direction, json.loads(raw)) for t, direction, raw in map(json.loads, f)]
+    return header, messages
+
+def inner_message(message):
+    """The page-session message wrapped in Target.sendMessageToTarget/receivedMessageFromTarget"""
+    params = message.get('params') or {}
+    if message.get('method') in ('Target.sendMessageToTarget', 'Target.receivedMessageFromTarget'):
+        return params.get('sessionId'), json.loads(params['message'])
+    return None, None
+
+def request_key(message):
+    """What identifies a client request independently of its message id"""
+    session_id, inner = inner_message(message)
+    if inner is not None:
+        return session_id, inner.get('method'), json.dumps(inner.get('params'), sort_keys=True)
+    return message.get('sessionId'), message.get('method'), json.dumps(message.get('params'), sort_keys=True)
+
+class CDPRecorder:
+    """WebSocket proxy between pyppeteer and Chrome that records every message.
+
+    Point pyppeteer.connect(browserWSEndpoint=recorder.ws_endpoint) at it;
+    messages are forwarded unchanged and written, with their arrival time, to
+    a gzip'd JSON-lines file when the recorder stops.
+    """
+
+    def __init__(self, upstream, path, host='127.0.0.1', port=0):
+        self.upstream = upstream
+        self.path = path
+        self.host = host
+        self.port = port
+        self.messages = []
+        self._server = None
+        self._start = None
+
+    @property
+    def ws_endpoint(self):
+        return f"ws://{self.host}:{self.port}/devtools/browser/recorder"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def _log(self, direction, raw):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        self.messages.append((round(now - self._start, 6), direction, raw))
+
+    async def _handler(self, client, path=None):
+        async with websockets.connect(self.upstream, max_size=None) as upstream:
+            async def pump(source, target, direction):
+                try:
+                    async for raw in source:
+                        self._log(direction, raw)
+                        await target.send(raw)
+                except websockets.ConnectionClosed:
+                    pass
+
+            tasks = [asyncio.ensure_future(pump(client, upstream, 'c')),
+                     asyncio.ensure_future(pump(upstream, client, 's'))]
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                task.cancel()
+
+    def save(self):
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'version': FORMAT_VERSION, 'upstream': self.upstream, 'recorded_at': time.time(),
+                                'messages': len(self.messages)}) + '\n')
+            for entry in self.messages:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        return self.path
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        return self.save()
+
+class ReplayServer:
+    """Serves a recorded CDP session back to pyppeteer on a local WebSocket.
+
+    Each incoming request is matched to a recorded one with the same method,
+    session and params (falling back to the same method), and the recorded
+    responses and events are sent back with message ids rewritten. A server
+    message is released once the client request before it in the recording
+    has arrived; at speed=1 it is also delayed by the recorded gap after that
+    request, at speed=0 it is sent as fast as possible.
+    """
+
+    def __init__(self, path, speed=1.0, host='127.0.0.1', port=0, stall_timeout=2.0):
+        self.header, self.recording = load_recording(path)
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.stall_timeout = stall_timeout
+        self.unmatched = 0
+        self.skipped = 0
+        self._server = None
+
+    @property
+    def ws_endpoint(self):
+        return f"ws://{self.host}:{self.port}/devtools/browser/replay"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handler(self, ws, path=None):
+        loop = asyncio.get_event_loop()
+        pending = defaultdict(list)  # request key -> recorded client indexes
+        by_method = defaultdict(list)
+        for index, (_, direction, message) in enumerate(self.recording):
+            if direction == 'c':
+                key = request_key(message)
+                pending[key].append(index)
+                by_method[key[:2]].append(index)
+        matched = {}  # recorded client index -> loop time it arrived
+        outer_ids = {}  # recorded id -> live id
+        inner_ids = {}  # (session id, recorded inner id) -> live inner id
+        arrived = asyncio.Event()
+
+        def match(message):
+            key = request_key(message)
+            candidates = [i for i in pending.get(key, []) if i not in matched] or \
+                         [i for i in by_method.get(key[:2], []) if i not in matched]
+            if not candidates:
+                return None
+            index = candidates[0]
+            recorded = self.recording[index][2]
+            outer_ids[recorded['id']] = message['id']
+            session_id, inner = inner_message(recorded)
+            if inner is not None:
+                inner_ids[(session_id, inner['id'])] = inner_message(message)[1]['id']
+            matched[index] = loop.time()
+            return index
+
+        def rewrite(message):
+            if 'id' in message:
+                message = dict(message, id=outer_ids.get(message['id'], message['id']))
+            session_id, inner = inner_message(message)
+            if inner is not None and 'id' in inner:
+                inner['id'] = inner_ids.get((session_id, inner['id']), inner['id'])
+                message = dict(message, params=dict(message['params'], message=json.dumps(inner)))
+            return message
+
+        async def emit():
+            last_client = None
+            for index, (t, direction, message) in enumerate(self.recording):
+                if direction == 'c':
+                    last_client = index
+                    continue
+                if last_client is not None:
+                    # Wait for the request this message answers or follows
+                    deadline = loop.time() + self.stall_timeout
+                    while last_client not in matched and loop.time() < deadline:
+                        arrived.clear()
+                        try:
+                            await asyncio.wait_for(arrived.wait(), deadline - loop.time())
+                        except asyncio.TimeoutError:
+                            break
+                    if last_client not in matched:
+                        self.skipped += 1
+                        continue
+                    if self.speed:
+                        gap = (t - self.recording[last_client][0]) / self.speed
+                        delay = matched[last_client] + gap - loop.time()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                try:
+                    await ws.send(json.dumps(rewrite(message)))
+                except websockets.ConnectionClosed:
+                    return
+
+        emitter = asyncio.ensure_future(emit())
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if match(message) is None:
+                    # Not in the recording: answer with an empty result so the client moves on
+                    self.unmatched += 1
+                    await ws.send(json.dumps({'id': message['id'], 'result': {}}))
+                arrived.set()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            emitter.cancel()
+
+# Records a session against FakeCDPServer, then replays it at recorded speed
+# and as fast as possible with the same client code.
+# Usage: python cdp_replay.py [pages] [latency_ms]
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    from pyppeteer import connect
+
+    from fake_cdp import FakeCDPServer
+    from tab_crawler import TabCrawler
+
+    async def crawl(ws_endpoint, urls):
+        browser = await connect(browserWSEndpoint=ws_endpoint)
+        start = time.perf_counter()
+        crawler = TabCrawler(browser, concurrency=1)
+        results = await crawler.crawl(urls)
+        await crawler.close()
+        elapsed = time.perf_counter() - start
+        await browser.disconnect()
+        return elapsed, [result.ok for result in results]
+
+    async def main(pages=10, latency_ms=100):
+        urls = [f"https://purdue.brightspace.com/d2l/home/{i}" for i in range(pages)]
+        cdp = await FakeCDPServer().start()
+        await cdp.open_page('about:blank')
+        cdp.loader = lambda url: asyncio.sleep(latency_ms / 1000)
+
+        path = os.path.join(tempfile.mkdtemp(), 'session.cdp.gz')
+        recorder = await CDPRecorder(cdp.ws_endpoint, path).start()
+        live, live_ok = await crawl(recorder.ws_endpoint, urls)
+        await asyncio.sleep(0.1)
+        await recorder.stop()
+        await cdp.stop()
+        print(f"📼 Recorded {len(recorder.messages)} messages to {os.path.getsize(path)} bytes")
+        print(f"   live:             {live * 1000:8.1f} ms")
+
+        for label, speed in (("recorded speed", 1.0), ("as fast as possible", 0)):
+            replay = await ReplayServer(path, speed=speed).start()
+            elapsed, ok = await crawl(replay.ws_endpoint, urls)
+            await replay.stop()
+            same = "same results" if ok == live_ok else "DIFFERENT results"
+            print(f"   {label + ':':<18}{elapsed * 1000:8.1f} ms, {same}, "
+                  f"{replay.unmatched} unmatched requests, {replay.skipped} skipped messages")
+
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.get_event_loop().run_until_complete(main(*args))
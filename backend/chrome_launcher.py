@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import urllib.request
+
+from pyppeteer import connect
+
+from tracing import span
+
+# Candidate Chrome binaries per platform, checked in order
+CHROME_PATHS = {
+    'Darwin': [
+        '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+        '/Applications/Chromium.app/Contents/MacOS/Chromium',
+    ],
+    'Linux': [
+        'google-chrome',
+        'google-chrome-stable',
+        'chromium',
+        'chromium-browser',
+    ],
+    'Windows': [
+        r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+        r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
+    ],
+}
+
+def find_chrome():
+    """Return the first Chrome binary found for this platform, or None"""
+    env_path = os.environ.get('CHROME_PATH')
+    if env_path:
+        return env_path
+    for candidate in CHROME_PATHS.get(platform.system(), []):
+        if os.path.isabs(candidate):
+            if os.path.exists(candidate):
+                return candidate
+        else:
+            found = shutil.which(candidate)
+            if found:
+                return found
+    return None
+
+def probe_devtools(port, host='localhost', timeout=0.5):
+    """Return the /json/version payload if Chrome answers on the port, else None"""
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/json/version", timeout=timeout) as response:
+            return json.loads(response.read().decode())
+    except (OSError, ValueError):
+        return None
+
+class ChromeSupervisor:
+    """Launches (or reuses) Chrome with remote debugging and keeps it alive.
+
+    connect() returns as soon as /json/version answers instead of sleeping a
+    fixed amount, and a watchdog restarts Chrome if it crashes. Chrome that
+    exits cleanly, or goes away after the user closed its last window, was
+    closed on purpose and is left closed. With
+    record_path the CDP traffic is captured through a CDPRecorder; with
+    replay_path no Chrome is started and a recorded session is served instead.
+    """
+
+    def __init__(self, port=9222, user_data_dir='/tmp/chrome-debug', headless=False,
+                 chrome_path=None, start_url=None, extra_args=None, ready_timeout=30,
+                 probe_interval=0.1, watch_interval=2, max_restarts=3,
+                 record_path=None, replay_path=None, replay_speed=1.0):
+        self.port = port
+        self.user_data_dir = user_data_dir
+        self.headless = headless
+        self.chrome_path = chrome_path
+        self.start_url = start_url
+        self.extra_args = list(extra_args or [])
+        self.ready_timeout = ready_timeout
+        self.probe_interval = probe_interval
+        self.watch_interval = watch_interval
+        self.max_restarts = max_restarts
+        self.record_path = record_path
+        self.replay_path = replay_path
+        self.replay_speed = replay_speed
+        self.recorder = None
+        self.replay = None
+
+        self.process = None
+        self.browser = None
+        self.reused = False
+        self.restart_callbacks = []
+        self.metrics = {
+            'time_to_ready': None,
+            'time_to_connected': None,
+            'restarts': 0,
+            'reused': False,
+        }
+        self._watch_task = None
+        self._stopping = False
+        self._windows_closed = False  # the user closed every tab of a visible Chrome
+
+    @property
+    def browser_url(self):
+        return f"http://localhost:{self.port}"
+
+    def build_args(self):
+        args = [
+            f'--remote-debugging-port={self.port}',
+            f'--user-data-dir={self.user_data_dir}',
+            '--no-first-run',
+            '--no-default-browser-check',
+        ]
+        if self.headless:
+            args += ['--headless=new', '--disable-gpu']
+            if platform.system() == 'Linux' and hasattr(os, 'geteuid') and os.geteuid() == 0:
+                args.append('--no-sandbox')  # Chrome refuses to sandbox as root
+        else:
+            args += [
+                '--new-window',
+                '--start-maximized',
+                '--disable-backgrounding-occluded-windows',
+            ]
+        args += self.extra_args
+        if self.start_url:
+            args.append(self.start_url)
+        return args
+
+    def spawn(self):
+        chrome_path = self.chrome_path or find_chrome()
+        if not chrome_path:
+            raise RuntimeError("Could not find a Chrome binary; set CHROME_PATH")
+        self.process = subprocess.Popen(
+            [chrome_path] + self.build_args(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return self.process
+
+    async def wait_until_ready(self):
+        """Poll /json/version until Chrome answers or ready_timeout passes"""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.ready_timeout
+        while loop.time() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError(f"Chrome exited during startup (code {self.process.returncode})")
+            version = await loop.run_in_executor(None, probe_devtools, self.port)
+            if version:
+                return version
+            await asyncio.sleep(self.probe_interval)
+        raise TimeoutError(f"Chrome did not answer on port {self.port} within {self.ready_timeout} seconds")
+
+    async def start(self):
+        """Reuse a Chrome already listening on the port, otherwise spawn one"""
+        started_at = time.perf_counter()
+        loop = asyncio.get_event_loop()
+        if await loop.run_in_executor(None, probe_devtools, self.port):
+            self.reused = True
+        else:
+            self.reused = False
+            with span('chrome.spawn'):
+                self.spawn()
+            with span('chrome.wait_ready'):
+                await self.wait_until_ready()
+        self.metrics['reused'] = self.reused
+        self.metrics['time_to_ready'] = time.perf_counter() - started_at
+        return started_at
+
+    async def connect(self):
+        """Start or reuse Chrome and return a connected pyppeteer browser"""
+        if self.replay_path:
+            return await self._connect_replay()
+        started_at = await self.start()
+        with span('chrome.devtools_connect'):
+            if self.record_path:
+                self.browser = await connect(browserWSEndpoint=await self._recorder_endpoint())
+            else:
+                self.browser = await connect(browserURL=self.browser_url)
+        if self.reused and self.start_url:
+            # An existing instance did not get our start URL on its command line
+            await self.browser._connection.send('Target.createTarget', {'url': self.start_url})
+        self.metrics['time_to_connected'] = time.perf_counter() - started_at
+        self._windows_closed = False
+        self.browser.on('targetcreated', self._on_target_created)
+        self.browser.on('targetdestroyed', self._on_target_destroyed)
+
+        if self._watch_task is None:
+            self._watch_task = asyncio.ensure_future(self._watch())
+        return self.browser
+
+    async def _recorder_endpoint(self):
+        from cdp_replay import CDPRecorder
+        loop = asyncio.get_event_loop()
+        upstream = (await loop.run_in_executor(None, probe_devtools, self.port))['webSocketDebuggerUrl']
+        if self.recorder is None:
+            self.recorder = await CDPRecorder(upstream, self.record_path).start()
+        else:
+            self.recorder.upstream = upstream  # Chrome was restarted
+        return self.recorder.ws_endpoint
+
+    async def _connect_replay(self):
+        from cdp_replay import ReplayServer
+        started_at = time.perf_counter()
+        self.replay = await ReplayServer(self.replay_path, speed=self.replay_speed).start()
+        self.browser = await connect(browserWSEndpoint=self.replay.ws_endpoint)
+        self.metrics['time_to_ready'] = 0.0
+        self.metrics['time_to_connected'] = time.perf_counter() - started_at
+        return self.browser
+
+    def on_restart(self, callback):
+        """Register callback(browser) to run after Chrome has been restarted"""
+        self.restart_callbacks.append(callback)
+
+    def _on_target_created(self, target):
+        if target.type == 'page':
+            self._windows_closed = False
+
+    def _on_target_destroyed(self, target):
+        # pyppeteer drops the target before emitting, so this sees what is left
+        if target.type == 'page' and not self.headless and \
+                not any(other.type == 'page' for other in self.browser.targets()):
+            self._windows_closed = True
+
+    def closed_by_user(self):
+        """True when Chrome went away on purpose: a clean exit, or after its last window was closed"""
+        if self.process is not None and self.process.returncode == 0:
+            return True
+        return self._windows_closed
+
+    def is_alive(self):
+        if self.process is not None:
+            return self.process.poll() is None
+        return probe_devtools(self.port) is not None
+
+    async def _watch(self):
+        loop = asyncio.get_event_loop()
+        while not self._stopping:
+            await asyncio.sleep(self.watch_interval)
+            if self._stopping:
+                break
+            if await loop.run_in_executor(None, self.is_alive):
+                continue
+            if self.closed_by_user():
+                print("👋 Chrome was closed, not restarting it.")
+                break
+            if self.metrics['restarts'] >= self.max_restarts:
+                print(f"❌ Chrome crashed and the restart limit ({self.max_restarts}) was reached.")
+                break
+
+            self.metrics['restarts'] += 1
+            print(f"🔁 Chrome is gone, restarting (attempt {self.metrics['restarts']}/{self.max_restarts})...")
+            try:
+                await self.browser.disconnect()
+            except Exception:
+                pass
+            try:
+                self.process = None
+                await self.connect()
+            except Exception as e:
+                print(f"❌ Restart failed: {e}")
+                continue
+            for callback in self.restart_callbacks:
+                result = callback(self.browser)
+                if asyncio.iscoroutine(result):
+                    await result
+
+    async def stop(self, kill=False):
+        """Disconnect, and terminate Chrome if we launched it and kill is set"""
+        self._stopping = True
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self.browser is not None:
+            await self.browser.disconnect()
+            self.browser = None
+        if self.recorder is not None:
+            await self.recorder.stop()
+            self.recorder = None
+        if self.replay is not None:
+            await self.replay.stop()
+            self.replay = None
+        if kill and self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
@@ -0,0 +1,106 @@
+import json
+
+from tracing import span
+
+class Field:
+    """One value per match: attr is 'text', 'html', or an attribute name.
+
+    selector=None reads the current element itself (useful inside a List);
+    all=True returns a list with one value per matching element.
+    """
+
+    def __init__(self, selector=None, attr='text', all=False):
+        self.selector = selector
+        self.attr = attr
+        self.all = all
+
+    def spec(self):
+        return {'selector': self.selector, 'attr': self.attr, 'all': self.all}
+
+    def decode(self, value):
+        return value
+
+class List:
+    """One dict per element matching selector, with fields read relative to it"""
+
+    def __init__(self, selector, fields):
+        self.selector = selector
+        self.fields = normalize(fields)
+
+    def spec(self):
+        return {'selector': self.selector, 'list': True, 'fields': [field.spec() for field in self.fields.values()]}
+
+    def decode(self, rows):
+        return [decode_fields(self.fields, row) for row in rows]
+
+def normalize(fields):
+    """Accept 'selector' and ('selector', 'attr') shorthands for Field"""
+    normalized = {}
+    for name, field in fields.items():
+        if isinstance(field, str):
+            field = Field(field)
+        elif isinstance(field, tuple):
+            field = Field(*field)
+        normalized[name] = field
+    return normalized
+
+def decode_fields(fields, values):
+    return {name: field.decode(value) for (name, field), value in zip(fields.items(), values)}
+
+# Walks the spec in the page and returns nested arrays (no key names), so the
+# payload stays compact; Schema.decode puts the names back.
+EXTRACT_SCRIPT = '''(() => {
+  const pick = (el, attr) => {
+    if (!el) return null;
+    if (attr === 'text') return el.textContent.replace(/\\s+/g, ' ').trim();
+    if (attr === 'html') return el.innerHTML;
+    if (attr === 'href' || attr === 'src') return el[attr] || el.getAttribute(attr);
+    return el.getAttribute(attr);
+  };
+  const all = (root, selector) => selector ? Array.from(root.querySelectorAll(selector)) : [root];
+  const run = (root, fields) => fields.map(f => {
+    if (f.list) return all(root, f.selector).map(el => run(el, f.fields));
+    if (f.all) return all(root, f.selector).map(el => pick(el, f.attr));
+    return pick(f.selector ? root.querySelector(f.selector) : root, f.attr);
+  });
+  return run(document, %s);
+})()'''
+
+class Schema:
+    """Declarative page extraction compiled into a single injected script.
+
+    Instead of one evaluate/querySelector round trip per field, the whole
+    schema (selectors, attributes, nested lists) runs in the page through one
+    Runtime.evaluate and comes back as one JSON value. A Schema can be passed
+    straight to TabCrawler as its extract callable.
+    """
+
+    def __init__(self, fields):
+        self.fields = normalize(fields)
+        self.script = EXTRACT_SCRIPT % json.dumps([field.spec() for field in self.fields.values()],
+                                                  separators=(',', ':'))
+
+    def decode(self, values):
+        return decode_fields(self.fields, values)
+
+    async def extract(self, page):
+        with span('extract', url=page.url):
+            response = await page._client.send('Runtime.evaluate', {
+                'expression': self.script,
+                'returnByValue': True,
+            })
+        if 'exceptionDetails' in response:
+            details = response['exceptionDetails']
+            message = details.get('exception', {}).get('description') or details.get('text')
+            raise RuntimeError(f"Extraction failed on {page.url}: {message}")
+        return self.decode(response['result'].get('value') or [])
+
+    async def __call__(self, page, url=None):
+        return await self.extract(page)
+
+# Generic page summary used when no page-specific schema applies
+PAGE_SUMMARY = Schema({
+    'title': Field('title'),
+    'heading': 'h1',
+    'links': List('a[href]', {'text': Field(), 'href': Field(None, 'href')}),
+})
@@ -0,0 +1,410 @@
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urljoin, urlsplit
+
+from http_fetcher import STALE_CONNECTION_ERRORS, ConnectionPool
+from tracing import span
+from traffic import RETRY_STATUSES
+
+DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser('~'), 'Downloads', 'Brightspace')
+
+# Failures that leave a usable .part behind, so the transfer is retried from where it stopped
+TRANSFER_ERRORS = (http.client.HTTPException, OSError)
+
+# Course files often redirect to a signed URL on a CDN
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+MAX_REDIRECTS = 5
+
+class BandwidthLimiter:
+    """Token bucket shared by every transfer thread; rate is bytes/second, None for no cap"""
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst or (rate or 0) / 4
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """Block the calling thread until amount more bytes fit under the cap"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+class DownloadResult:
+    def __init__(self, url, path, size=0, sha256=None, resumed_from=0, attempts=0, elapsed=0.0, error=None):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.resumed_from = resumed_from
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def filename_for(url):
+    """Local file name for a course file URL"""
+    name = unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', name) or 'download'
+
+class Downloader:
+    """Streams course files to disk with the browser session's cookies.
+
+    Bodies are read into one chunk_size buffer per connection and written
+    straight to disk, so memory stays flat whatever the file size. Each
+    transfer writes "<name>.part" next to a JSON sidecar holding the
+    server's validator (ETag or Last-Modified) and the expected size. After
+    an interruption, in this run or a later one, the transfer continues
+    with a Range request guarded by If-Range, so a file that changed on the
+    server is fetched again from the start instead of being spliced.
+    Finished files are checked against the expected size and, when given,
+    a SHA-256. At most `connections` files transfer at once, all sharing
+    one bandwidth cap. Redirects are followed, with a connection pool per
+    host and only the cookies that belong to that host. Each request holds
+    a slot from the fetcher's TrafficScheduler until its response headers
+    arrive, so downloads back off with API calls when Brightspace throttles
+    but a long transfer never keeps API calls waiting.
+    """
+
+    def __init__(self, fetcher, connections=4, bandwidth=None, chunk_size=256 * 1024, retries=3, timeout=60):
+        self.fetcher = fetcher
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.traffic = fetcher.traffic
+        self.limiter = BandwidthLimiter(bandwidth)
+        self.timeout = timeout
+        self.pools = {}  # (scheme, host, port) -> ConnectionPool
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix='download')
+        self._reset()
+
+    def _reset(self):
+        """Start the progress counters over for a new batch"""
+        with self._lock:
+            self.bytes_done = 0
+            self.sizes = {}  # path -> expected size, once the server has said
+            self.files_done = 0
+
+    def _count(self, amount):
+        with self._lock:
+            self.bytes_done += amount
+
+    def _pool(self, parts):
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise RuntimeError(f"Cannot download {parts.geturl()}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        with self._lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = self.pools[key] = ConnectionPool(*key, max_connections=self.connections,
+                                                        timeout=self.timeout)
+            return pool
+
+    def _open(self, url, offset, validator):
+        """Send the request and return (pool, connection, response) once the headers are in"""
+        parts = urlsplit(url)
+        pool = self._pool(parts)
+        path, headers = self.fetcher.request_target(url)
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            if validator:
+                headers['If-Range'] = validator
+        for attempt in range(2):
+            with self.traffic.blocking_slot(parts.hostname, kind='download') as ticket:
+                connection, reused = pool.acquire()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    ticket.finished(response.status, dict(response.getheaders()))
+                    return pool, connection, response
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    # The server closed an idle keep-alive socket; retry once on a fresh one
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+
+    @staticmethod
+    def _read_meta(meta_path, url):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get('url') == url else {}
+
+    def _hash_file(self, path, length):
+        """SHA-256 of the first length bytes of path, read a chunk at a time"""
+        digest = hashlib.sha256()
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        with open(path, 'rb') as f:
+            while length > 0:
+                n = f.readinto(view[:min(self.chunk_size, length)])
+                if not n:
+                    break
+                digest.update(view[:n])
+                length -= n
+        return digest
+
+    def _fetch(self, url, part, meta_path, meta, state):
+        """One request: append to (or restart) part; raises TRANSFER_ERRORS if cut short"""
+        offset = os.path.getsize(part) if meta and os.path.exists(part) else 0
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            pool, connection, response = self._open(target, offset, meta.get('validator'))
+            if response.status not in REDIRECT_STATUSES:
+                return self._stream(url, part, meta_path, meta, state, offset, pool, connection, response)
+            location = response.getheader('Location')
+            response.read()
+            if response.will_close:
+                connection.close()
+            else:
+                pool.release(connection)
+            if not location:
+                raise RuntimeError(f"GET {target} returned HTTP {response.status} without a Location")
+            target = urljoin(target, location)
+        raise RuntimeError(f"GET {url} redirected more than {MAX_REDIRECTS} times")
+
+    def _stream(self, url, part, meta_path, meta, state, offset, pool, connection, response):
+        complete = False
+        try:
+            if response.status == 416 and offset:
+                response.read()
+                total = re.search(r'/(\d+)$', response.getheader('Content-Range') or '')
+                if total and int(total.group(1)) == offset:
+                    complete = True  # the part already holds the whole file
+                    return meta
+                raise RuntimeError(f"GET {url} rejected resuming at byte {offset}")
+            if response.status == 206 and offset:
+                content_range = re.match(r'bytes (\d+)-\d+/(\d+|\*)', response.getheader('Content-Range') or '')
+                if not content_range or int(content_range.group(1)) != offset:
+                    raise RuntimeError(f"GET {url} resumed at the wrong offset")
+                total = int(content_range.group(2)) if content_range.group(2) != '*' else None
+                mode = 'ab'
+            elif response.status == 200:
+                # A fresh start, or the file changed since the part was written (If-Range failed)
+                offset = 0
+                length = response.getheader('Content-Length')
+                total = int(length) if length is not None else None
+                mode = 'wb'
+            else:
+                response.read()
+                complete = True
+                if response.status in RETRY_STATUSES:
+                    # Throttled or briefly unavailable: retried after a backoff
+                    raise http.client.HTTPException(f"GET {url} returned HTTP {response.status}")
+                raise RuntimeError(f"GET {url} returned HTTP {response.status}")
+
+            meta = {'url': url, 'validator': response.getheader('ETag') or response.getheader('Last-Modified'),
+                    'size': total}
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+            if total is not None:
+                with self._lock:
+                    self.sizes[part] = total
+            if state['hashed'] != offset:
+                state['digest'] = self._hash_file(part, offset) if offset else hashlib.sha256()
+                state['hashed'] = offset
+
+            digest = state['digest']
+            buffer = bytearray(self.chunk_size)
+            view = memoryview(buffer)
+            expected = None if total is None else total - offset
+            received = 0
+            with open(part, mode) as f:
+                while True:
+                    n = response.readinto(buffer)
+                    if not n:
+                        break
+                    self.limiter.consume(n)
+                    f.write(view[:n])
+                    digest.update(view[:n])
+                    received += n
+                    state['hashed'] += n
+                    self._count(n)
+            if expected is not None and received != expected:
+                raise http.client.IncompleteRead(b'', expected - received)
+            complete = True
+            return meta
+        finally:
+            if complete and not response.will_close:
+                pool.release(connection)
+            else:
+                connection.close()
+
+    def _download(self, url, path, sha256=None):
+        part = path + '.part'
+        meta_path = part + '.json'
+        started = time.perf_counter()
+        meta = self._read_meta(meta_path, url)
+        resumed_from = os.path.getsize(part) if meta and os.path.exists(part) else 0
+        state = {'digest': None, 'hashed': -1}
+        attempts = 0
+        try:
+            with span('download', url=url, resumed_from=resumed_from):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                while True:
+                    attempts += 1
+                    try:
+                        meta = self._fetch(url, part, meta_path, meta, state)
+                        break
+                    except TRANSFER_ERRORS:
+                        if attempts > self.retries:
+                            raise
+                        meta = self._read_meta(meta_path, url)
+                        time.sleep(self.traffic.retry_delay(attempts))
+
+                size = os.path.getsize(part)
+                if meta.get('size') is not None and size != meta['size']:
+                    raise RuntimeError(f"{url}: got {size} bytes, expected {meta['size']}")
+                if state['hashed'] != size:
+                    state['digest'] = self._hash_file(part, size)
+                digest = state['digest'].hexdigest()
+                if sha256 and digest != sha256.lower():
+                    os.remove(part)
+                    os.remove(meta_path)
+                    raise RuntimeError(f"{url}: checksum mismatch")
+                os.replace(part, path)
+                os.remove(meta_path)
+        except Exception as e:
+            return DownloadResult(url, path, resumed_from=resumed_from, attempts=attempts,
+                                  elapsed=time.perf_counter() - started, error=str(e) or type(e).__name__)
+        with self._lock:
+            self.files_done += 1
+        return DownloadResult(url, path, size, digest, resumed_from, attempts, time.perf_counter() - started)
+
+    def status(self, count, elapsed):
+        with self._lock:
+            done, total, files = self.bytes_done, sum(self.sizes.values()), self.files_done
+        rate = done / elapsed / 1e6 if elapsed else 0.0
+        return f"⬇️ {files}/{count} files, {done / 1e6:.1f}/{total / 1e6:.1f} MB, {rate:.1f} MB/s"
+
+    async def download_many(self, items, progress=None, report_interval=0.5):
+        """Download (url, path) or (url, path, sha256) items concurrently; results are in item order"""
+        loop = asyncio.get_event_loop()
+        self._reset()
+        started = time.perf_counter()
+        futures = [loop.run_in_executor(self._executor, self._download, *item) for item in items]
+
+        async def report():
+            while True:
+                await asyncio.sleep(report_interval)
+                progress(self.status(len(items), time.perf_counter() - started))
+
+        reporter = asyncio.ensure_future(report()) if progress is not None else None
+        try:
+            return await asyncio.gather(*futures)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+
+    async def download(self, url, path=None, sha256=None, progress=None):
+        path = path or os.path.join(DEFAULT_DOWNLOAD_DIR, filename_for(url))
+        return (await self.download_many([(urljoin(self.fetcher.base_url, url), path, sha256)], progress))[0]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+# Streams large files from StandInServer: one is cut off mid-transfer and
+# resumed with a Range request, one is left as a .part by a failed run and
+# finished by a second one. Checks checksums, bytes on the wire and that
+# Python memory stays flat with file size.
+# Usage: python downloader.py [mb_per_file] [files] [bandwidth_mb_per_s]
+if __name__ == "__main__":
+    import shutil
+    import sys
+    import tempfile
+    import tracemalloc
+
+    from http_fetcher import BrightspaceFetcher
+    from standin_server import StandInServer
+
+    mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    bandwidth = float(sys.argv[3]) * 1e6 if len(sys.argv) > 3 else None
+
+    source = tempfile.mkdtemp(prefix='standin-files-')
+    target = tempfile.mkdtemp(prefix='downloads-')
+    checksums = {}
+    server = StandInServer().start()
+    for i in range(count):
+        file_path = os.path.join(source, f"lecture{i}.pdf")
+        digest = hashlib.sha256()
+        with open(file_path, 'wb') as f:
+            for _ in range(mb):
+                block = os.urandom(1 << 20)
+                f.write(block)
+                digest.update(block)
+        checksums[i] = digest.hexdigest()
+        # Every other file drops its first connection halfway through
+        server.add_file(f"/content/enforced/1-CS180/lecture{i}.pdf", file_path,
+                        fail_after=(mb << 20) // 2 if i % 2 else None)
+
+    async def run(items, retries=3):
+        fetcher = BrightspaceFetcher(server.base_url)
+        downloader = Downloader(fetcher, connections=4, bandwidth=bandwidth, retries=retries)
+        try:
+            return await downloader.download_many(items, progress=print, report_interval=1.0)
+        finally:
+            downloader.close()
+            fetcher.close()
+
+    async def main():
+        items = [(f"{server.base_url}/content/enforced/1-CS180/lecture{i}.pdf",
+                  os.path.join(target, f"lecture{i}.pdf"), checksums[i]) for i in range(count)]
+
+        # A run with no retries leaves the interrupted files as .part
+        results = await run(items, retries=0)
+        failed = [result for result in results if not result.ok]
+        print(f"First run: {len(results) - len(failed)} finished, {len(failed)} left as .part")
+
+        server.reset_counters()
+        tracemalloc.start()
+        start = time.perf_counter()
+        results = await run([item for item, result in zip(items, results) if not result.ok])
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        for result in results:
+            state = f"resumed at {result.resumed_from / 1e6:.1f} MB" if result.resumed_from else "from the start"
+            print(f"  {os.path.basename(result.path)}: {'ok' if result.ok else result.error}, {state}, "
+                  f"sha256 {'verified' if result.ok else '-'}")
+        expected_bytes = sum((mb << 20) - result.resumed_from for result in results)
+        print(f"Second run: {server.bytes_sent / 1e6:.1f} MB sent for {expected_bytes / 1e6:.1f} MB missing, "
+              f"{elapsed:.2f}s, Python memory peak {peak / 1024:.0f} KiB for {mb} MB files")
+        assert all(result.ok for result in results)
+        assert all(os.path.exists(item[1]) for item in items)
+
+    try:
+        asyncio.get_event_loop().run_until_complete(main())
+    finally:
+        server.stop()
+        shutil.rmtree(source)
+        shutil.rmtree(target)
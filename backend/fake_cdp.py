@@ -0,0 +1,221 @@
+import asyncio
+import json
+from collections import Counter
+
+import websockets
+
+
+class FakeCDPServer:
+    """Minimal local stand-in for Chrome's DevTools WebSocket endpoint.
+
+    It answers just enough of the protocol for pyppeteer.connect(), target
+    discovery, opening/closing tabs, attaching to pages, navigating and
+    evaluating scripts, and counts every message the client sends so
+    different strategies can be compared.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.targets = {}
+        self.sessions = {}
+        self.message_count = 0
+        self.methods = Counter()
+        # Optional overrides: method name -> callable(params) returning a result dict
+        self.handlers = {}
+        # Optional coroutine function(url) awaited while a tab loads a URL,
+        # e.g. fetching it from a StandInServer so navigations take real time
+        self.loader = None
+        self._loader_ids = {}
+        self._clients = set()
+        self._server = None
+        self._next_id = 0
+
+    @property
+    def ws_endpoint(self):
+        return f"ws://{self.host}:{self.port}/devtools/browser/fake"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for ws in list(self._clients):
+            await ws.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset_counters(self):
+        self.message_count = 0
+        self.methods.clear()
+
+    def _new_id(self, prefix):
+        self._next_id += 1
+        return f"{prefix}-{self._next_id}"
+
+    async def open_page(self, url):
+        """Simulate a new tab being opened"""
+        target_id = self._new_id('target')
+        self.targets[target_id] = {
+            'targetId': target_id,
+            'type': 'page',
+            'title': url,
+            'url': url,
+            'attached': False,
+            'browserContextId': None,
+        }
+        await self._broadcast('Target.targetCreated', {'targetInfo': self.targets[target_id]})
+        return target_id
+
+    async def navigate(self, target_id, url):
+        """Simulate an existing tab navigating, e.g. a login redirect"""
+        info = self.targets[target_id]
+        info['url'] = url
+        info['title'] = url
+        await self._broadcast('Target.targetInfoChanged', {'targetInfo': info})
+        # Attached pages track their URL through frame events, like real Chrome
+        for session_id, (ws, session_target) in list(self.sessions.items()):
+            if session_target == target_id:
+                await self._session_event(ws, session_id, 'Page.frameNavigated', {
+                    'frame': self._frame(target_id),
+                })
+
+    def _frame(self, target_id):
+        return {
+            'id': target_id,
+            'loaderId': self._loader_ids.get(target_id, 'loader'),
+            'url': self.targets[target_id]['url'],
+            'securityOrigin': '',
+            'mimeType': 'text/html',
+        }
+
+    async def _handler(self, ws, path=None):
+        self._clients.add(ws)
+        try:
+            async for raw in ws:
+                self.message_count += 1
+                await self._dispatch(ws, json.loads(raw))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.discard(ws)
+
+    async def _dispatch(self, ws, msg):
+        method = msg.get('method')
+        params = msg.get('params') or {}
+
+        if method == 'Target.sendMessageToTarget':
+            await self._send(ws, {'id': msg['id'], 'result': {}})
+            inner = json.loads(params['message'])
+            self.methods[inner.get('method')] += 1
+            await self._session_call(ws, params['sessionId'], inner)
+            return
+
+        self.methods[method] += 1
+        if method in self.handlers:
+            result = self.handlers[method](params)
+        elif method == 'Target.getBrowserContexts':
+            result = {'browserContextIds': []}
+        elif method == 'Target.getTargets':
+            result = {'targetInfos': list(self.targets.values())}
+        elif method == 'Target.attachToTarget':
+            session_id = self._new_id('session')
+            self.sessions[session_id] = (ws, params['targetId'])
+            self.targets[params['targetId']]['attached'] = True
+            result = {'sessionId': session_id}
+        elif method == 'Target.createTarget':
+            target_id = await self.open_page(params.get('url', 'about:blank'))
+            result = {'targetId': target_id}
+        elif method == 'Target.closeTarget':
+            self.targets.pop(params['targetId'], None)
+            for session_id, (_, session_target) in list(self.sessions.items()):
+                if session_target == params['targetId']:
+                    del self.sessions[session_id]
+            await self._broadcast('Target.targetDestroyed', {'targetId': params['targetId']})
+            result = {'success': True}
+        elif method == 'Browser.getVersion':
+            result = {'product': 'FakeChrome/1.0', 'userAgent': 'FakeChrome', 'protocolVersion': '1.3'}
+        else:
+            result = {}
+        await self._send(ws, {'id': msg['id'], 'result': result})
+
+        if method == 'Target.setDiscoverTargets' and params.get('discover'):
+            for info in list(self.targets.values()):
+                await self._send(ws, {'method': 'Target.targetCreated', 'params': {'targetInfo': info}})
+
+    async def _session_call(self, ws, session_id, inner):
+        method = inner.get('method')
+        params = inner.get('params') or {}
+        target_id = self.sessions[session_id][1]
+
+        if method in self.handlers:
+            result = self.handlers[method](params)
+        elif method == 'Page.getFrameTree':
+            result = {'frameTree': {'frame': self._frame(target_id), 'childFrames': []}}
+        elif method in ('Runtime.evaluate', 'Runtime.callFunctionOn'):
+            result = {'result': {'type': 'undefined'}}
+        elif method == 'Page.navigate':
+            loader_id = self._new_id('loader')
+            result = {'frameId': target_id, 'loaderId': loader_id}
+            # Load in the background so other tabs on this connection keep being served
+            asyncio.ensure_future(self._load(ws, session_id, target_id, params['url'], loader_id))
+        else:
+            result = {}
+        await self._send(ws, {
+            'method': 'Target.receivedMessageFromTarget',
+            'params': {
+                'sessionId': session_id,
+                'targetId': target_id,
+                'message': json.dumps({'id': inner['id'], 'result': result}),
+            },
+        })
+
+        if method == 'Runtime.enable':
+            await self._session_event(ws, session_id, 'Runtime.executionContextCreated', {
+                'context': {
+                    'id': 1,
+                    'origin': '',
+                    'name': '',
+                    'auxData': {'frameId': target_id, 'isDefault': True},
+                },
+            })
+
+    async def _load(self, ws, session_id, target_id, url, loader_id):
+        await self._session_event(ws, session_id, 'Page.lifecycleEvent', {
+            'frameId': target_id, 'loaderId': loader_id, 'name': 'init', 'timestamp': 0,
+        })
+        if self.loader is not None:
+            await self.loader(url)
+        if target_id not in self.targets:
+            return  # closed while loading
+        self._loader_ids[target_id] = loader_id
+        self.targets[target_id]['url'] = url
+        await self._session_event(ws, session_id, 'Page.frameNavigated', {'frame': self._frame(target_id)})
+        for name in ('DOMContentLoaded', 'load'):
+            await self._session_event(ws, session_id, 'Page.lifecycleEvent', {
+                'frameId': target_id, 'loaderId': loader_id, 'name': name, 'timestamp': 0,
+            })
+        await self._session_event(ws, session_id, 'Page.loadEventFired', {'timestamp': 0})
+
+    async def _session_event(self, ws, session_id, method, params):
+        if session_id not in self.sessions:
+            return  # the tab was closed
+        await self._send(ws, {
+            'method': 'Target.receivedMessageFromTarget',
+            'params': {
+                'sessionId': session_id,
+                'targetId': self.sessions[session_id][1],
+                'message': json.dumps({'method': method, 'params': params}),
+            },
+        })
+
+    async def _broadcast(self, method, params):
+        for ws in list(self._clients):
+            await self._send(ws, {'method': method, 'params': params})
+
+    async def _send(self, ws, payload):
+        try:
+            await ws.send(json.dumps(payload))
+        except websockets.ConnectionClosed:
+            pass
@@ -0,0 +1,247 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from tracing import span
+from traffic import default_scheduler
+
+# Valence (Brightspace REST API) product versions used by the helpers below
+LP_VERSION = '1.43'
+LE_VERSION = '1.74'
+
+# Connection errors that mean a pooled keep-alive socket went stale
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+class FetchResponse:
+    def __init__(self, url, status, headers, body, elapsed, from_cache=False):
+        self.url = url
+        self.status = status
+        self.headers = headers  # lower-case header names
+        self.body = body
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+class ConnectionPool:
+    """Keep-alive HTTP connections shared by all requests to one origin"""
+
+    def __init__(self, scheme, host, port, max_connections=8, timeout=30):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.idle = []
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.idle:
+                return self.idle.pop(), True
+            self.created += 1
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, connection):
+        with self._lock:
+            if len(self.idle) < self.max_connections:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+def cookie_header(cookies, host, path, secure):
+    """Build a Cookie header from CDP cookie dicts that apply to host/path"""
+    pairs = []
+    for cookie in cookies:
+        domain = cookie.get('domain', '').lstrip('.')
+        if domain and host != domain and not host.endswith('.' + domain):
+            continue
+        if not path.startswith(cookie.get('path', '/')):
+            continue
+        if cookie.get('secure') and not secure:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return '; '.join(pairs)
+
+async def get_session_cookies(page, urls=None):
+    """Pull the authenticated cookies out of a pyppeteer page via Network.getCookies"""
+    response = await page._client.send('Network.getCookies', {'urls': urls or [page.url]})
+    return response.get('cookies', [])
+
+class BrightspaceFetcher:
+    """Direct HTTP access to Brightspace using the browser session's cookies.
+
+    Requests go over a keep-alive connection pool on worker threads, with at
+    most max_concurrency in flight, instead of navigating a Chrome tab.
+    Every network request takes a slot from the TrafficScheduler, which
+    adapts concurrency to the host and retries throttled or failed requests
+    with backoff until `deadline` seconds have passed. GET responses go
+    through an optional ResponseCache, partitioned by user.
+    """
+
+    def __init__(self, base_url, cookies=None, max_concurrency=8, timeout=30, user_agent=None,
+                 cache=None, user='anonymous', traffic=None, deadline=60.0):
+        parts = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/') + '/'
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.cookies = list(cookies or [])
+        self.user_agent = user_agent
+        self.cache = cache
+        self.user = user
+        self.max_concurrency = max_concurrency
+        self.traffic = traffic or default_scheduler
+        self.deadline = deadline
+        self.pool = ConnectionPool(self.scheme, self.host, self.port, max_connections=max_concurrency, timeout=timeout)
+        self.request_count = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='fetch')
+        self._semaphore = None
+
+    @classmethod
+    async def from_page(cls, page, base_url=None, **kwargs):
+        """Create a fetcher authenticated as the user logged in on page"""
+        if base_url is None:
+            parts = urlsplit(page.url)
+            base_url = f"{parts.scheme}://{parts.netloc}/"
+        cookies = await get_session_cookies(page, [base_url])
+        user_agent = await page.evaluate('() => navigator.userAgent')
+        return cls(base_url, cookies, user_agent=user_agent, **kwargs)
+
+    def request_target(self, url, headers=None):
+        """(path, headers) for a request to url, authenticated with the session's cookies.
+
+        Only cookies that apply to url's own host are sent, so a URL on
+        another host (a CDN a file redirects to) gets none of Brightspace's.
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(headers or {})
+        cookie = cookie_header(self.cookies, parts.hostname or self.host, parts.path or '/',
+                               (parts.scheme or self.scheme) == 'https')
+        if cookie:
+            headers.setdefault('Cookie', cookie)
+        if self.user_agent:
+            headers.setdefault('User-Agent', self.user_agent)
+        headers.setdefault('Accept-Encoding', 'identity')
+        return path, headers
+
+    def _request(self, method, url, headers, deadline=None):
+        path, headers = self.request_target(url, headers)
+        started = time.perf_counter()
+        for attempt in range(2):
+            with self.traffic.blocking_slot(self.host, deadline) as ticket:
+                connection, reused = self.pool.acquire()
+                try:
+                    connection.request(method, path, headers=headers)
+                    response = connection.getresponse()
+                    ticket.finished(response.status, dict(response.getheaders()))
+                    body = response.read()
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    # The server closed an idle keep-alive socket; retry once on a fresh one
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.pool.release(connection)
+            response_headers = {name.lower(): value for name, value in response.getheaders()}
+            return FetchResponse(url, response.status, response_headers, body, time.perf_counter() - started)
+
+    def _cached_get(self, url, headers, deadline=None, use_cache=True):
+        entry = self.cache.lookup(self.user, url) if use_cache else None
+        if entry is not None and entry.is_fresh():
+            self.cache.count_hit(len(entry.body))
+            return FetchResponse(url, entry.status, entry.headers, entry.body, 0.0, from_cache=True)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+        response = self._request('GET', url, request_headers, deadline)
+        if entry is not None and response.status == 304:
+            self.cache.refresh(entry, response.headers)
+            self.cache.count_revalidation(len(entry.body))
+            return FetchResponse(url, entry.status, entry.headers, entry.body, response.elapsed, from_cache=True)
+
+        self.cache.count_miss(len(response.body))
+        self.cache.store(self.user, url, response.status, response.headers, response.body)
+        return response
+
+    def _send(self, method, url, headers, deadline=None, use_cache=True):
+        with span('fetch', method=method, url=url) as fetching:
+            if method == 'GET' and self.cache is not None:
+                response = self._cached_get(url, headers, deadline, use_cache)
+            else:
+                response = self._request(method, url, headers, deadline)
+            fetching.set(status=response.status, from_cache=response.from_cache)
+            return response
+
+    async def request(self, method, path, headers=None, use_cache=True):
+        """use_cache=False skips the cached copy and its validators; the fresh response still replaces it"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        url = urljoin(self.base_url, path)
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        loop = asyncio.get_event_loop()
+
+        def send():
+            self.request_count += 1
+            return loop.run_in_executor(self._executor, self._send, method, url, headers, deadline, use_cache)
+
+        async with self._semaphore:
+            # Retries wait on the event loop, not on a worker thread
+            return await self.traffic.retry(send, self.host, deadline)
+
+    async def get(self, path, headers=None, use_cache=True):
+        return await self.request('GET', path, headers, use_cache)
+
+    async def get_json(self, path):
+        response = await self.get(path, {'Accept': 'application/json'})
+        if not response.ok:
+            raise RuntimeError(f"GET {response.url} returned HTTP {response.status}")
+        return response.json()
+
+    async def get_many(self, paths):
+        """Fetch several paths concurrently, returning responses in order"""
+        return await asyncio.gather(*(self.get(path) for path in paths))
+
+    # Valence API helpers
+    async def whoami(self):
+        return await self.get_json(f'/d2l/api/lp/{LP_VERSION}/users/whoami')
+
+    async def my_enrollments(self):
+        return await self.get_json(f'/d2l/api/lp/{LP_VERSION}/enrollments/myenrollments/')
+
+    async def news(self, org_unit_id):
+        return await self.get_json(f'/d2l/api/le/{LE_VERSION}/{org_unit_id}/news/')
+
+    def close(self):
+        self.pool.close()
+        self._executor.shutdown(wait=False)
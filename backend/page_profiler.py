@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import statistics
+import time
+
+from tracing import span
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'brightspace-bot', 'profiles')
+
+# Performance.getMetrics counters that accumulate over a target's lifetime;
+# per-load values are the difference from the previous sample on that page.
+CUMULATIVE_METRICS = ('LayoutCount', 'RecalcStyleCount', 'LayoutDuration', 'RecalcStyleDuration',
+                      'ScriptDuration', 'TaskDuration', 'V8CompileDuration')
+
+NAVIGATION_TIMING_SCRIPT = '''(() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  if (!nav) return null;
+  return {ttfb: nav.responseStart, domContentLoaded: nav.domContentLoadedEventEnd,
+          load: nav.loadEventEnd, transferSize: nav.transferSize};
+})()'''
+
+def normalize_url(url):
+    """Group loads of the same page: drop the fragment and cache-busting parameters"""
+    url = url.split('#', 1)[0]
+    return re.sub(r'([?&])(_|_dc|t|ts)=\d+&?', r'\1', url).rstrip('?&')
+
+class ProfileStore:
+    """Rolling per-URL store of page-load metrics, keeping the last keep_per_url loads"""
+
+    def __init__(self, path=os.path.join(DEFAULT_PROFILE_DIR, 'page_loads.sqlite3'), keep_per_url=50):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.keep_per_url = keep_per_url
+        self.db = sqlite3.connect(path)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS page_loads (
+                url TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                load_ms REAL,
+                script_ms REAL,
+                layout_count INTEGER,
+                heap_mb REAL,
+                metrics TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS page_loads_url ON page_loads (url, recorded_at);
+        ''')
+        self.db.commit()
+
+    def add(self, url, run_id, sample):
+        self.db.execute('INSERT INTO page_loads VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+            url, run_id, time.time(), sample.get('load_ms'), sample.get('script_ms'),
+            sample.get('layout_count'), sample.get('heap_mb'), json.dumps(sample)))
+        self.db.execute('''DELETE FROM page_loads WHERE url = ? AND rowid NOT IN (
+            SELECT rowid FROM page_loads WHERE url = ? ORDER BY recorded_at DESC LIMIT ?)''',
+                        (url, url, self.keep_per_url))
+        self.db.commit()
+
+    def runs(self):
+        """Run ids, oldest first"""
+        return [run_id for (run_id,) in self.db.execute(
+            'SELECT run_id FROM page_loads GROUP BY run_id ORDER BY MIN(recorded_at)')]
+
+    def loads(self, run_id):
+        rows = self.db.execute('SELECT url, load_ms, script_ms, layout_count, heap_mb FROM page_loads WHERE run_id = ?',
+                               (run_id,))
+        by_url = {}
+        for url, load_ms, script_ms, layout_count, heap_mb in rows:
+            by_url.setdefault(url, []).append((load_ms, script_ms, layout_count, heap_mb))
+        return by_url
+
+    def close(self):
+        self.db.close()
+
+class PageProfiler:
+    """Opt-in CDP Performance profiling for the Brightspace tab and automated loads.
+
+    measure() samples Performance.getMetrics (layout count, script and task
+    duration, JS heap) plus the page's navigation timing in one batch and
+    writes it to the ProfileStore. With trace=True, record() also captures a
+    full Chrome trace of the navigation into the profile directory.
+    """
+
+    def __init__(self, store=None, trace=False, trace_dir=DEFAULT_PROFILE_DIR):
+        self.store = store or ProfileStore()
+        self.trace = trace
+        self.trace_dir = trace_dir
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self._previous = {}  # page -> last raw metrics
+        # Chrome runs one trace per browser, so traced navigations take turns
+        self._trace_lock = None
+
+    @classmethod
+    def from_env(cls):
+        """A profiler when BRIGHTSPACE_PROFILE is set (=trace also records traces), else None"""
+        mode = os.environ.get('BRIGHTSPACE_PROFILE')
+        if not mode:
+            return None
+        return cls(trace=mode == 'trace')
+
+    async def attach(self, page):
+        if page in self._previous:
+            return
+        await page._client.send('Performance.enable')
+        self._previous[page] = {}
+
+    async def raw_metrics(self, page):
+        response = await page._client.send('Performance.getMetrics')
+        return {metric['name']: metric['value'] for metric in response.get('metrics', [])}
+
+    async def measure(self, page, url=None):
+        """Sample the page's metrics since the previous sample and store them"""
+        await self.attach(page)
+        with span('profile.measure'):
+            raw = await self.raw_metrics(page)
+            timing = await page._client.send('Runtime.evaluate', {
+                'expression': NAVIGATION_TIMING_SCRIPT, 'returnByValue': True})
+        previous = self._previous.get(page, {})
+        self._previous[page] = raw
+
+        metrics = dict(raw)
+        for name in CUMULATIVE_METRICS:
+            if name in raw and previous.get(name, 0) <= raw[name]:
+                metrics[name] = raw[name] - previous.get(name, 0)
+        navigation = (timing.get('result') or {}).get('value') or {}
+        sample = {
+            'load_ms': navigation.get('load'),
+            'ttfb_ms': navigation.get('ttfb'),
+            'dom_content_loaded_ms': navigation.get('domContentLoaded'),
+            'transfer_bytes': navigation.get('transferSize'),
+            'script_ms': metrics.get('ScriptDuration', 0) * 1000,
+            'task_ms': metrics.get('TaskDuration', 0) * 1000,
+            'layout_count': int(metrics.get('LayoutCount', 0)),
+            'recalc_style_count': int(metrics.get('RecalcStyleCount', 0)),
+            'heap_mb': metrics.get('JSHeapUsedSize', 0) / (1024 * 1024),
+            'nodes': int(metrics.get('Nodes', 0)),
+        }
+        self.store.add(normalize_url(url or page.url), self.run_id, sample)
+        return sample
+
+    async def record(self, page, navigate, url):
+        """Run navigate() (a coroutine function) under a Chrome trace when tracing is on"""
+        await self.attach(page)
+        if not self.trace:
+            await navigate()
+            return await self.measure(page, url)
+        os.makedirs(self.trace_dir, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9]+', '_', normalize_url(url))[-80:]
+        path = os.path.join(self.trace_dir, f"{self.run_id}-{name}.json")
+        if self._trace_lock is None:
+            self._trace_lock = asyncio.Lock()
+        async with self._trace_lock:
+            await page.tracing.start({'path': path, 'screenshots': False})
+            try:
+                await navigate()
+            finally:
+                await page.tracing.stop()
+        sample = await self.measure(page, url)
+        sample['trace'] = path
+        return sample
+
+    def detach(self, page):
+        self._previous.pop(page, None)
+
+def summarize(store, limit=10):
+    """Slowest pages of the latest run by median load time, with change vs the run before"""
+    runs = store.runs()
+    if not runs:
+        return "No page loads recorded yet (run with BRIGHTSPACE_PROFILE=1)"
+    latest = store.loads(runs[-1])
+    previous = store.loads(runs[-2]) if len(runs) > 1 else {}
+
+    def median(rows, column):
+        values = [row[column] for row in rows if row[column] is not None]
+        return statistics.median(values) if values else None
+
+    ranked = sorted(latest.items(), key=lambda item: median(item[1], 0) or 0, reverse=True)
+    lines = [f"Slowest pages in run {runs[-1]} ({len(latest)} pages, {len(runs)} runs stored)"]
+    for url, rows in ranked[:limit]:
+        load_ms = median(rows, 0)
+        line = (f"  {load_ms or 0:8.0f} ms load  {median(rows, 1) or 0:7.0f} ms script  "
+                f"{median(rows, 2) or 0:5.0f} layouts  {median(rows, 3) or 0:6.1f} MB heap")
+        before = median(previous.get(url, []), 0)
+        if load_ms and before:
+            line += f"  {(load_ms - before) / before:+6.0%} vs previous"
+        lines.append(f"{line}  {url}")
+    return '\n'.join(lines)
+
+# Usage: python page_profiler.py summary [--limit N] [--db PATH]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brightspace page-load profiles")
+    parser.add_argument('command', choices=['summary'])
+    parser.add_argument('--limit', type=int, default=10, help="how many pages to show")
+    parser.add_argument('--db', help="profile database (defaults to the per-user cache)")
+    options = parser.parse_args()
+    profile_store = ProfileStore(options.db) if options.db else ProfileStore()
+    print(summarize(profile_store, options.limit))
+    profile_store.close()
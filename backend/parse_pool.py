@@ -0,0 +1,365 @@
+import asyncio
+import collections
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from tracing import span
+
+# Content inside these is never text
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg'}
+# Tags that start a new line of text
+BLOCK_TAGS = {'p', 'div', 'li', 'br', 'tr', 'td', 'th', 'table', 'section', 'article', 'header', 'footer',
+              'blockquote', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'dd', 'dt'}
+HEADING_TAGS = {'h1', 'h2', 'h3'}
+
+def collapse(text):
+    return ' '.join(text.split())
+
+def is_post(classes):
+    """Discussion posts are marked with a class like d2l-discussion-post or post"""
+    return any('post' in token.split('-') for token in classes.split())
+
+class PageParser(HTMLParser):
+    """Single pass over a page collecting its text, headings, links, tables and discussion posts.
+
+    Brightspace markup is not always well formed (unclosed cells and
+    paragraphs), so cells are closed by the next cell or row, and posts are
+    tracked by counting nested tags of the same name.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.blocks = []
+        self.headings = []
+        self.links = []
+        self.tables = []
+        self.posts = []
+        self._text = []
+        self._skip = 0
+        self._in_title = False
+        self._heading = None
+        self._link = None  # (href, text pieces)
+        self._open_tables = []
+        self._cell = None
+        self._post = None  # [tag, nesting level, text pieces]
+
+    def _flush(self):
+        text = collapse(''.join(self._text))
+        if text:
+            self.blocks.append(text)
+        self._text = []
+
+    def _close_cell(self):
+        if self._cell is not None and self._open_tables:
+            rows = self._open_tables[-1]['rows']
+            if not rows:
+                rows.append([])
+            rows[-1].append(collapse(''.join(self._cell)))
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        attrs = dict(attrs)
+        classes = attrs.get('class') or ''
+        if tag == 'title':
+            self._in_title = True
+        elif tag in HEADING_TAGS:
+            self._heading = []
+        elif tag == 'a' and attrs.get('href'):
+            self._link = (attrs['href'], [])
+        elif tag == 'table':
+            self._close_cell()
+            self._open_tables.append({'class': classes, 'rows': []})
+        elif tag == 'tr' and self._open_tables:
+            self._close_cell()
+            self._open_tables[-1]['rows'].append([])
+        elif tag in ('td', 'th') and self._open_tables:
+            self._close_cell()
+            self._cell = []
+
+        if self._post is None:
+            if is_post(classes):
+                self._post = [tag, 1, []]
+        elif tag == self._post[0]:
+            self._post[1] += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        if self._skip:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag == 'title':
+            self._in_title = False
+        elif tag in HEADING_TAGS and self._heading is not None:
+            heading = collapse(''.join(self._heading))
+            if heading:
+                self.headings.append(heading)
+            self._heading = None
+        elif tag == 'a' and self._link is not None:
+            href, pieces = self._link
+            self.links.append({'href': href, 'text': collapse(''.join(pieces))})
+            self._link = None
+        elif tag in ('td', 'th'):
+            self._close_cell()
+        elif tag == 'table' and self._open_tables:
+            self._close_cell()
+            table = self._open_tables.pop()
+            table['rows'] = [row for row in table['rows'] if any(row)]
+            self.tables.append(table)
+
+        if self._post is not None and tag == self._post[0]:
+            self._post[1] -= 1
+            if not self._post[1]:
+                self.posts.append(collapse(''.join(self._post[2])))
+                self._post = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        self._text.append(data)
+        for pieces in (self._heading, self._cell, self._link and self._link[1], self._post and self._post[2]):
+            if pieces is not None:
+                pieces.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+        self._close_cell()
+        while self._open_tables:
+            self.tables.append(self._open_tables.pop())
+        if self._post is not None:
+            self.posts.append(collapse(''.join(self._post[2])))
+            self._post = None
+
+def is_rubric(table):
+    header = ' '.join(table['rows'][0]).lower() if table['rows'] else ''
+    return 'rubric' in table['class'].lower() or 'criteri' in header
+
+def parse_page(url, html):
+    """Turn one page's HTML into a record: content page, discussion thread or rubric"""
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    record = {
+        'url': url,
+        'kind': 'content',
+        'title': collapse(parser.title),
+        'headings': parser.headings,
+        'text': '\n'.join(parser.blocks),
+        'links': parser.links,
+        'tables': [table['rows'] for table in parser.tables],
+    }
+    rubrics = [table for table in parser.tables if is_rubric(table)]
+    if parser.posts or '/discussions/' in url:
+        record['kind'] = 'discussion'
+        record['posts'] = parser.posts
+    elif rubrics:
+        record['kind'] = 'rubric'
+        record['criteria'] = [{'criterion': row[0], 'levels': row[1:]}
+                              for table in rubrics for row in table['rows'][1:] if row]
+    return record
+
+def parse_chunk(pages):
+    """Worker entry point: parse a list of (url, html); a page that fails yields an error record"""
+    records = []
+    for url, html in pages:
+        try:
+            records.append(parse_page(url, html))
+        except Exception as e:
+            records.append({'url': url, 'error': f"{type(e).__name__}: {e}"})
+    return records
+
+class ParsePipeline:
+    """Parses scraped page HTML in a process pool, off the asyncio loop.
+
+    Pages are grouped into chunks of about chunk_bytes so each round trip
+    to a worker pickles one list instead of many small messages, and at
+    most two chunks per worker are in flight so a fast producer cannot
+    queue up the whole crawl in memory. Records come back in the order the
+    pages went in. workers=0 parses in this process (for comparison).
+    """
+
+    def __init__(self, workers=None, chunk_bytes=256 * 1024, max_chunk_pages=64):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_bytes = chunk_bytes
+        self.max_chunk_pages = max_chunk_pages
+        self.pages = 0
+        self.chunks = 0
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        return self._executor
+
+    async def _chunked(self, pages):
+        chunk, size = [], 0
+        if hasattr(pages, '__aiter__'):
+            async for url, html in pages:
+                chunk.append((url, html))
+                size += len(html)
+                if size >= self.chunk_bytes or len(chunk) >= self.max_chunk_pages:
+                    yield chunk
+                    chunk, size = [], 0
+        else:
+            for url, html in pages:
+                chunk.append((url, html))
+                size += len(html)
+                if size >= self.chunk_bytes or len(chunk) >= self.max_chunk_pages:
+                    yield chunk
+                    chunk, size = [], 0
+        if chunk:
+            yield chunk
+
+    async def parse(self, pages):
+        """Yield a record per (url, html) in pages, which may be an iterable or an async iterable"""
+        loop = asyncio.get_event_loop()
+        pending = collections.deque()
+        limit = max(2, self.workers * 2)
+        async for chunk in self._chunked(pages):
+            self.pages += len(chunk)
+            self.chunks += 1
+            if not self.workers:
+                with span('parse.chunk', pages=len(chunk)):
+                    records = parse_chunk(chunk)
+                for record in records:
+                    yield record
+                await asyncio.sleep(0)
+                continue
+            pending.append(loop.run_in_executor(self.executor, parse_chunk, chunk))
+            # Hand back finished chunks as soon as the oldest one is ready
+            while pending and (len(pending) >= limit or pending[0].done()):
+                for record in await pending.popleft():
+                    yield record
+        while pending:
+            for record in await pending.popleft():
+                yield record
+
+    async def parse_all(self, pages):
+        return [record async for record in self.parse(pages)]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+# Benchmark: pages/second over a corpus of saved pages for 0 (in-process)
+# up to cpu_count workers, and how long the asyncio loop stalls meanwhile.
+# Usage: python parse_pool.py [corpus_dir] [--pages N]
+# Without corpus_dir, a synthetic corpus of content pages, discussion threads
+# and rubrics is written to a temporary directory first.
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    import time
+
+    def synthetic_page(i):
+        words = ("homework quiz exam lecture syllabus project lab midterm final reading chapter assignment "
+                 "rubric discussion grade deadline slides notes module review solution").split()
+
+        def sentence(n=14):
+            return ' '.join(random.choice(words) for _ in range(n)).capitalize() + '.'
+
+        head = f"<html><head><title>Page {i}</title><script>var d2l = {{}};{'x' * 2000}</script>" \
+               f"<style>.d2l {{ color: red }}</style></head><body><div class='d2l-page'>"
+        kind = i % 3
+        if kind == 0:
+            body = f"<h1>Week {i % 15} notes</h1>" + ''.join(
+                f"<p>{sentence()} <a href='/d2l/le/content/{i}/{j}'>{sentence(3)}</a></p>" for j in range(60))
+        elif kind == 1:
+            body = f"<h1>Discussion {i}</h1>" + ''.join(
+                f"<div class='d2l-discussion-post'><div class='author'>Student {j}</div>"
+                f"<div class='d2l-htmlblock'><p>{sentence()}</p><p>{sentence()}</p></div></div>" for j in range(40))
+        else:
+            body = f"<h1>Rubric {i}</h1><table class='d2l-rubric'><tr><th>Criteria</th><th>Excellent</th>" \
+                   f"<th>Good</th><th>Poor</th></tr>" + ''.join(
+                       f"<tr><td>{sentence(4)}<td>{sentence(8)}<td>{sentence(8)}<td>{sentence(8)}</tr>"
+                       for _ in range(25)) + "</table>"
+        return head + body + "</div></body></html>"
+
+    def load_corpus(path, limit):
+        pages = []
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(('.html', '.htm')):
+                    with open(os.path.join(root, name), encoding='utf-8', errors='replace') as f:
+                        pages.append((f"file://{os.path.join(root, name)}", f.read()))
+        return pages[:limit]
+
+    async def measure(pages, workers):
+        """(seconds, records, worst asyncio loop stall in seconds)"""
+        loop = asyncio.get_event_loop()
+        worst = 0.0
+        running = True
+
+        async def heartbeat():
+            nonlocal worst
+            while running:
+                before = loop.time()
+                await asyncio.sleep(0.005)
+                worst = max(worst, loop.time() - before - 0.005)
+
+        pipeline = ParsePipeline(workers)
+        if workers:
+            # Start the worker processes outside the timed region
+            await loop.run_in_executor(pipeline.executor, parse_chunk, pages[:1])
+        beat = asyncio.ensure_future(heartbeat())
+        start = time.perf_counter()
+        records = await pipeline.parse_all(pages)
+        elapsed = time.perf_counter() - start
+        running = False
+        await beat
+        pipeline.close()
+        return elapsed, records, worst
+
+    def synthetic_corpus(directory, count):
+        for i in range(count):
+            with open(os.path.join(directory, f"page{i:05d}.html"), 'w') as f:
+                f.write(synthetic_page(i))
+        return directory
+
+    async def main(options):
+        if options.corpus is not None:
+            await benchmark(options.corpus, options.pages)
+            return
+        with tempfile.TemporaryDirectory(prefix='brightspace-pages-') as corpus:
+            await benchmark(synthetic_corpus(corpus, options.pages), options.pages)
+
+    async def benchmark(corpus, count):
+        pages = load_corpus(corpus, count)
+        size = sum(len(html) for _, html in pages)
+        print(f"📄 {len(pages)} pages, {size / 1e6:.1f} MB from {corpus}")
+
+        baseline = None
+        counts = [0] + sorted({1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+        for workers in counts:
+            elapsed, records, worst = await measure(pages, workers)
+            assert [record['url'] for record in records] == [url for url, _ in pages], "records out of order"
+            rate = len(pages) / elapsed
+            baseline = baseline or rate
+            label = "in-process" if not workers else f"{workers} worker{'s' if workers > 1 else ''}"
+            print(f"   {label:>12}: {rate:7.0f} pages/s ({rate / baseline:4.1f}x), "
+                  f"worst loop stall {worst * 1000:6.1f} ms")
+        kinds = collections.Counter(record.get('kind', 'error') for record in records)
+        print(f"   kinds: {dict(kinds)}")
+
+    parser = argparse.ArgumentParser(description="Parse pipeline benchmark")
+    parser.add_argument('corpus', nargs='?', help="directory of saved .html pages")
+    parser.add_argument('--pages', type=int, default=600)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -0,0 +1,238 @@
+import asyncio
+import base64
+import fnmatch
+import time
+
+# CDP resource types that automation never needs to download
+DEFAULT_BLOCK_TYPES = ('Image', 'Media', 'Font')
+
+# Third-party analytics and tag managers Brightspace pages pull in. These are
+# answered with an empty script instead of failing, so page code that checks
+# for them keeps running.
+DEFAULT_STUB_URLS = (
+    '*google-analytics.com/*',
+    '*googletagmanager.com/*',
+    '*doubleclick.net/*',
+    '*hotjar.com/*',
+    '*nr-data.net/*',
+    '*newrelic.com/*',
+    '*pendo.io/*',
+)
+
+# Smallest valid response per resource type for stubbed requests
+TRANSPARENT_GIF = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+STUB_BODIES = {
+    'Image': ('image/gif', TRANSPARENT_GIF),
+    'Script': ('application/javascript', b''),
+    'Stylesheet': ('text/css', b''),
+    'XHR': ('application/json', b'{}'),
+    'Fetch': ('application/json', b'{}'),
+}
+
+class PageLoadStats:
+    def __init__(self, url):
+        self.url = url
+        self.load_ms = 0.0
+        self.bytes_received = 0
+        self.blocked = {}  # resource type -> count
+        self.stubbed = {}
+        self.saved_bytes = None
+        self.saved_ms = None
+        self.calibrating = False
+        self.response = None  # the main document's pyppeteer Response
+
+    @property
+    def status(self):
+        return self.response.status if self.response is not None else None
+
+    @property
+    def headers(self):
+        return self.response.headers if self.response is not None else None
+
+    def summary(self):
+        line = (f"{self.url}: {self.load_ms:.0f} ms, {self.bytes_received / 1024:.0f} KB, "
+                f"{sum(self.blocked.values())} blocked, {sum(self.stubbed.values())} stubbed")
+        if self.saved_bytes is not None:
+            line += f", saved {self.saved_bytes / 1024:.0f} KB"
+        if self.saved_ms is not None:
+            line += f" / {self.saved_ms:.0f} ms"
+        return line
+
+class ResourcePolicy:
+    """Drops or stubs heavy resources on automation-opened tabs via CDP Fetch.
+
+    Only requests matching a blocked resource type or URL pattern are paused
+    (Fetch.enable patterns), so everything else loads with no extra round
+    trip. allow_urls always wins over the deny lists. Patterns use the same
+    '*' wildcards as CDP.
+
+    Savings are measured against an uninterrupted load of the same URL taken
+    with calibrate(); without one, bytes saved are estimated from the average
+    size per resource type seen while calibrating.
+
+    Never attach this to the tab the user logs in with: the login flow needs
+    its images and scripts, and the user is looking at it.
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES, stub_types=(), block_urls=(),
+                 stub_urls=DEFAULT_STUB_URLS, allow_urls=()):
+        self.block_types = set(block_types)
+        self.stub_types = set(stub_types)
+        self.block_urls = list(block_urls)
+        self.stub_urls = list(stub_urls)
+        self.allow_urls = list(allow_urls)
+        self.baselines = {}  # url -> (bytes, ms) of an unintercepted load
+        self.type_sizes = {}  # resource type -> (total bytes, count) seen while calibrating
+        self.loads = []
+        self._pages = {}  # page -> [listeners, PageLoadStats of the load in progress, requestId -> type]
+
+    def patterns(self):
+        patterns = [{'urlPattern': '*', 'resourceType': resource_type, 'requestStage': 'Request'}
+                    for resource_type in sorted(self.block_types | self.stub_types)]
+        patterns += [{'urlPattern': url, 'requestStage': 'Request'} for url in self.block_urls + self.stub_urls]
+        return patterns
+
+    def decide(self, url, resource_type):
+        """Return 'allow', 'block' or 'stub' for a request"""
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.allow_urls):
+            return 'allow'
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.stub_urls) or resource_type in self.stub_types:
+            return 'stub'
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.block_urls) or resource_type in self.block_types:
+            return 'block'
+        return 'allow'
+
+    async def open_page(self, browser):
+        """Open a new automation tab with the policy applied"""
+        page = await browser.newPage()
+        await self.attach(page)
+        return page
+
+    async def attach(self, page):
+        if page in self._pages:
+            return
+        client = page._client
+        listeners = {
+            'Fetch.requestPaused': lambda event: asyncio.ensure_future(self._on_paused(page, event)),
+            'Network.requestWillBeSent': lambda event: self._on_request(page, event),
+            'Network.loadingFinished': lambda event: self._on_finished(page, event),
+        }
+        self._pages[page] = [listeners, None, {}]
+        for name, listener in listeners.items():
+            client.on(name, listener)
+        await client.send('Fetch.enable', {'patterns': self.patterns()})
+
+    async def detach(self, page):
+        entry = self._pages.pop(page, None)
+        if entry is None:
+            return
+        for name, listener in entry[0].items():
+            page._client.remove_listener(name, listener)
+        if not page.isClosed():
+            await page._client.send('Fetch.disable')
+
+    async def _on_paused(self, page, event):
+        url = event['request']['url']
+        resource_type = event.get('resourceType', 'Other')
+        action = self.decide(url, resource_type)
+        entry = self._pages.get(page)
+        stats = entry[1] if entry else None
+        client = page._client
+        try:
+            if action == 'block':
+                if stats is not None:
+                    stats.blocked[resource_type] = stats.blocked.get(resource_type, 0) + 1
+                await client.send('Fetch.failRequest', {'requestId': event['requestId'],
+                                                        'errorReason': 'BlockedByClient'})
+            elif action == 'stub':
+                if stats is not None:
+                    stats.stubbed[resource_type] = stats.stubbed.get(resource_type, 0) + 1
+                content_type, body = STUB_BODIES.get(resource_type, ('text/plain', b''))
+                await client.send('Fetch.fulfillRequest', {
+                    'requestId': event['requestId'],
+                    'responseCode': 200,
+                    'responseHeaders': [{'name': 'Content-Type', 'value': content_type}],
+                    'body': base64.b64encode(body).decode(),
+                })
+            else:
+                await client.send('Fetch.continueRequest', {'requestId': event['requestId']})
+        except Exception as e:
+            # The tab navigated or closed while the request was paused
+            print(f"⚠️ Could not resolve paused request {url}: {e}")
+
+    def _on_request(self, page, event):
+        entry = self._pages.get(page)
+        if entry is not None:
+            entry[2][event['requestId']] = event.get('type', 'Other')
+
+    def _on_finished(self, page, event):
+        entry = self._pages.get(page)
+        if entry is None:
+            return
+        resource_type = entry[2].pop(event['requestId'], 'Other')
+        size = int(event.get('encodedDataLength', 0))
+        if entry[1] is not None:
+            entry[1].bytes_received += size
+        # Unintercepted loads teach the average size of each resource type
+        if entry[1] is not None and entry[1].calibrating:
+            total, count = self.type_sizes.get(resource_type, (0, 0))
+            self.type_sizes[resource_type] = (total + size, count + 1)
+
+    async def _timed_goto(self, page, url, stats, **options):
+        entry = self._pages[page]
+        entry[1] = stats
+        options.setdefault('waitUntil', 'load')
+        start = time.perf_counter()
+        try:
+            stats.response = await page.goto(url, options)
+        finally:
+            stats.load_ms = (time.perf_counter() - start) * 1000
+            entry[1] = None
+        return stats
+
+    async def calibrate(self, page, url, **options):
+        """Load url once without interception to get a baseline for savings"""
+        await page._client.send('Fetch.disable')
+        stats = PageLoadStats(url)
+        stats.calibrating = True
+        try:
+            await self._timed_goto(page, url, stats, **options)
+        finally:
+            await page._client.send('Fetch.enable', {'patterns': self.patterns()})
+        self.baselines[url] = (stats.bytes_received, stats.load_ms)
+        return stats
+
+    def estimate_saved_bytes(self, stats):
+        saved = 0
+        for counts in (stats.blocked, stats.stubbed):
+            for resource_type, count in counts.items():
+                total, seen = self.type_sizes.get(resource_type, (0, 0))
+                if seen:
+                    saved += count * total / seen
+        return int(saved)
+
+    async def goto(self, page, url, **options):
+        """Navigate an attached page and record what the policy saved.
+
+        The returned PageLoadStats carries the main response, with its
+        status and headers, so callers can react to throttling.
+        """
+        stats = PageLoadStats(url)
+        await self._timed_goto(page, url, stats, **options)
+        baseline = self.baselines.get(url)
+        if baseline is not None:
+            stats.saved_bytes = baseline[0] - stats.bytes_received
+            stats.saved_ms = baseline[1] - stats.load_ms
+        else:
+            stats.saved_bytes = self.estimate_saved_bytes(stats)
+        self.loads.append(stats)
+        return stats
+
+    def totals(self):
+        return {
+            'loads': len(self.loads),
+            'blocked': sum(sum(stats.blocked.values()) for stats in self.loads),
+            'stubbed': sum(sum(stats.stubbed.values()) for stats in self.loads),
+            'saved_bytes': sum(stats.saved_bytes or 0 for stats in self.loads),
+            'saved_ms': sum(stats.saved_ms or 0 for stats in self.loads),
+        }
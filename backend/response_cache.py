@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'brightspace-bot', 'responses.sqlite3')
+
+# Per-resource freshness: the first matching path pattern wins
+DEFAULT_TTL_RULES = [
+    (r'/grades/', 60),
+    (r'/news/', 300),
+    (r'/content/', 3600),
+    (r'/enrollments/', 3600),
+    (r'/users/whoami', 86400),
+]
+
+class CachedResponse:
+    def __init__(self, key, url, status, headers, body, etag, last_modified, expires_at):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires_at
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """Persistent HTTP response cache keyed by (user, URL).
+
+    Bodies are zlib-compressed into a single SQLite file. Stale entries are
+    revalidated with If-None-Match / If-Modified-Since, and the least
+    recently used entries are evicted once the stored bytes exceed max_bytes.
+    Header dicts use lower-case names, as BrightspaceFetcher returns them.
+
+    Lookups never write: access times are kept in memory and written with
+    the next store or refresh, or every flush_interval seconds, and the
+    stored byte total is kept as a running count.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=100 * 1024 * 1024, default_ttl=300, ttl_rules=None,
+                 flush_interval=30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+        self.flush_interval = flush_interval
+        self._accessed = {}  # key -> last access not yet written to the database
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            user TEXT NOT NULL,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)')
+        self.db.commit()
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(user, url):
+        return hashlib.sha256(f"{user}\n{url}".encode()).hexdigest()
+
+    def ttl_for(self, url, headers=None):
+        cache_control = (headers or {}).get('cache-control', '')
+        match = re.search(r'max-age=(\d+)', cache_control)
+        if match:
+            return int(match.group(1))
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def is_storable(status, headers):
+        # Entries are per user, so "private" responses are fine to keep
+        return status == 200 and 'no-store' not in headers.get('cache-control', '').lower()
+
+    def lookup(self, user, url):
+        """Return the CachedResponse for (user, url), fresh or stale, or None"""
+        key = self.make_key(user, url)
+        with self._lock:
+            row = self.db.execute(
+                'SELECT status, headers, body, etag, last_modified, expires_at FROM responses WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._flush_accesses()
+                self.db.commit()
+        status, headers, body, etag, last_modified, expires_at = row
+        return CachedResponse(key, url, status, json.loads(headers), zlib.decompress(body),
+                              etag, last_modified, expires_at)
+
+    def store(self, user, url, status, headers, body):
+        if not self.is_storable(status, headers):
+            return
+        now = time.time()
+        compressed = zlib.compress(body, 6)
+        key = self.make_key(user, url)
+        with self._lock:
+            old = self.db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                key, user, url, status, json.dumps(headers), compressed, len(compressed),
+                headers.get('etag'), headers.get('last-modified'), now + self.ttl_for(url, headers), now))
+            self._accessed.pop(key, None)
+            self.total_bytes += len(compressed) - (old[0] if old else 0)
+            self._flush_accesses()
+            self._evict()
+            self.db.commit()
+
+    def refresh(self, entry, headers):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        ttl = self.ttl_for(entry.url, headers)
+        entry.expires_at = time.time() + ttl
+        etag = headers.get('etag') or entry.etag
+        with self._lock:
+            self.db.execute('UPDATE responses SET expires_at = ?, etag = ?, last_access = ? WHERE key = ?',
+                            (entry.expires_at, etag, time.time(), entry.key))
+            self._accessed.pop(entry.key, None)
+            self._flush_accesses()
+            self.db.commit()
+
+    # Counters are bumped from the fetcher's worker threads
+    def count_hit(self, size):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def count_revalidation(self, size):
+        with self._lock:
+            self.revalidations += 1
+            self.bytes_saved += size
+
+    def count_miss(self, size):
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += size
+
+    def _flush_accesses(self):
+        """Write pending access times; the caller holds the lock and commits"""
+        if self._accessed:
+            self.db.executemany('UPDATE responses SET last_access = ? WHERE key = ?',
+                                [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.monotonic()
+
+    def _evict(self):
+        # Access times are flushed first, so this sees the real LRU order
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, size in self.db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            self.db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.evictions += 1
+            self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self.db.execute('DELETE FROM responses')
+            self.db.commit()
+            self._accessed.clear()
+            self.total_bytes = 0
+
+    def stored_bytes(self):
+        return self.total_bytes
+
+    def stats(self):
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.revalidations) / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'bytes_downloaded': self.bytes_downloaded,
+            'stored_bytes': self.stored_bytes(),
+        }
+
+    def summary(self):
+        """Short description for the status line (no database access)"""
+        lookups = self.hits + self.revalidations + self.misses
+        hit_rate = (self.hits + self.revalidations) / lookups if lookups else 0.0
+        return f"cache {hit_rate:.0%} hits, {self.bytes_saved / 1024:.0f} KB saved"
+
+    def close(self):
+        with self._lock:
+            self._flush_accesses()
+            self.db.commit()
+        self.db.close()
@@ -0,0 +1,154 @@
+import re
+import time
+
+# Title matches count for more than body matches
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+class SearchResult:
+    def __init__(self, collection, record_id, course, title, snippet, score):
+        self.collection = collection
+        self.record_id = record_id
+        self.course = course
+        self.title = title
+        self.snippet = ' '.join(snippet.split()) if snippet else snippet
+        self.score = score
+
+    def describe(self):
+        where = f" ({self.course})" if self.course else ""
+        return f"{self.title}{where}: {self.snippet}" if self.snippet else f"{self.title}{where}"
+
+class SearchIndex:
+    """SQLite FTS5 index over the records kept by SyncStore.
+
+    The index is an external-content FTS5 table on SyncStore's records
+    table, kept current by triggers, so every sync updates it for free and
+    no text is stored twice.
+    """
+
+    def __init__(self, store, stale_after=3600):
+        self.store = store
+        self.db = store.db
+        self.stale_after = stale_after
+        # REPLACE only fires the delete trigger with recursive triggers on
+        self.db.execute('PRAGMA recursive_triggers = ON')
+        exists = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone()
+        self.db.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+                title, body, collection UNINDEXED,
+                content='records', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS records_search_insert AFTER INSERT ON records BEGIN
+                INSERT INTO search (rowid, title, body, collection)
+                VALUES (new.rowid, new.title, new.body, new.collection);
+            END;
+            CREATE TRIGGER IF NOT EXISTS records_search_delete AFTER DELETE ON records BEGIN
+                INSERT INTO search (search, rowid, title, body, collection)
+                VALUES ('delete', old.rowid, old.title, old.body, old.collection);
+            END;
+            CREATE TRIGGER IF NOT EXISTS records_search_update AFTER UPDATE ON records BEGIN
+                INSERT INTO search (search, rowid, title, body, collection)
+                VALUES ('delete', old.rowid, old.title, old.body, old.collection);
+                INSERT INTO search (rowid, title, body, collection)
+                VALUES (new.rowid, new.title, new.body, new.collection);
+            END;
+        ''')
+        if not exists:
+            # Records synced before the index existed
+            self.db.execute("INSERT INTO search (search) VALUES ('rebuild')")
+            # Let ORDER BY rank use the weighted bm25 so FTS5 can sort internally
+            self.db.execute(f"INSERT INTO search (search, rank) VALUES ('rank', 'bm25({TITLE_WEIGHT}, {BODY_WEIGHT})')")
+        self.db.commit()
+
+    @staticmethod
+    def build_match(text):
+        """Turn free text into an FTS5 query: every word must match, as a prefix"""
+        terms = re.findall(r'\w+', text.lower())
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def _search_query(self, text, limit, collections):
+        match = self.build_match(text)
+        if not match:
+            return None
+        # Rank and limit inside FTS5 first, so snippets and joins only run for the top hits
+        inner = "SELECT rowid, snippet(search, 1, '', '', '…', 10) AS snip, rank FROM search WHERE search MATCH ?"
+        params = [match]
+        if collections:
+            inner += f" AND collection IN ({', '.join('?' * len(collections))})"
+            params.extend(collections)
+        inner += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+        sql = f'''
+            SELECT r.collection, r.id, c.title, r.title, hits.snip, hits.rank
+            FROM ({inner}) hits
+            JOIN records r ON r.rowid = hits.rowid
+            LEFT JOIN records c ON c.collection = 'courses' AND c.id = r.course_id
+            ORDER BY hits.rank'''
+        return sql, params
+
+    def search(self, text, limit=5, collections=None):
+        query = self._search_query(text, limit, collections)
+        if query is None:
+            return []
+        return [SearchResult(*row) for row in self.db.execute(*query)]
+
+    def iter_search(self, text, batch_size=200, collections=None):
+        """Every match in rank order, as lists of up to batch_size results.
+
+        Rows are fetched from the cursor one batch at a time, so the first
+        batch can be shown before the rest of a large result set is read.
+        """
+        query = self._search_query(text, -1, collections)  # LIMIT -1: no limit
+        if query is None:
+            return
+        cursor = self.db.execute(*query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [SearchResult(*row) for row in rows]
+
+    def last_synced(self):
+        row = self.db.execute('SELECT MAX(started_at + duration) FROM sync_runs').fetchone()
+        return row[0] if row else None
+
+    def is_stale(self):
+        last = self.last_synced()
+        return last is None or time.time() - last > self.stale_after
+
+# Benchmark: query latency against corpus size.
+# Usage: python search_index.py
+if __name__ == "__main__":
+    import random
+    import statistics
+
+    from sync_store import SyncStore
+
+    # Course vocabulary plus a long tail of rarer words, drawn with a Zipf-like skew
+    words = ("homework quiz exam lecture syllabus project lab midterm final reading chapter "
+             "assignment rubric discussion grade deadline slides notes module review solution").split()
+    words += [''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=random.randint(4, 9))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    queries = ["midterm", "lab 3", "final project rubric", "syllabus", "hom", "lecture notes chapter"]
+
+    for size in (1000, 10000, 100000):
+        store = SyncStore(':memory:')
+        index = SearchIndex(store)
+        for course in range(20):
+            store.upsert('courses', course, {'Id': course}, title=f"CS {18000 + course}")
+        for i in range(size):
+            title = ' '.join(random.choices(words, weights, k=3)) + f" {i % 12}"
+            body = ' '.join(random.choices(words, weights, k=40))
+            store.upsert('announcements', i, {'Id': i}, course_id=i % 20, title=title, body=body)
+        store.commit()
+
+        latencies = []
+        for _ in range(20):
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"{size:>7} records: p50 {statistics.median(latencies):6.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.2f} ms")
+        store.close()
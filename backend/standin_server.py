@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StandInServer:
+    """Local HTTP/1.1 server standing in for Brightspace in benchmarks.
+
+    Routes map a path to handler(request) -> (status, headers, body), where
+    request is the BaseHTTPRequestHandler for the call and body is bytes or
+    an iterable of byte chunks (which then needs a Content-Length header).
+    Every response is delayed by `latency` seconds to mimic a real network
+    round trip, and requests and new connections are counted. With a
+    capacity, requests beyond that many in flight are answered 429 at once
+    (with Retry-After when retry_after is set), and the latency of the rest
+    grows with load, like an overloaded Brightspace.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, capacity=None, retry_after=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.routes = {}
+        self.request_count = 0
+        self.connection_count = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def route(self, path, handler):
+        self.routes[path] = handler
+
+    def add_json(self, path, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.route(path, lambda request: (200, dict({'Content-Type': 'application/json'}, **(headers or {})), body))
+
+    def add_bytes(self, path, body, content_type='text/html', headers=None):
+        self.route(path, lambda request: (200, dict({'Content-Type': content_type}, **(headers or {})), body))
+
+    def add_file(self, path, file_path, content_type='application/octet-stream', fail_after=None, chunk_size=65536):
+        """Serve a file from disk in chunks, with Range and If-Range support.
+
+        fail_after=n drops the connection after n body bytes on the first
+        request for the file, standing in for an interrupted transfer.
+        """
+        size = os.path.getsize(file_path)
+        etag = f'"{size:x}-{int(os.path.getmtime(file_path)):x}"'
+        failures = [fail_after] if fail_after is not None else []
+
+        def read(start, end, limit):
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                remaining = end - start if limit is None else min(end - start, limit)
+                while remaining > 0:
+                    chunk = f.read(min(chunk_size, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+
+        def handler(request):
+            start, end, status = 0, size, 200
+            match = re.match(r'bytes=(\d+)-(\d*)$', request.headers.get('Range') or '')
+            if_range = request.headers.get('If-Range')
+            if match and (if_range is None or if_range == etag):
+                start = int(match.group(1))
+                if start >= size:
+                    return 416, {'Content-Range': f"bytes */{size}"}, b""
+                end = min(size, int(match.group(2)) + 1) if match.group(2) else size
+                status = 206
+            headers = {'Content-Type': content_type, 'Content-Length': str(end - start), 'ETag': etag,
+                       'Accept-Ranges': 'bytes'}
+            if status == 206:
+                headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+            return status, headers, read(start, end, failures.pop() if failures else None)
+
+        self.route(path, handler)
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connection_count += 1
+
+            def do_GET(self):
+                self.respond()
+
+            def do_HEAD(self):
+                self.respond(include_body=False)
+
+            def respond(self, include_body=True):
+                with server._lock:
+                    server.request_count += 1
+                    server.in_flight += 1
+                    load = server.in_flight
+                try:
+                    self.serve(include_body, load)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def serve(self, include_body, load):
+                handler = server.routes.get(self.path.split('?', 1)[0])
+                if server.capacity is not None and load > server.capacity:
+                    with server._lock:
+                        server.throttled_count += 1
+                    status, headers, body = 429, {'Content-Type': 'text/plain'}, b"too many requests"
+                    if server.retry_after is not None:
+                        headers['Retry-After'] = str(server.retry_after)
+                else:
+                    if server.latency:
+                        # Queueing on the server: slower the closer it runs to capacity
+                        time.sleep(server.latency * (1 + load / server.capacity if server.capacity else 1))
+                    if handler is None:
+                        status, headers, body = 404, {'Content-Type': 'text/plain'}, b"not found"
+                    else:
+                        status, headers, body = handler(self)
+                # Honour conditional requests the way Brightspace's CDN does
+                etag = headers.get('ETag')
+                if status == 200 and etag and self.headers.get('If-None-Match') == etag:
+                    status, body = 304, b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if 'Content-Length' not in headers and status != 304:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if include_body and isinstance(body, bytes):
+                    self.wfile.write(body)
+                    with server._lock:
+                        server.bytes_sent += len(body)
+                elif include_body:
+                    sent = 0
+                    for chunk in body:
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                    with server._lock:
+                        server.bytes_sent += sent
+                    if sent < int(headers['Content-Length']):
+                        self.close_connection = True  # cut short: the client sees a truncated body
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.connection_count = 0
+            self.bytes_sent = 0
+            self.throttled_count = 0
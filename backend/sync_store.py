@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import sqlite3
+import time
+from urllib.parse import quote, unquote
+
+from http_fetcher import LE_VERSION, LP_VERSION
+from tracing import span
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'brightspace-bot', 'sync.sqlite3')
+
+COLLECTIONS = ('courses', 'announcements', 'content_modules', 'grades')
+
+# Failures that skip one part of one course instead of failing the whole sync
+# (HTTP errors, network errors once retries run out, malformed JSON)
+COURSE_ERRORS = (RuntimeError, OSError, ValueError, KeyError, http.client.HTTPException, asyncio.TimeoutError)
+
+class SyncStore:
+    """Local SQLite copy of synced Brightspace records plus per-collection high-water marks"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS records (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                course_id TEXT,
+                title TEXT,
+                body TEXT,
+                modified TEXT,
+                hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (collection, id)
+            );
+            CREATE INDEX IF NOT EXISTS records_course ON records (collection, course_id);
+            CREATE TABLE IF NOT EXISTS high_water_marks (
+                collection TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                mark TEXT NOT NULL,
+                PRIMARY KEY (collection, scope)
+            );
+            CREATE TABLE IF NOT EXISTS sync_runs (
+                started_at REAL NOT NULL,
+                duration REAL NOT NULL,
+                full INTEGER NOT NULL,
+                stats TEXT NOT NULL
+            );
+        ''')
+        self.db.commit()
+
+    @staticmethod
+    def record_hash(data):
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def upsert(self, collection, record_id, data, course_id=None, title=None, body=None, modified=None):
+        """Insert or update a record and return 'new', 'changed' or 'unchanged'"""
+        record_id = str(record_id)
+        digest = self.record_hash(data)
+        row = self.db.execute('SELECT hash FROM records WHERE collection = ? AND id = ?',
+                              (collection, record_id)).fetchone()
+        if row is not None and row[0] == digest:
+            return 'unchanged'
+        self.db.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            collection, record_id, None if course_id is None else str(course_id), title, body, modified,
+            digest, json.dumps(data), time.time()))
+        return 'new' if row is None else 'changed'
+
+    def prune(self, collection, keep_ids, course_id=None):
+        """Delete the collection's records (in course_id, if given) not in keep_ids; return their ids"""
+        keep = {str(record_id) for record_id in keep_ids}
+        if course_id is None:
+            rows = self.db.execute('SELECT id FROM records WHERE collection = ?', (collection,))
+        else:
+            rows = self.db.execute('SELECT id FROM records WHERE collection = ? AND course_id = ?',
+                                   (collection, str(course_id)))
+        stale = [record_id for (record_id,) in rows if record_id not in keep]
+        self.db.executemany('DELETE FROM records WHERE collection = ? AND id = ?',
+                            [(collection, record_id) for record_id in stale])
+        return stale
+
+    def delete_course(self, course_id):
+        """Drop everything synced for a course the user is no longer enrolled in; return how many records"""
+        deleted = self.db.execute('DELETE FROM records WHERE course_id = ?', (str(course_id),)).rowcount
+        self.db.execute('DELETE FROM high_water_marks WHERE scope = ?', (str(course_id),))
+        return deleted
+
+    def has(self, collection, record_id):
+        return self.db.execute('SELECT 1 FROM records WHERE collection = ? AND id = ?',
+                               (collection, str(record_id))).fetchone() is not None
+
+    def count(self, collection, course_id=None):
+        if course_id is None:
+            return self.db.execute('SELECT COUNT(*) FROM records WHERE collection = ?', (collection,)).fetchone()[0]
+        return self.db.execute('SELECT COUNT(*) FROM records WHERE collection = ? AND course_id = ?',
+                               (collection, str(course_id))).fetchone()[0]
+
+    def records(self, collection, course_id=None):
+        if course_id is None:
+            rows = self.db.execute('SELECT data FROM records WHERE collection = ?', (collection,))
+        else:
+            rows = self.db.execute('SELECT data FROM records WHERE collection = ? AND course_id = ?',
+                                   (collection, str(course_id)))
+        return [json.loads(data) for (data,) in rows]
+
+    def get_mark(self, collection, scope=''):
+        row = self.db.execute('SELECT mark FROM high_water_marks WHERE collection = ? AND scope = ?',
+                              (collection, str(scope))).fetchone()
+        return row[0] if row else None
+
+    def set_mark(self, collection, mark, scope=''):
+        self.db.execute('INSERT OR REPLACE INTO high_water_marks VALUES (?, ?, ?)', (collection, str(scope), mark))
+
+    def record_run(self, started_at, duration, full, stats):
+        self.db.execute('INSERT INTO sync_runs VALUES (?, ?, ?, ?)', (started_at, duration, int(full), json.dumps(stats)))
+        self.commit()
+
+    def last_full_duration(self):
+        row = self.db.execute('SELECT duration FROM sync_runs WHERE full = 1 ORDER BY started_at DESC LIMIT 1').fetchone()
+        return row[0] if row else None
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+class SyncStats:
+    def __init__(self):
+        self.counts = {collection: {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0}
+                       for collection in COLLECTIONS}
+        self.requests = 0
+        self.duration = 0.0
+        self.time_saved = None
+
+    def add(self, collection, outcome, amount=1):
+        self.counts[collection][outcome] += amount
+
+    def as_dict(self):
+        return {'counts': self.counts, 'requests': self.requests, 'duration': self.duration,
+                'time_saved': self.time_saved}
+
+    def summary(self):
+        parts = []
+        for collection, counts in self.counts.items():
+            parts.append(f"{collection}: {counts['new']} new, {counts['changed']} changed, "
+                         f"{counts['unchanged']} unchanged, {counts['deleted']} deleted")
+        line = '; '.join(parts) + f" ({self.requests} requests, {self.duration:.1f}s"
+        if self.time_saved is not None:
+            line += f", {self.time_saved:.1f}s saved vs full sync"
+        return line + ")"
+
+class SyncEngine:
+    """Incrementally syncs courses, announcements, content modules and grades.
+
+    Announcements are requested with ?since= from the per-course high-water
+    mark, content tables of contents are skipped when their hash matches the
+    one stored with the modules they produced, and everything else is diffed by content hash so
+    unchanged records are never rewritten. Records missing from a complete
+    listing were deleted upstream and are removed from the store; since a
+    ?since= listing never shows deletions, announcements are listed in full
+    once every `reconcile_after` seconds.
+    """
+
+    def __init__(self, fetcher, store, reconcile_after=24 * 3600):
+        self.fetcher = fetcher
+        self.store = store
+        self.reconcile_after = reconcile_after
+
+    async def _get_json(self, path, stats, full=False):
+        stats.requests += 1
+        # A full sync bypasses cached copies for its own requests only
+        response = await self.fetcher.get(path, {'Accept': 'application/json'}, use_cache=not full)
+        if not response.ok:
+            raise RuntimeError(f"GET {response.url} returned HTTP {response.status}")
+        return response.json(), response
+
+    async def sync_courses(self, stats, full=False):
+        courses = []
+        bookmark = None
+        while True:
+            path = f'/d2l/api/lp/{LP_VERSION}/enrollments/myenrollments/?orgUnitTypeId=3'
+            if bookmark:
+                path += f'&bookmark={quote(bookmark)}'
+            page, _ = await self._get_json(path, stats, full)
+            for item in page.get('Items', []):
+                org_unit = item['OrgUnit']
+                outcome = self.store.upsert('courses', org_unit['Id'], item, title=org_unit.get('Name'),
+                                            body=org_unit.get('Code'))
+                stats.add('courses', outcome)
+                courses.append(org_unit['Id'])
+            paging = page.get('PagingInfo') or {}
+            if not paging.get('HasMoreItems'):
+                break
+            bookmark = paging.get('Bookmark')
+        for course_id in self.store.prune('courses', courses):
+            stats.add('courses', 'deleted')
+            self.store.delete_course(course_id)
+        return courses
+
+    async def sync_announcements(self, course_id, stats, full):
+        since = None if full else self.store.get_mark('announcements', course_id)
+        listed = self.store.get_mark('announcements.listed', course_id)
+        if since and (listed is None or time.time() - float(listed) > self.reconcile_after):
+            since = None  # only a complete listing shows what was deleted
+        path = f'/d2l/api/le/{LE_VERSION}/{course_id}/news/'
+        if since:
+            path += f'?since={quote(since)}'
+        items, _ = await self._get_json(path, stats, full)
+        mark = since
+        seen = 0
+        ids = []
+        for item in items:
+            ids.append(item['Id'])
+            modified = item.get('LastModifiedDate') or item.get('StartDate')
+            outcome = self.store.upsert('announcements', item['Id'], item, course_id=course_id,
+                                        title=item.get('Title'), body=(item.get('Body') or {}).get('Text'),
+                                        modified=modified)
+            stats.add('announcements', outcome)
+            seen += 1
+            if modified and (mark is None or modified > mark):
+                mark = modified
+        if since:
+            # Everything older than the mark was not re-sent and is unchanged
+            stats.add('announcements', 'unchanged', max(0, self.store.count('announcements', course_id) - seen))
+        else:
+            stats.add('announcements', 'deleted', len(self.store.prune('announcements', ids, course_id)))
+            self.store.set_mark('announcements.listed', f"{time.time():.0f}", course_id)
+        if mark:
+            self.store.set_mark('announcements', mark, course_id)
+
+    async def sync_content(self, course_id, stats, full):
+        toc, _ = await self._get_json(f'/d2l/api/le/{LE_VERSION}/{course_id}/content/toc', stats, full)
+        # Compared against the store itself, not the response cache: the two are
+        # committed separately and a cached toc says nothing about what was stored
+        toc_hash = self.store.record_hash(toc)
+        if not full and self.store.get_mark('content_toc', course_id) == toc_hash:
+            stats.add('content_modules', 'unchanged', self.store.count('content_modules', course_id))
+            return
+        mark = self.store.get_mark('content_modules', course_id)
+        newest = mark
+        stack = list(toc.get('Modules', []))
+        ids = []
+        while stack:
+            module = stack.pop()
+            stack.extend(module.get('Modules', []))
+            ids.append(module['ModuleId'])
+            modified = module.get('LastModifiedDate')
+            if not full and mark and modified and modified <= mark and \
+                    self.store.has('content_modules', module['ModuleId']):
+                stats.add('content_modules', 'unchanged')
+                continue
+            topics = [{'Id': t.get('TopicId'), 'Title': t.get('Title'), 'Url': t.get('Url')}
+                      for t in module.get('Topics', [])]
+            record = dict(module, Modules=None, Topics=topics)
+            # Searchable text: the description plus topic titles and file names
+            searchable = [(module.get('Description') or {}).get('Text') or '']
+            for topic in topics:
+                searchable.append(topic['Title'] or '')
+                if topic['Url']:
+                    searchable.append(unquote(topic['Url'].rsplit('/', 1)[-1]))
+            outcome = self.store.upsert('content_modules', module['ModuleId'], record, course_id=course_id,
+                                        title=module.get('Title'), body='\n'.join(searchable), modified=modified)
+            stats.add('content_modules', outcome)
+            if modified and (newest is None or modified > newest):
+                newest = modified
+        stats.add('content_modules', 'deleted', len(self.store.prune('content_modules', ids, course_id)))
+        if newest:
+            self.store.set_mark('content_modules', newest, course_id)
+        self.store.set_mark('content_toc', toc_hash, course_id)
+
+    async def sync_grades(self, course_id, stats, full):
+        grades, _ = await self._get_json(
+            f'/d2l/api/le/{LE_VERSION}/{course_id}/grades/values/myGradeValues/', stats, full)
+        ids = []
+        for grade in grades:
+            ids.append(f"{course_id}:{grade.get('GradeObjectIdentifier')}")
+            outcome = self.store.upsert('grades', ids[-1], grade,
+                                        course_id=course_id, title=grade.get('GradeObjectName'),
+                                        body=grade.get('DisplayedGrade'))
+            stats.add('grades', outcome)
+        stats.add('grades', 'deleted', len(self.store.prune('grades', ids, course_id)))
+
+    async def _sync_course(self, course_id, stats, full):
+        # A course without a given tool answers 403/404; that only skips that collection
+        for step in (self.sync_announcements, self.sync_content, self.sync_grades):
+            try:
+                # Each coroutine is created only when its turn comes
+                await step(course_id, stats, full)
+            except COURSE_ERRORS as e:
+                print(f"⚠️ Skipping part of course {course_id}: {e}")
+
+    async def run(self, full=False, progress=print):
+        """Sync everything; full=True ignores high-water marks and cached validators"""
+        started_at = time.time()
+        start = time.perf_counter()
+        stats = SyncStats()
+        with span('sync', full=full):
+            progress("🔄 Syncing courses...")
+            with span('sync.courses'):
+                courses = await self.sync_courses(stats, full)
+            progress(f"🔄 Syncing {len(courses)} courses...")
+            await asyncio.gather(*(self._sync_course(course_id, stats, full) for course_id in courses))
+            self.store.commit()
+
+        stats.duration = time.perf_counter() - start
+        last_full = self.store.last_full_duration()
+        if not full and last_full is not None:
+            stats.time_saved = last_full - stats.duration
+        self.store.record_run(started_at, stats.duration, full, stats.as_dict())
+        progress(f"✅ Sync finished: {stats.summary()}")
+        return stats
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from pyppeteer.errors import NetworkError, PageError, TimeoutError as NavigationTimeout
+
+from tracing import span
+from traffic import RETRY_ERRORS, THROTTLE_STATUSES, default_scheduler
+
+# Navigation failures worth retrying (net::ERR_* pages, timeouts, dropped CDP responses)
+NAVIGATION_ERRORS = RETRY_ERRORS + (PageError, NetworkError, NavigationTimeout)
+
+class CrawlResult:
+    def __init__(self, url, data=None, error=None, elapsed=0.0):
+        self.url = url
+        self.data = data
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+async def default_extract(page, url):
+    return {'url': page.url, 'title': await page.title()}
+
+async def html_extract(page, url):
+    """The page's HTML, to be parsed outside the browser loop (see parse_pool.ParsePipeline)"""
+    return await page.content()
+
+class TabPool:
+    """Reusable automation tabs, each closed after `recycle_after` navigations.
+
+    Tabs are opened lazily, through the ResourcePolicy when one is given, so
+    the pool never holds more tabs than the crawl actually uses. Recycling
+    bounds how much memory a long-lived renderer can accumulate.
+    """
+
+    def __init__(self, browser, recycle_after=20, policy=None, profiler=None):
+        self.browser = browser
+        self.recycle_after = recycle_after
+        self.policy = policy
+        self.profiler = profiler
+        self.idle = []
+        self.uses = {}
+        self.opened = 0
+        self.recycled = 0
+
+    async def acquire(self):
+        if self.idle:
+            return self.idle.pop()
+        if self.policy is not None:
+            page = await self.policy.open_page(self.browser)
+        else:
+            page = await self.browser.newPage()
+        self.uses[page] = 0
+        self.opened += 1
+        return page
+
+    async def release(self, page, broken=False):
+        self.uses[page] += 1
+        if broken or self.uses[page] >= self.recycle_after:
+            await self.discard(page)
+            self.recycled += 1
+        else:
+            self.idle.append(page)
+
+    async def discard(self, page):
+        """Forget the tab and close it; a tab that fails to close does not stop the crawl"""
+        del self.uses[page]
+        if self.profiler is not None:
+            self.profiler.detach(page)
+        try:
+            try:
+                if self.policy is not None:
+                    await self.policy.detach(page)
+            finally:
+                if not page.isClosed():
+                    await page.close()
+        except Exception as e:
+            print(f"⚠️ Could not close tab {page.url}: {e}")
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for page in idle:
+            await self.discard(page)
+
+class TabCrawler:
+    """Visits many Brightspace URLs across a pool of tabs on one CDP connection.
+
+    At most `concurrency` navigations are in flight (an asyncio semaphore),
+    each on its own tab from the TabPool. extract(page, url) runs once the
+    page has loaded and its return value becomes CrawlResult.data. A failed
+    URL does not stop the crawl; its tab is closed in case it is left in a
+    bad state. With a PageProfiler, every load's metrics are recorded too.
+    Navigations take slots from the TrafficScheduler, so a throttled host
+    gets fewer parallel loads and failed loads are retried with backoff.
+    """
+
+    def __init__(self, browser, concurrency=4, recycle_after=20, policy=None, extract=default_extract,
+                 wait_until='load', timeout=30000, profiler=None, traffic=None):
+        self.pool = TabPool(browser, recycle_after=recycle_after, policy=policy, profiler=profiler)
+        self.policy = policy
+        self.profiler = profiler
+        self.concurrency = concurrency
+        self.extract = extract
+        self.wait_until = wait_until
+        self.timeout = timeout
+        self.traffic = traffic or default_scheduler
+        self.elapsed = 0.0
+
+    async def _navigate(self, page, url):
+        def goto():
+            if self.policy is not None:
+                return self.policy.goto(page, url, waitUntil=self.wait_until, timeout=self.timeout)
+            return page.goto(url, waitUntil=self.wait_until, timeout=self.timeout)
+
+        response = await self.traffic.call(urlsplit(url).hostname, goto, retry_on=NAVIGATION_ERRORS,
+                                           kind='navigation')
+        if getattr(response, 'status', None) in THROTTLE_STATUSES:
+            raise PageError(f"{url} returned HTTP {response.status}")
+
+    async def _visit(self, semaphore, url, progress):
+        async with semaphore:
+            with span('crawl.acquire_tab'):
+                page = await self.pool.acquire()
+            start = time.perf_counter()
+            broken = False
+            try:
+                with span('crawl.navigate', url=url):
+                    if self.profiler is not None:
+                        await self.profiler.record(page, lambda: self._navigate(page, url), url)
+                    else:
+                        await self._navigate(page, url)
+                with span('crawl.extract', url=url):
+                    result = CrawlResult(url, data=await self.extract(page, url))
+            except Exception as e:
+                broken = True
+                result = CrawlResult(url, error=str(e))
+            result.elapsed = time.perf_counter() - start
+            await self.pool.release(page, broken=broken)
+            progress(result)
+            return result
+
+    async def crawl(self, urls, progress=lambda result: None):
+        """Visit every URL and return CrawlResults in input order"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        try:
+            with span('crawl', urls=len(urls), concurrency=self.concurrency):
+                return await asyncio.gather(*(self._visit(semaphore, url, progress) for url in urls))
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def pages_per_second(self, count):
+        return count / self.elapsed if self.elapsed else 0.0
+
+    async def close(self):
+        await self.pool.close()
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import shutil
+import subprocess
+from html.parser import HTMLParser
+
+import pytest
+from pyppeteer import connect
+
+from dom_extract import PAGE_SUMMARY, Field, List, Schema, normalize
+from fake_cdp import FakeCDPServer
+
+PAGE_URL = 'https://purdue.brightspace.com/d2l/lms/news/main.d2l?ou=1'
+ANNOUNCEMENT = '''
+    <div class="d2l-datalist-item d2l-datalist-simpleitem">
+      <h3 class="d2l-heading vui-heading-4">
+        <a class="d2l-link" href="/d2l/le/news/{week}">Week {week}
+          <span>update</span></a>
+      </h3>
+      <span class="d2l-dates-text" title="Sep {day}, 2024">Posted Sep {day}, 2024 9:00 AM</span>
+      <div class="d2l-htmlblock"><p>Slides &amp; lab for week {week} are up.</p></div>
+      <ul class="d2l-attachment">
+        <li><a href="/d2l/common/viewFile.d2lfile/{week}/week{week}-slides.pdf">week{week}-slides.pdf</a></li>
+        <li><a href="/d2l/common/viewFile.d2lfile/{week}/week{week}-lab.zip">week{week}-lab.zip</a></li>
+      </ul>
+    </div>'''
+# Trimmed markup saved from a course announcements page
+PAGE_HTML = f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>Announcements - CS 18000</title>
+  <link rel="stylesheet" href="/d2l/lp/navbars/6606/theme.css">
+</head>
+<body>
+  <a name="top"></a>
+  <nav><div class="d2l-navigation-s-title">
+    CS 18000: Problem Solving And Object-Oriented Programming
+  </div></nav>
+  <h1 class="d2l-page-title">Announcements</h1>
+  <div class="d2l-datalist">{"".join(ANNOUNCEMENT.format(week=week, day=week + 1) for week in range(1, 13))}
+  </div>
+  <br>
+  <a href="#top">Back to top</a>
+</body>
+</html>'''
+# What the page shows for those announcements
+RECORDED = {
+    'course': 'CS 18000: Problem Solving And Object-Oriented Programming',
+    'announcements': [
+        {'title': f"Week {week} update", 'date': f"Sep {week + 1}, 2024",
+         'href': f"https://purdue.brightspace.com/d2l/le/news/{week}",
+         'attachments': [f"week{week}-slides.pdf", f"week{week}-lab.zip"]}
+        for week in range(1, 13)
+    ],
+}
+ANNOUNCEMENTS = Schema({
+    'course': '.d2l-navigation-s-title',
+    'announcements': List('.d2l-datalist-item', {
+        'title': 'h3',
+        'date': ('.d2l-dates-text', 'title'),
+        'href': ('a', 'href'),
+        'attachments': Field('.d2l-attachment a', all=True),
+    }),
+})
+
+# Just enough DOM for the extraction scripts: elements parsed from the page,
+# compound selectors (tag, .class, #id, [attr], [attr=value]) joined by
+# descendant combinators, textContent/innerHTML/getAttribute and resolved
+# href/src. Reads the page as a JSON tree, then answers one expression per line.
+DOM_SHIM = r'''
+const readline = require('readline');
+const escape = s => s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+const VOID = new Set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr']);
+
+class Node {
+  constructor(children, parent) {
+    this.parentNode = parent;
+    this.childNodes = children.map(child => typeof child === 'string' ? child : new Element(child, this));
+  }
+  get children() { return this.childNodes.filter(child => child instanceof Element); }
+  get textContent() { return this.childNodes.map(child => typeof child === 'string' ? child : child.textContent).join(''); }
+  get innerHTML() { return this.childNodes.map(child => typeof child === 'string' ? escape(child) : child.outerHTML).join(''); }
+  *descendants() {
+    for (const child of this.children) { yield child; yield* child.descendants(); }
+  }
+  querySelectorAll(selector) {
+    const steps = parseSelector(selector);
+    return Array.from(this.descendants()).filter(el => matches(el, steps, steps.length - 1));
+  }
+  querySelector(selector) { return this.querySelectorAll(selector)[0] || null; }
+}
+
+class Element extends Node {
+  constructor([tag, attrs, children], parent) {
+    super(children, parent);
+    this.tagName = tag.toUpperCase();
+    this.attributes = new Map(attrs);
+  }
+  getAttribute(name) { return this.attributes.has(name) ? this.attributes.get(name) : null; }
+  get className() { return this.getAttribute('class') || ''; }
+  get href() { return this.resolve('href'); }
+  get src() { return this.resolve('src'); }
+  resolve(name) {
+    const value = this.getAttribute(name);
+    return value === null ? '' : new URL(value, PAGE_URL).href;
+  }
+  get outerHTML() {
+    const tag = this.tagName.toLowerCase();
+    const attrs = Array.from(this.attributes, ([name, value]) => ` ${name}="${escape(value || '')}"`).join('');
+    return VOID.has(tag) ? `<${tag}${attrs}>` : `<${tag}${attrs}>${this.innerHTML}</${tag}>`;
+  }
+}
+
+const SIMPLE = /^(?:([a-zA-Z][\w-]*)|\.([\w-]+)|#([\w-]+)|\[([\w-]+)(?:=(?:"([^"]*)"|'([^']*)'|([\w-]+)))?\])/;
+
+function parseSelector(selector) {
+  const steps = selector.trim().split(/\s+/).map(compound => {
+    const tests = [];
+    let rest = compound;
+    while (rest) {
+      const m = SIMPLE.exec(rest);
+      if (!m) throw new SyntaxError(`'${selector}' is not a valid selector.`);
+      const [, tag, cls, id, attr, dq, sq, bare] = m;
+      const value = dq !== undefined ? dq : sq !== undefined ? sq : bare;
+      if (tag) tests.push(el => el.tagName === tag.toUpperCase());
+      else if (cls) tests.push(el => el.className.split(/\s+/).includes(cls));
+      else if (id) tests.push(el => el.getAttribute('id') === id);
+      else tests.push(el => value === undefined ? el.getAttribute(attr) !== null : el.getAttribute(attr) === value);
+      rest = rest.slice(m[0].length);
+    }
+    return el => tests.every(test => test(el));
+  });
+  if (!selector.trim()) throw new SyntaxError(`'${selector}' is not a valid selector.`);
+  return steps;
+}
+
+function matches(el, steps, index) {
+  if (!steps[index](el)) return false;
+  if (index === 0) return true;
+  for (let up = el.parentNode; up instanceof Element; up = up.parentNode) {
+    if (matches(up, steps, index - 1)) return true;
+  }
+  return false;
+}
+
+let PAGE_URL;
+const lines = readline.createInterface({input: process.stdin});
+lines.on('line', line => {
+  const message = JSON.parse(line);
+  if (message.tree) {
+    PAGE_URL = message.url;
+    globalThis.document = new Node(message.tree, null);
+    return;
+  }
+  let reply;
+  try {
+    reply = {value: (0, eval)(message.expression)};
+  } catch (e) {
+    reply = {error: e.stack || String(e)};
+  }
+  process.stdout.write(JSON.stringify(reply) + '\n');
+});
+'''
+
+class TreeBuilder(HTMLParser):
+    """Parse HTML into the [tag, attrs, children] tree DOM_SHIM loads"""
+
+    VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr'}
+
+    def __init__(self):
+        super().__init__()
+        self.root = []
+        self.open = [('', self.root)]
+
+    def handle_starttag(self, tag, attrs):
+        element = [tag, attrs, []]
+        self.open[-1][1].append(element)
+        if tag not in self.VOID:
+            self.open.append((tag, element[2]))
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.open) - 1, 0, -1):
+            if self.open[depth][0] == tag:
+                del self.open[depth:]
+                return
+
+    def handle_data(self, data):
+        self.open[-1][1].append(data)
+
+def parse(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+class RecordedPage:
+    """Answers Runtime.evaluate by running the expression in node against saved HTML"""
+
+    def __init__(self, html, url):
+        self.process = subprocess.Popen(['node', '-e', DOM_SHIM], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True)
+        self._send({'url': url, 'tree': parse(html)})
+
+    def _send(self, message):
+        self.process.stdin.write(json.dumps(message) + '\n')
+        self.process.stdin.flush()
+
+    def __call__(self, params):
+        self._send({'expression': params['expression']})
+        reply = json.loads(self.process.stdout.readline())
+        if 'error' in reply:
+            return {'result': {'type': 'object', 'subtype': 'error'},
+                    'exceptionDetails': {'text': 'Uncaught', 'exception': {'description': reply['error']}}}
+        return {'result': {'type': 'object', 'value': reply.get('value')}}
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait(timeout=5)
+        self.process.stdout.close()
+
+needs_node = pytest.mark.skipif(shutil.which('node') is None, reason="node is needed to run the injected scripts")
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+async def replay(extract, html=PAGE_HTML):
+    """Run extract(page) against a saved page; return (data, Runtime.evaluate count)"""
+    server = await FakeCDPServer().start()
+    await server.open_page(PAGE_URL)
+    page_html = RecordedPage(html, PAGE_URL)
+    server.handlers['Runtime.evaluate'] = page_html
+    browser = await connect(browserWSEndpoint=server.ws_endpoint)
+    try:
+        await asyncio.sleep(0.1)
+        page = (await browser.pages())[0]
+        server.reset_counters()
+        data = await extract(page)
+        return data, server.methods['Runtime.evaluate']
+    finally:
+        await browser.disconnect()
+        await server.stop()
+        page_html.close()
+
+async def per_field(page):
+    """The approach Schema replaces: count the rows, then one evaluate per field per row"""
+    async def get(expression):
+        response = await page._client.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True})
+        return response['result']['value']
+    text = ".textContent.replace(/\\s+/g, ' ').trim()"
+    data = {'course': await get(f"document.querySelector('.d2l-navigation-s-title'){text}"), 'announcements': []}
+    for i in range(await get("document.querySelectorAll('.d2l-datalist-item').length")):
+        row = f"document.querySelectorAll('.d2l-datalist-item')[{i}]"
+        data['announcements'].append({
+            'title': await get(f"{row}.querySelector('h3'){text}"),
+            'date': await get(f"{row}.querySelector('.d2l-dates-text').getAttribute('title')"),
+            'href': await get(f"{row}.querySelector('a').href"),
+            'attachments': await get(f"Array.from({row}.querySelectorAll('.d2l-attachment a')).map(a => a{text})"),
+        })
+    return data
+
+@needs_node
+def test_compiled_schema_matches_per_field_extraction():
+    expected, per_field_messages = run(replay(per_field))
+    data, schema_messages = run(replay(ANNOUNCEMENTS.extract))
+    assert expected == RECORDED
+    assert data == expected
+    assert per_field_messages == 2 + 4 * len(RECORDED['announcements'])
+    assert schema_messages == 1
+
+@needs_node
+def test_schema_can_be_used_as_crawler_extract():
+    data, _ = run(replay(lambda page: ANNOUNCEMENTS(page, page.url)))
+    assert data == RECORDED
+
+@needs_node
+def test_page_summary_reads_elements_themselves_and_html():
+    summary, _ = run(replay(PAGE_SUMMARY.extract))
+    assert summary['title'] == 'Announcements - CS 18000'
+    assert summary['heading'] == 'Announcements'
+    links = summary['links']
+    assert len(links) == 12 * 3 + 1  # the named anchor has no href
+    assert links[0] == {'text': 'Week 1 update', 'href': 'https://purdue.brightspace.com/d2l/le/news/1'}
+    assert links[1] == {'text': 'week1-slides.pdf',
+                        'href': 'https://purdue.brightspace.com/d2l/common/viewFile.d2lfile/1/week1-slides.pdf'}
+    assert links[-1] == {'text': 'Back to top', 'href': PAGE_URL + '#top'}
+
+    body = Schema({'body': Field('.d2l-htmlblock', 'html'), 'missing': '.d2l-no-such-thing'})
+    data, _ = run(replay(body.extract))
+    assert data == {'body': '<p>Slides &amp; lab for week 1 are up.</p>', 'missing': None}
+
+def test_shorthands_normalize_to_fields():
+    fields = normalize({'title': 'h3', 'date': ('.d2l-dates-text', 'title'), 'links': Field('a', all=True)})
+    assert [field.spec() for field in fields.values()] == [
+        {'selector': 'h3', 'attr': 'text', 'all': False},
+        {'selector': '.d2l-dates-text', 'attr': 'title', 'all': False},
+        {'selector': 'a', 'attr': 'text', 'all': True},
+    ]
+
+@needs_node
+def test_script_exception_raises():
+    with pytest.raises(RuntimeError, match='is not a valid selector'):
+        run(replay(Schema({'title': 'h3['}).extract))
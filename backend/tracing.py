@@ -0,0 +1,190 @@
+import asyncio
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+class Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start', 'tid')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def set(self, **args):
+        """Attach extra arguments (e.g. a status code) once they are known"""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.tid = self.tracer.track()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record({
+            'name': self.name, 'cat': self.cat, 'ph': 'X',
+            'ts': (self.start - self.tracer.origin) * 1e6, 'dur': (end - self.start) * 1e6,
+            'pid': self.tracer.pid, 'tid': self.tid, 'args': self.args,
+        })
+        return False
+
+class NullSpan:
+    """Shared stand-in returned while tracing is off"""
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracer:
+    """Collects nested timing spans and exports them as Chrome Trace Events.
+
+    Each asyncio task (or plain thread) gets its own track, so concurrent
+    crawls and fetches nest correctly in chrome://tracing or Perfetto. While
+    disabled, span() returns a shared no-op object and records nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._tracks = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        with self._lock:
+            self.events = []
+            self._tracks = {}
+        self.origin = time.perf_counter()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def track(self):
+        """Trace thread id for the current asyncio task, or thread outside a loop"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            key, label = ('task', id(task)), task.get_name()
+        else:
+            thread = threading.current_thread()
+            key, label = ('thread', thread.ident), thread.name
+        with self._lock:
+            tid = self._tracks.get(key)
+            if tid is None:
+                tid = self._tracks[key] = len(self._tracks) + 1
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                    'args': {'name': label}})
+        return tid
+
+    def record(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def span(self, name, cat='automation', **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, cat, args)
+
+    def instant(self, name, cat='automation', **args):
+        if not self.enabled:
+            return
+        self.record({'name': name, 'cat': cat, 'ph': 'i', 's': 't',
+                     'ts': (time.perf_counter() - self.origin) * 1e6,
+                     'pid': self.pid, 'tid': self.track(), 'args': args})
+
+    def export(self, path):
+        """Write the trace as Chrome Trace Event JSON (open in ui.perfetto.dev)"""
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def summary(self):
+        """Total milliseconds and count per span name, slowest first"""
+        totals = {}
+        with self._lock:
+            for event in self.events:
+                if event['ph'] == 'X':
+                    total, count = totals.get(event['name'], (0.0, 0))
+                    totals[event['name']] = (total + event['dur'] / 1000, count + 1)
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+tracer = Tracer()
+
+def span(name, cat='automation', **args):
+    """Time a block: `with span('chrome.connect'):` (works in async code too)"""
+    if not tracer.enabled:
+        return NULL_SPAN
+    return Span(tracer, name, cat, args)
+
+def instant(name, cat='automation', **args):
+    tracer.instant(name, cat, **args)
+
+def traced(name=None, cat='automation'):
+    """Decorator that wraps each call of a function or coroutine function in a span"""
+    def decorate(func):
+        label = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(label, cat):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(label, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# BRIGHTSPACE_TRACE=run.json traces the whole process and writes the file on exit
+if os.environ.get('BRIGHTSPACE_TRACE'):
+    tracer.enable()
+    atexit.register(tracer.export, os.environ['BRIGHTSPACE_TRACE'])
+
+# Overhead check: cost of a span when tracing is off and on.
+# Usage: python tracing.py
+if __name__ == "__main__":
+    iterations = 200000
+
+    def measure():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with span('noop'):
+                pass
+        return (time.perf_counter() - start) / iterations * 1e9
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    loop_ns = (time.perf_counter() - start) / iterations * 1e9
+
+    tracer.disable()
+    disabled_ns = measure() - loop_ns
+    tracer.enable()
+    enabled_ns = measure() - loop_ns
+    print(f"span overhead: {disabled_ns:.0f} ns disabled, {enabled_ns:.0f} ns enabled")
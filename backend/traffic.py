@@ -0,0 +1,420 @@
+import asyncio
+import http.client
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from tracing import instant
+
+BRIGHTSPACE_HOST = 'purdue.brightspace.com'
+
+# Responses that mean "slow down": the host's concurrency is cut and the request retried
+THROTTLE_STATUSES = frozenset({429, 503})
+# Responses worth another try after a backoff
+RETRY_STATUSES = THROTTLE_STATUSES | {502, 504}
+# Network failures retried by default
+RETRY_ERRORS = (http.client.HTTPException, ConnectionError, asyncio.TimeoutError)
+
+def retry_after_seconds(headers):
+    """Seconds from a Retry-After header (delta or HTTP date), or None"""
+    if not headers:
+        return None
+    value = next((value for name, value in headers.items() if name.lower() == 'retry-after'), None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HostState:
+    def __init__(self, rate, burst, concurrency, max_concurrency):
+        self.rate = rate  # requests/second, None for no cap
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.limit = float(concurrency)  # adaptive concurrency limit
+        self.slow_start = True  # grow by one per success until the first congestion signal
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0  # from Retry-After
+        # Per request kind, since a page load and an API call differ by orders of magnitude
+        self.base_latency = {}  # kind -> best recent latency, the uncongested baseline
+        self.latency = {}  # kind -> smoothed latency
+        self.last_decrease = 0.0
+        self.completed = deque()  # completion times inside the rate window
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.errors = 0
+        self.peak_waiting = 0
+
+class Ticket:
+    """One admitted request; report how it went with finished() or failed(), then release()"""
+
+    def __init__(self, scheduler, host, state, kind):
+        self.scheduler = scheduler
+        self.host = host
+        self.state = state
+        self.kind = kind
+        self.started = time.monotonic()
+        self.outcome = None
+        self.released = False
+
+    def finished(self, status=None, headers=None):
+        """Record the response as soon as its status is known (time to first byte is the latency sample)"""
+        self.outcome = (time.monotonic() - self.started, status, retry_after_seconds(headers), None)
+
+    def failed(self, error):
+        self.outcome = (time.monotonic() - self.started, None, None, error)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self.state, self.kind, self.outcome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self.outcome is None and isinstance(exc, RETRY_ERRORS):
+            self.failed(exc)
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+class TrafficScheduler:
+    """Admission control and retries for all traffic to Brightspace hosts.
+
+    Each host gets a token bucket (rate requests/second, burst) and an
+    adaptive concurrency limit. The limit grows by one per successful
+    request until the first sign of congestion (slow start), then by about
+    one per round of successful requests, and is cut by decrease_factor on
+    a 429/503, a network error, or latency above latency_tolerance times
+    the host's uncongested baseline (AIMD, as in TCP congestion control).
+    Baselines are kept per request kind ('api', 'navigation', 'download'),
+    so slow page loads never count as congestion for fast API calls.
+    A Retry-After pauses the whole host. Requests over the limit queue
+    until a slot frees up or their deadline passes.
+
+    Slots can be taken from threads (blocking_slot) or coroutines (slot);
+    call() and retry() add jittered exponential backoff bounded by a
+    deadline. stats() exposes queue depth and the effective request rate.
+    """
+
+    def __init__(self, rate=None, burst=None, concurrency=16, max_concurrency=16, min_concurrency=1,
+                 adaptive=True, latency_tolerance=2.0, latency_slack=0.05, decrease_factor=0.5,
+                 retries=4, backoff_base=0.25, backoff_cap=8.0, deadline=60.0, window=5.0):
+        self.defaults = {'rate': rate, 'burst': burst, 'concurrency': concurrency,
+                         'max_concurrency': max_concurrency}
+        self.overrides = {}
+        self.min_concurrency = min_concurrency
+        self.adaptive = adaptive
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.decrease_factor = decrease_factor
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.deadline = deadline
+        self.window = window
+        self.hosts = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._async_waiters = []  # (loop, future) pairs woken on every release
+
+    def configure(self, host, **settings):
+        """Per-host rate, burst, concurrency or max_concurrency, applied before its first request"""
+        self.overrides.setdefault(host, {}).update(settings)
+
+    def _host(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(**dict(self.defaults, **self.overrides.get(host, {})))
+        return state
+
+    def _try_acquire(self, state, now):
+        """0 if a slot was taken, else seconds to wait (None: until a request finishes)"""
+        if now < state.paused_until:
+            return state.paused_until - now
+        if state.in_flight >= max(self.min_concurrency, int(state.limit)):
+            return None
+        if state.rate:
+            state.tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            if state.tokens < 1:
+                return (1 - state.tokens) / state.rate
+            state.tokens -= 1
+        state.in_flight += 1
+        state.requests += 1
+        return 0
+
+    @staticmethod
+    def _timeout(wait, deadline, now):
+        if deadline is None:
+            return wait
+        return deadline - now if wait is None else min(wait, deadline - now)
+
+    def blocking_slot(self, host, deadline=None, kind='api'):
+        """Wait on this thread for a slot; use the Ticket as a context manager or release() it"""
+        with self._lock:
+            state = self._host(host)
+            state.waiting += 1
+            state.peak_waiting = max(state.peak_waiting, state.waiting)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._try_acquire(state, now)
+                    if wait == 0:
+                        return Ticket(self, host, state, kind)
+                    if deadline is not None and now >= deadline:
+                        raise TimeoutError(f"{host}: no request slot before the deadline")
+                    self._changed.wait(self._timeout(wait, deadline, now))
+            finally:
+                state.waiting -= 1
+
+    async def slot(self, host, deadline=None, kind='api'):
+        """Wait on the event loop for a slot; use as `async with await traffic.slot(host)`"""
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            state = self._host(host)
+            state.waiting += 1
+            state.peak_waiting = max(state.peak_waiting, state.waiting)
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = self._try_acquire(state, now)
+                    if wait == 0:
+                        return Ticket(self, host, state, kind)
+                    if deadline is not None and now >= deadline:
+                        raise TimeoutError(f"{host}: no request slot before the deadline")
+                    woken = loop.create_future()
+                    waiter = (loop, woken)
+                    self._async_waiters.append(waiter)
+                try:
+                    await asyncio.wait([woken], timeout=self._timeout(wait, deadline, now))
+                finally:
+                    with self._lock:
+                        if waiter in self._async_waiters:
+                            self._async_waiters.remove(waiter)
+        finally:
+            with self._lock:
+                state.waiting -= 1
+
+    def _release(self, state, kind, outcome):
+        with self._lock:
+            now = time.monotonic()
+            state.in_flight -= 1
+            state.completed.append(now)
+            while state.completed and state.completed[0] < now - self.window:
+                state.completed.popleft()
+            if outcome is not None:
+                self._record(state, kind, now, *outcome)
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, woken in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda woken=woken: woken.done() or woken.set_result(None))
+            except RuntimeError:
+                pass  # that loop has closed
+
+    def _record(self, state, kind, now, latency, status, retry_after, error):
+        """AIMD: additive increase per success, multiplicative decrease on congestion signals"""
+        if status in THROTTLE_STATUSES or error is not None:
+            if error is not None:
+                state.errors += 1
+            else:
+                state.throttled += 1
+            if retry_after:
+                state.paused_until = max(state.paused_until, now + retry_after)
+            self._decrease(state, now, state.latency.get(kind))
+            return
+        smoothed = state.latency.get(kind)
+        state.latency[kind] = latency if smoothed is None else smoothed * 0.8 + latency * 0.2
+        base = state.base_latency.get(kind)
+        if base is None or latency < base:
+            base = latency
+        else:
+            # Drift up slowly so a server that got slower for good resets the baseline
+            base += (latency - base) * 0.01
+        state.base_latency[kind] = base
+        if latency > base * self.latency_tolerance + self.latency_slack:
+            self._decrease(state, now, state.latency[kind])
+        elif self.adaptive and state.in_flight + 1 >= int(state.limit):
+            # Only grow while the current limit is actually being used
+            step = 1.0 if state.slow_start else 1 / state.limit
+            state.limit = min(state.max_concurrency, state.limit + step)
+
+    def _decrease(self, state, now, round_trip):
+        # At most once per round trip, so one burst of 429s counts as one signal
+        if not self.adaptive or now - state.last_decrease < (round_trip or 0.0):
+            return
+        state.last_decrease = now
+        state.slow_start = False
+        state.limit = max(self.min_concurrency, state.limit * self.decrease_factor)
+        instant('traffic.decrease', limit=round(state.limit, 2))
+
+    def retry_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _count_retry(self, host):
+        if host is not None:
+            with self._lock:
+                self._host(host).retries += 1
+
+    async def retry(self, send, host=None, deadline=None, retries=None, retry_on=RETRY_ERRORS):
+        """Await send() until it returns a non-retryable status, backing off between tries.
+
+        send returns something with .status and .headers (or neither, e.g. a
+        load record); after the last try its result is returned or its
+        error raised. deadline is a time.monotonic() value.
+        """
+        retries = self.retries if retries is None else retries
+        if deadline is None and self.deadline:
+            deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = await send()
+            except retry_on as e:
+                result, error = None, e
+            else:
+                error = None
+                if getattr(result, 'status', None) not in RETRY_STATUSES:
+                    return result
+            delay = self.retry_delay(attempt, retry_after_seconds(getattr(result, 'headers', None)))
+            if attempt >= retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                if error is not None:
+                    raise error
+                return result
+            attempt += 1
+            self._count_retry(host)
+            instant('traffic.retry', host=host, attempt=attempt, delay=round(delay, 3))
+            await asyncio.sleep(delay)
+
+    async def call(self, host, send, deadline=None, retries=None, retry_on=RETRY_ERRORS, kind='api'):
+        """Like retry(), with every try holding one of the host's slots"""
+        if deadline is None and self.deadline:
+            deadline = time.monotonic() + self.deadline
+
+        async def attempt():
+            async with await self.slot(host, deadline, kind) as ticket:
+                try:
+                    result = await send()
+                except retry_on as e:
+                    ticket.failed(e)
+                    raise
+                ticket.finished(getattr(result, 'status', None), getattr(result, 'headers', None))
+                return result
+
+        return await self.retry(attempt, host, deadline, retries, retry_on)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            hosts = {}
+            for host, state in self.hosts.items():
+                recent = [t for t in state.completed if t >= now - self.window]
+                span_seconds = min(self.window, now - recent[0]) if len(recent) > 1 else 0.0
+                hosts[host] = {
+                    'queue_depth': state.waiting,
+                    'peak_queue_depth': state.peak_waiting,
+                    'in_flight': state.in_flight,
+                    'concurrency_limit': state.limit,
+                    'request_rate': (len(recent) - 1) / span_seconds if span_seconds else 0.0,
+                    'latency_ms': {kind: latency * 1000 for kind, latency in state.latency.items()},
+                    'requests': state.requests,
+                    'retries': state.retries,
+                    'throttled': state.throttled,
+                    'errors': state.errors,
+                    'paused_for': max(0.0, state.paused_until - now),
+                }
+            return hosts
+
+    def summary(self):
+        """Short description for the status line"""
+        parts = []
+        for host, stats in self.stats().items():
+            part = f"{stats['request_rate']:.1f} req/s, limit {stats['concurrency_limit']:.0f}"
+            if stats['queue_depth']:
+                part += f", {stats['queue_depth']} queued"
+            if stats['throttled']:
+                part += f", {stats['throttled']} throttled"
+            parts.append(part)
+        return "traffic " + "; ".join(parts) if parts else None
+
+# Shared by the fetcher, downloader and crawler so they all back off together
+default_scheduler = TrafficScheduler()
+default_scheduler.configure(BRIGHTSPACE_HOST, rate=20.0, burst=20)
+
+# Fetches against a StandInServer that answers 429 (with Retry-After) once
+# more than `capacity` requests are in flight, and slows down as load grows.
+# Compares a fixed high concurrency without retries to the adaptive scheduler.
+# Usage: python traffic.py [requests] [capacity] [latency_ms]
+if __name__ == "__main__":
+    import sys
+
+    from http_fetcher import BrightspaceFetcher
+    from standin_server import StandInServer
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    server = StandInServer(latency=latency_ms / 1000, capacity=capacity, retry_after=0).start()
+    paths = [f'/d2l/api/le/1.74/{i}/news/' for i in range(count)]
+    for path in paths:
+        server.add_json(path, [{'Id': n, 'Title': f"Announcement {n}"} for n in range(20)])
+
+    async def run(traffic):
+        fetcher = BrightspaceFetcher(server.base_url, max_concurrency=32, traffic=traffic)
+        server.reset_counters()
+        queue_depths = []
+
+        async def sample():
+            while True:
+                queue_depths.append(traffic.stats().get(server.host, {}).get('queue_depth', 0))
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.ensure_future(sample())
+        start = time.perf_counter()
+        try:
+            responses = await fetcher.get_many(paths)
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+            fetcher.close()
+        stats = traffic.stats()[server.host]
+        ok = sum(response.ok for response in responses)
+        return (f"{ok}/{count} ok in {elapsed:.2f}s ({ok / elapsed:.0f} ok/s), {server.throttled_count} throttled by "
+                f"the server, {stats['retries']} retries, final limit {stats['concurrency_limit']:.1f}, "
+                f"peak queue {stats['peak_queue_depth']}, mean queue "
+                f"{sum(queue_depths) / max(1, len(queue_depths)):.1f}")
+
+    async def main():
+        print(f"{count} requests, server capacity {capacity} in flight, {latency_ms:.0f} ms latency")
+        fixed = TrafficScheduler(concurrency=32, max_concurrency=32, adaptive=False, retries=0)
+        print("fixed 32, no retries: ", await run(fixed))
+        fixed = TrafficScheduler(concurrency=32, max_concurrency=32, adaptive=False)
+        print("fixed 32 + retries:   ", await run(fixed))
+        print("adaptive + retries:   ", await run(TrafficScheduler(concurrency=4, max_concurrency=32)))
+
+    try:
+        asyncio.get_event_loop().run_until_complete(main())
+    finally:
+        server.stop()
@@ -0,0 +1,237 @@
+import re
+import sqlite3
+import sys
+import threading
+
+from paths import BACKEND_DIR
+
+# Completion rank of each synced collection; usage adds to this
+COLLECTION_WEIGHTS = {'courses': 3.0, 'content_modules': 2.0, 'grades': 1.5, 'announcements': 1.0}
+
+def normalize(text):
+    """Lower-case words separated by single spaces; punctuation is dropped"""
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+class TrieNode:
+    __slots__ = ('label', 'children', 'top')
+
+    def __init__(self, label=''):
+        self.label = label  # edge label from the parent
+        self.children = {}  # first character of a child's label -> child
+        self.top = []  # best names in this subtree, highest score first
+
+class PrefixIndex:
+    """Compact (radix) trie over names, answering top-k prefix queries.
+
+    Every word start of a name is a key, so "lab" finds "CS 18000 Lab 3".
+    Each node caches the top_k best-scoring names of its subtree, so a query
+    costs one walk down the prefix no matter how many names match. Names can
+    be added or re-scored at any time; scores only ever go up, which keeps
+    the cached top lists exact without a rebuild.
+    """
+
+    def __init__(self, top_k=8):
+        self.top_k = top_k
+        self.root = TrieNode()
+        self.scores = {}
+        self.display = {}  # normalized name -> name as first seen
+        self.node_count = 1
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _rank(self, name):
+        return (-self.scores[name], name)
+
+    def _update_top(self, node, name):
+        top = node.top
+        if name in top:
+            top.remove(name)
+        elif len(top) >= self.top_k and self._rank(name) >= self._rank(top[-1]):
+            return
+        rank = self._rank(name)
+        index = 0
+        while index < len(top) and self._rank(top[index]) < rank:
+            index += 1
+        top.insert(index, name)
+        del top[self.top_k:]
+
+    def _insert_key(self, key, name):
+        node = self.root
+        self._update_top(node, name)
+        i = 0
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None:
+                leaf = TrieNode(key[i:])
+                node.children[key[i]] = leaf
+                self.node_count += 1
+                self._update_top(leaf, name)
+                return
+            label = child.label
+            j = 0
+            while j < len(label) and i + j < len(key) and label[j] == key[i + j]:
+                j += 1
+            if j < len(label):
+                # Split the edge where the key diverges
+                middle = TrieNode(label[:j])
+                middle.top = list(child.top)
+                child.label = label[j:]
+                middle.children[child.label[0]] = child
+                node.children[key[i]] = middle
+                self.node_count += 1
+                child = middle
+            self._update_top(child, name)
+            node = child
+            i += j
+
+    def add(self, name, score=1.0):
+        """Learn a name, or raise its score if it is already known"""
+        key = normalize(name)
+        if not key:
+            return
+        name = self.display.setdefault(key, name)
+        if score <= self.scores.get(name, float('-inf')):
+            return
+        self.scores[name] = score
+        for match in re.finditer(r'\b\w', key):
+            self._insert_key(key[match.start():], name)
+
+    def bump(self, name, amount=1.0):
+        """Rank a name higher, e.g. after the user picked it"""
+        name = self.display.get(normalize(name))
+        if name is not None:
+            self.add(name, self.scores[name] + amount)
+
+    def complete(self, prefix, limit=5):
+        key = normalize(prefix)
+        node = self.root
+        i = 0
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None:
+                return []
+            rest = key[i:i + len(child.label)]
+            if not child.label.startswith(rest):
+                return []
+            node = child
+            i += len(rest)
+        return node.top[:limit]
+
+class NameCompleter:
+    """Keeps a PrefixIndex of course and item titles from the local sync store.
+
+    The first load runs on a background thread so startup never waits for
+    it; refresh() afterwards only reads records synced since the last load.
+    """
+
+    def __init__(self, path=None, top_k=8):
+        self.path = path
+        self.index = PrefixIndex(top_k)
+        self.synced_after = 0.0
+        self.loading = None
+        self._loaded = None
+
+    def store_path(self):
+        if self.path is None:
+            if BACKEND_DIR not in sys.path:
+                sys.path.insert(0, BACKEND_DIR)
+            from sync_store import DEFAULT_DB_PATH
+            self.path = DEFAULT_DB_PATH
+        return self.path
+
+    def read_names(self, since):
+        """[(title, collection, synced_at)] synced after `since`; [] while the store is busy"""
+        try:
+            db = sqlite3.connect(f"file:{self.store_path()}?mode=ro", uri=True, timeout=0.05)
+        except sqlite3.Error:
+            return []  # nothing synced yet
+        try:
+            return db.execute('SELECT title, collection, synced_at FROM records '
+                              'WHERE synced_at > ? AND title IS NOT NULL', (since,)).fetchall()
+        except sqlite3.Error:
+            return []
+        finally:
+            db.close()
+
+    def learn(self, rows, index=None):
+        index = index or self.index
+        synced_after = 0.0
+        for title, collection, synced_at in rows:
+            index.add(title, COLLECTION_WEIGHTS.get(collection, 1.0))
+            synced_after = max(synced_after, synced_at)
+        return synced_after
+
+    def start_loading(self):
+        def load():
+            index = PrefixIndex(self.index.top_k)
+            synced_after = self.learn(self.read_names(0.0), index)
+            self._loaded = (index, synced_after)
+
+        self._loaded = None
+        self.loading = threading.Thread(target=load, name='autocomplete-load', daemon=True)
+        self.loading.start()
+
+    def _swap_in_loaded(self):
+        # The index is only ever touched by the main thread once built
+        if self.loading is None or self._loaded is None:
+            return
+        index, synced_after = self._loaded
+        for name, score in self.index.scores.items():
+            index.add(name, score)  # learned or picked while loading
+        self.index = index
+        self.synced_after = max(self.synced_after, synced_after)
+        self.loading = None
+
+    def refresh(self):
+        """Learn names synced since the last load"""
+        self._swap_in_loaded()
+        if self.loading is not None:
+            return
+        self.synced_after = max(self.synced_after, self.learn(self.read_names(self.synced_after)))
+
+    def complete(self, text, limit=5):
+        self._swap_in_loaded()
+        return self.index.complete(text, limit)
+
+    def bump(self, name):
+        self._swap_in_loaded()
+        self.index.bump(name)
+
+# Benchmark: build time, per-keystroke latency and incremental inserts.
+# Usage: python autocomplete.py [names]
+if __name__ == "__main__":
+    import random
+    import statistics
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    subjects = "CS MA PHYS ECE STAT ENGL CHM BIOL ME AAE".split()
+    kinds = "Lab Homework Quiz Project Exam Lecture Reading Discussion Syllabus Midterm".split()
+    names = [f"{random.choice(subjects)} {random.randint(10000, 59999)} {random.choice(kinds)} {i % 40}"
+             for i in range(count)]
+
+    index = PrefixIndex()
+    start = time.perf_counter()
+    for name in names:
+        index.add(name, random.random() * 3)
+    build = time.perf_counter() - start
+
+    latencies = []
+    for name in random.sample(names, 500):
+        typed = ''
+        for char in name:
+            typed += char
+            start = time.perf_counter()
+            index.complete(typed)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(f"New Item {i}", 5.0)
+    insert = (time.perf_counter() - start) / 1000 * 1e6
+
+    print(f"{len(index)} names, {index.node_count} trie nodes, built in {build * 1000:.0f} ms")
+    print(f"keystroke p50 {statistics.median(latencies):.1f} us, p99 {latencies[int(len(latencies) * 0.99)]:.1f} us")
+    print(f"incremental add {insert:.1f} us per name")
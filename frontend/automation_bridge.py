@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import os
+import queue
+import sys
+import threading
+from urllib.parse import urljoin
+
+from paths import BACKEND_DIR
+
+class JobProgress:
+    """Passed to every job: progress("...") reports status, progress.rows([...]) streams result rows"""
+
+    def __init__(self, bridge, job_id):
+        self.bridge = bridge
+        self.job_id = job_id
+
+    def __call__(self, message):
+        self.bridge._post('progress', self.job_id, message)
+
+    def rows(self, rows):
+        self.bridge._post('rows', self.job_id, list(rows))
+
+class AutomationBridge:
+    """Runs browser automation coroutines on a dedicated asyncio loop thread.
+
+    The pygame loop submits jobs with submit() and drains progress/results
+    with poll() once per frame, so a CDP round trip never blocks a frame.
+    Jobs run one at a time, in submission order, because they share a browser.
+    """
+
+    def __init__(self, notify=None):
+        # notify() is called from the bridge thread whenever an update is queued
+        self.notify = notify
+        self.loop = None
+        self.thread = None
+        self.updates = queue.Queue()
+        self.pending = 0  # submitted jobs not finished yet, updated from both threads
+        self._pending_lock = threading.Lock()
+        self._jobs = None
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run_loop, name="automation-bridge", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._jobs = asyncio.Queue()
+        self.loop.create_task(self._worker())
+        self._ready.set()
+        self.loop.run_forever()
+
+        # stop() was called: cancel whatever is still running, then close the loop
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    async def _worker(self):
+        while True:
+            job_id, name, factory = await self._jobs.get()
+            progress = JobProgress(self, job_id)
+            progress(f"Running {name}...")
+            try:
+                update = ('done', job_id, await factory(progress))
+            except Exception as e:
+                update = ('error', job_id, f"{name} failed: {e}")
+            finally:
+                with self._pending_lock:
+                    self.pending -= 1
+            # Posted after the count drops, so whoever sees the update sees it settled
+            self._post(*update)
+
+    def _post(self, kind, job_id, payload):
+        self.updates.put((kind, job_id, payload))
+        if self.notify is not None:
+            self.notify()
+
+    def submit(self, name, factory):
+        """Queue factory(progress) -> coroutine as a job and return its id"""
+        self.start()
+        job_id = next(self._ids)
+        with self._pending_lock:
+            self.pending += 1
+        self.loop.call_soon_threadsafe(self._jobs.put_nowait, (job_id, name, factory))
+        return job_id
+
+    def poll(self):
+        """Return all (kind, job_id, payload) updates without blocking"""
+        updates = []
+        while True:
+            try:
+                updates.append(self.updates.get_nowait())
+            except queue.Empty:
+                return updates
+
+    def run_sync(self, coro, timeout=None):
+        """Run a coroutine on the bridge loop and wait for it (for shutdown only)"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        self.thread = None
+
+class BrightspaceSession:
+    """Keeps the Chrome connection and Brightspace tab alive between jobs"""
+
+    def __init__(self):
+        self.supervisor = None
+        self.page = None
+        self.fetcher = None
+        self.cache = None
+        self.store = None
+        self.index = None
+        self.policy = None
+        self.profiler = None
+        self.pipeline = None
+        self.downloader = None
+
+    async def ensure_page(self, progress):
+        if self.page is None:
+            if BACKEND_DIR not in sys.path:
+                sys.path.insert(0, BACKEND_DIR)
+            import CatapultTest
+            from page_profiler import PageProfiler
+            self.profiler = PageProfiler.from_env()
+            self.supervisor, self.page = await CatapultTest.open_brightspace(progress, profiler=self.profiler)
+            if self.page is None:
+                raise RuntimeError("Brightspace tab not found")
+        return self.page
+
+    async def open_automation_page(self, progress):
+        """A new tab for automation with heavy assets blocked; the login tab is left alone"""
+        page = await self.ensure_page(progress)
+        from resource_policy import ResourcePolicy
+        if self.policy is None:
+            self.policy = ResourcePolicy()
+        return await self.policy.open_page(page.browser)
+
+    async def crawl(self, urls, progress, concurrency=4, extract=None, on_result=None):
+        """Visit Brightspace URLs on a pool of automation tabs next to the login tab"""
+        page = await self.ensure_page(progress)
+        from resource_policy import ResourcePolicy
+        from tab_crawler import TabCrawler, default_extract
+        if self.policy is None:
+            self.policy = ResourcePolicy()
+        crawler = TabCrawler(page.browser, concurrency=concurrency, policy=self.policy,
+                             extract=extract or default_extract, profiler=self.profiler)
+        done = 0
+
+        def report(result):
+            nonlocal done
+            done += 1
+            progress(f"🕸️ Crawled {done}/{len(urls)}")
+            if on_result is not None:
+                on_result(result)
+
+        try:
+            return await crawler.crawl(urls, report)
+        finally:
+            await crawler.close()
+
+    async def crawl_and_parse(self, urls, progress, concurrency=4):
+        """Crawl pages for their HTML and parse them into records in worker processes.
+
+        Pages go to the ParsePipeline as soon as each tab finishes, so
+        parsing overlaps the crawl and never runs on this event loop.
+        """
+        from parse_pool import ParsePipeline
+        from tab_crawler import html_extract
+        if self.pipeline is None:
+            self.pipeline = ParsePipeline()
+        crawled = asyncio.Queue()
+
+        async def pages():
+            while True:
+                result = await crawled.get()
+                if result is None:
+                    return
+                if result.ok:
+                    yield result.url, result.data
+
+        async def crawl():
+            try:
+                await self.crawl(urls, progress, concurrency, extract=html_extract, on_result=crawled.put_nowait)
+            finally:
+                crawled.put_nowait(None)
+
+        crawling = asyncio.ensure_future(crawl())
+        records = await self.pipeline.parse_all(pages())
+        await crawling
+        return records
+
+    async def ensure_fetcher(self, progress):
+        """Direct HTTP access with the tab's cookies, backed by the on-disk cache"""
+        if self.fetcher is None:
+            page = await self.ensure_page(progress)
+            from http_fetcher import BrightspaceFetcher
+            from response_cache import ResponseCache
+            fetcher = await BrightspaceFetcher.from_page(page)
+            # Partition the cache by the logged-in user before turning it on
+            fetcher.user = str((await fetcher.whoami()).get('Identifier', 'anonymous'))
+            self.cache = fetcher.cache = ResponseCache()
+            self.fetcher = fetcher
+        return self.fetcher
+
+    async def download(self, urls, progress, dest_dir=None):
+        """Stream course files to dest_dir, resuming any left unfinished last time"""
+        fetcher = await self.ensure_fetcher(progress)
+        from downloader import DEFAULT_DOWNLOAD_DIR, Downloader, filename_for
+        if self.downloader is None:
+            self.downloader = Downloader(fetcher)
+        dest_dir = dest_dir or DEFAULT_DOWNLOAD_DIR
+        items = [(urljoin(fetcher.base_url, url), os.path.join(dest_dir, filename_for(url))) for url in urls]
+        results = await self.downloader.download_many(items, progress)
+        failed = [result for result in results if not result.ok]
+        if failed:
+            return f"Downloaded {len(results) - len(failed)}/{len(results)}, failed: {failed[0].error}"
+        return f"Downloaded {len(results)} file{'s' if len(results) != 1 else ''} to {dest_dir}"
+
+    def cache_summary(self):
+        return self.cache.summary() if self.cache is not None else None
+
+    def traffic_summary(self):
+        """Shared scheduler state, only worth showing once Brightspace has pushed back"""
+        if 'traffic' not in sys.modules:
+            return None  # nothing has been fetched yet
+        from traffic import default_scheduler
+        stats = default_scheduler.stats().values()
+        if not any(host['throttled'] or host['retries'] for host in stats):
+            return None
+        return default_scheduler.summary()
+
+    async def sync(self, progress, full=False):
+        """Incrementally sync courses, announcements, content and grades to SQLite"""
+        fetcher = await self.ensure_fetcher(progress)
+        from sync_store import SyncEngine
+        self.ensure_index()
+        stats = await SyncEngine(fetcher, self.store).run(full=full, progress=progress)
+        totals = {outcome: sum(counts[outcome] for counts in stats.counts.values())
+                  for outcome in ('new', 'changed', 'unchanged', 'deleted')}
+        return (f"Synced: {totals['new']} new, {totals['changed']} changed, {totals['unchanged']} unchanged, "
+                f"{totals['deleted']} deleted")
+
+    def ensure_index(self):
+        """Open the local sync database and its full-text index (no browser needed)"""
+        if self.index is None:
+            if BACKEND_DIR not in sys.path:
+                sys.path.insert(0, BACKEND_DIR)
+            from search_index import SearchIndex
+            from sync_store import SyncStore
+            self.store = SyncStore()
+            self.index = SearchIndex(self.store)
+        return self.index
+
+    async def query(self, text, progress):
+        """Stream every match to progress.rows() and return how many there were"""
+        index = self.ensure_index()
+        if not index.search(text, limit=1) or index.is_stale():
+            # Only go through the browser when the index misses or is out of date
+            progress("🔎 Not found locally, syncing from Brightspace...")
+            await self.sync(progress)
+
+        count = 0
+        for batch in index.iter_search(text):
+            progress.rows(result.describe() for result in batch)
+            count += len(batch)
+            await asyncio.sleep(0)  # one batch per loop turn, so the UI sees the first rows early
+        if not count:
+            return f"No results for \"{text}\""
+        return f"{count} result{'s' if count != 1 else ''} for \"{text}\""
+
+    async def close(self):
+        if self.downloader is not None:
+            self.downloader.close()
+            self.downloader = None
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+        if self.profiler is not None:
+            self.profiler.store.close()
+            self.profiler = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+            self.index = None
+        if self.fetcher is not None:
+            self.fetcher.close()
+            self.cache.close()
+            self.fetcher = None
+            self.cache = None
+        if self.supervisor is not None:
+            await self.supervisor.stop()
+            self.supervisor = None
+            self.page = None
@@ -0,0 +1,53 @@
+import importlib
+import importlib.util
+
+class Clipboard:
+    """System clipboard through pyperclip, imported on the first copy or paste.
+
+    Importing pyperclip probes the desktop for a clipboard mechanism, which
+    is wasted startup time in sessions that never copy anything. Without
+    pyperclip, copy and paste are disabled and a one-time install hint is
+    printed; nothing is installed on the user's behalf.
+    """
+
+    def __init__(self, module_name='pyperclip'):
+        self.module_name = module_name
+        self.backend = None
+        self.failed = False
+        self._installed = None
+
+    def is_installed(self):
+        """Whether copy/paste can work, answered without importing the backend"""
+        if self.backend is not None:
+            return True
+        if self.failed:
+            return False
+        if self._installed is None:
+            self._installed = importlib.util.find_spec(self.module_name) is not None
+        return self._installed
+
+    def load(self):
+        if self.backend is None and not self.failed:
+            try:
+                self.backend = importlib.import_module(self.module_name)
+            except ImportError:
+                self.failed = True
+                print(f"{self.module_name} module not found, copy/paste is disabled.")
+                print(f"To enable it, run: pip install {self.module_name}")
+        return self.backend
+
+    def copy(self, text):
+        """Copy text; returns False when no clipboard backend is available"""
+        backend = self.load()
+        if backend is None:
+            return False
+        backend.copy(text)
+        return True
+
+    def paste(self):
+        """Clipboard text, or None when no clipboard backend is available"""
+        backend = self.load()
+        return backend.paste() if backend is not None else None
+
+# Shared by every widget in the window
+clipboard = Clipboard()
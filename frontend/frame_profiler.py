@@ -0,0 +1,129 @@
+import json
+import time
+from array import array
+
+import pygame
+
+from render_cache import fonts
+
+PHASES = ('wait', 'events', 'update', 'draw', 'overlay')
+# Phases that are work done by the frame (wait is idle time in the scheduler)
+WORK_PHASES = ('events', 'update', 'draw')
+PHASE_COLORS = {'events': (80, 160, 255), 'update': (90, 200, 120), 'draw': (255, 128, 0)}
+
+class FrameProfiler:
+    """Ring buffer of per-phase frame timings with an on-screen graph.
+
+    Application.run_frame records one sample per frame while enabled (a
+    single attribute check otherwise). The overlay times itself into its own
+    'overlay' phase so drawing the graph does not inflate 'draw'. It is only
+    repainted every redraw_interval seconds, because pushing its rect to the
+    display every frame would cost more than the frame being measured, and
+    its p50/p99 text is only re-rendered every text_interval seconds.
+    """
+
+    def __init__(self, capacity=600, rect=(10, 10, 270, 104), redraw_interval=0.1, text_interval=0.5):
+        self.capacity = capacity
+        self.rect = pygame.Rect(rect)
+        self.redraw_interval = redraw_interval
+        self.text_interval = text_interval
+        self.enabled = False
+        self.samples = {phase: array('d', bytes(8 * capacity)) for phase in PHASES}
+        self.index = 0
+        self.count = 0
+        self.overlay_time = 0.0
+        self._text_surfaces = []
+        self._text_at = 0.0
+        self._drawn_at = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._text_at = 0.0
+        self._drawn_at = 0.0
+        return self.enabled
+
+    def record(self, wait, events, update, draw):
+        i = self.index
+        self.samples['wait'][i] = wait
+        self.samples['events'][i] = events
+        self.samples['update'][i] = update
+        self.samples['draw'][i] = draw - self.overlay_time
+        self.samples['overlay'][i] = self.overlay_time
+        self.overlay_time = 0.0
+        self.index = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def recent(self, phase, limit=None):
+        """Samples for a phase, oldest first"""
+        limit = min(limit or self.count, self.count)
+        data = self.samples[phase]
+        start = (self.index - limit) % self.capacity
+        if start + limit <= self.capacity:
+            return data[start:start + limit]
+        return data[start:] + data[:self.index]
+
+    def work(self, limit=None):
+        phases = [self.recent(phase, limit) for phase in WORK_PHASES]
+        return [sum(values) for values in zip(*phases)]
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def summary(self):
+        """p50/p99 in milliseconds per phase, plus the total work per frame"""
+        result = {}
+        for name, values in [(phase, self.recent(phase)) for phase in PHASES] + [('work', self.work())]:
+            result[name] = {'p50': self.percentile(values, 0.5) * 1000, 'p99': self.percentile(values, 0.99) * 1000}
+        return result
+
+    def is_due(self):
+        return time.monotonic() - self._drawn_at >= self.redraw_interval
+
+    def draw(self, surface):
+        """Draw the overlay and return the rect it covers"""
+        start = time.perf_counter()
+        self._drawn_at = time.monotonic()
+        rect = self.rect
+        surface.fill((30, 30, 35), rect)
+
+        # Frame-time graph: one pixel per frame, 0-33 ms tall, with a 16.7 ms budget line
+        graph = pygame.Rect(rect.x + 6, rect.y + 46, rect.width - 12, rect.height - 52)
+        scale = graph.height / 0.033
+        budget_y = graph.bottom - int(0.0167 * scale)
+        pygame.draw.line(surface, (120, 60, 60), (graph.left, budget_y), (graph.right, budget_y))
+        width = min(self.count, graph.width)
+        if width > 1:
+            stacked = [0.0] * width
+            for phase in WORK_PHASES:
+                values = self.recent(phase, width)
+                stacked = [total + value for total, value in zip(stacked, values)]
+                points = [(graph.left + x, max(graph.top, graph.bottom - int(value * scale)))
+                          for x, value in enumerate(stacked)]
+                pygame.draw.lines(surface, PHASE_COLORS[phase], False, points)
+
+        now = time.monotonic()
+        if now - self._text_at >= self.text_interval:
+            self._text_at = now
+            font = fonts.get(16)
+            stats = self.summary()
+            lines = [f"work p50 {stats['work']['p50']:.2f} ms  p99 {stats['work']['p99']:.2f} ms",
+                     '  '.join(f"{phase} {stats[phase]['p50']:.1f}/{stats[phase]['p99']:.1f}"
+                               for phase in WORK_PHASES),
+                     f"overlay {stats['overlay']['p50']:.2f} ms  ({self.count} frames, F3 hides)"]
+            self._text_surfaces = [font.render(line, True, (230, 230, 230)) for line in lines]
+        for row, text in enumerate(self._text_surfaces):
+            surface.blit(text, (rect.x + 6, rect.y + 4 + row * 13))
+
+        self.overlay_time = time.perf_counter() - start
+        return rect
+
+    def dump(self, path):
+        """Write every buffered frame (seconds per phase) and the p50/p99 summary"""
+        frames = [dict(zip(PHASES, values)) for values in zip(*(self.recent(phase) for phase in PHASES))]
+        with open(path, 'w') as f:
+            json.dump({'phases': PHASES, 'summary_ms': self.summary(), 'frames': frames}, f, indent=1)
+        return path
@@ -0,0 +1,91 @@
+class GapBuffer:
+    """Character storage with a movable gap at the edit position.
+
+    Inserting or deleting at the gap is amortized O(1) per character; the
+    gap only moves (O(distance)) when the edit position changes. The full
+    string is joined lazily and cached until the next edit, so reading
+    the text once per frame costs one join no matter how many edits
+    happened in between.
+    """
+
+    def __init__(self, text="", gap_size=64):
+        self.gap_size = gap_size
+        self.set(text)
+
+    def __len__(self):
+        return len(self._chars) - (self._gap_end - self._gap_start)
+
+    def __str__(self):
+        if self._string is None:
+            self._string = ''.join(self._chars[:self._gap_start]) + ''.join(self._chars[self._gap_end:])
+        return self._string
+
+    def __getitem__(self, key):
+        """Return a substring for a slice, or a single character for an index"""
+        if self._string is not None:
+            return self._string[key]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return str(self)[key]
+            if stop <= start:
+                return ""
+            gap = self._gap_end - self._gap_start
+            if stop <= self._gap_start:
+                return ''.join(self._chars[start:stop])
+            if start >= self._gap_start:
+                return ''.join(self._chars[start + gap:stop + gap])
+            return ''.join(self._chars[start:self._gap_start]) + ''.join(self._chars[self._gap_end:stop + gap])
+        length = len(self)
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("GapBuffer index out of range")
+        return self._chars[key if key < self._gap_start else key + self._gap_end - self._gap_start]
+
+    def _move_gap(self, index):
+        chars = self._chars
+        if index < self._gap_start:
+            # Shift chars[index:gap_start] to the end of the gap
+            count = self._gap_start - index
+            chars[self._gap_end - count:self._gap_end] = chars[index:self._gap_start]
+            self._gap_start = index
+            self._gap_end -= count
+        elif index > self._gap_start:
+            # Shift chars after the gap down to its start
+            count = index - self._gap_start
+            chars[self._gap_start:self._gap_start + count] = chars[self._gap_end:self._gap_end + count]
+            self._gap_start += count
+            self._gap_end += count
+
+    def _ensure_gap(self, size):
+        gap = self._gap_end - self._gap_start
+        if gap >= size:
+            return
+        # Grow geometrically so repeated inserts stay amortized O(1)
+        grow = max(size - gap, len(self._chars))
+        self._chars[self._gap_end:self._gap_end] = [None] * grow
+        self._gap_end += grow
+
+    def insert(self, index, text):
+        if not text:
+            return
+        self._move_gap(index)
+        self._ensure_gap(len(text))
+        self._chars[self._gap_start:self._gap_start + len(text)] = text
+        self._gap_start += len(text)
+        self._string = None
+
+    def delete(self, start, end):
+        if end <= start:
+            return
+        self._move_gap(start)
+        self._gap_end += end - start
+        self._string = None
+
+    def set(self, text):
+        """Replace the whole contents"""
+        self._chars = list(text) + [None] * self.gap_size
+        self._gap_start = len(text)
+        self._gap_end = len(self._chars)
+        self._string = text
@@ -0,0 +1,5 @@
+import os
+
+# The backend scripts live next to this folder and are imported as plain modules.
+# Kept apart from automation_bridge so importing it does not pull in asyncio.
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+import pygame
+
+class RenderCache:
+    """LRU cache of rendered text surfaces keyed on (font, text, color).
+
+    Rendering text is one of the most expensive things a frame does, and
+    most labels never change, so widgets fetch their surfaces from here
+    instead of calling font.render() every frame.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+# Shared by every widget in the window
+render_cache = RenderCache()
+
+class FontCache:
+    """pygame fonts created on first use and shared by size.
+
+    Loading a font reads and parses the font file, so widgets ask this cache
+    instead of each constructing their own copy of the same face.
+    """
+
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, size, name=None):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(name, size)
+        return font
+
+    def clear(self):
+        self.fonts.clear()
+
+# Shared by every widget in the window
+fonts = FontCache()
@@ -0,0 +1,82 @@
+import math
+import time
+
+import pygame
+
+class FrameScheduler:
+    """Decides how long the main loop sleeps before the next frame.
+
+    While something is animating it paces frames with clock.tick(active_fps).
+    Otherwise it blocks in pygame.event.wait() until input arrives or the
+    next deadline (cursor blink, status expiry, ...) is due, so an idle
+    window costs almost no CPU. Deadlines are time.monotonic() values.
+    """
+
+    def __init__(self, clock, active_fps=60, max_idle_wait=1.0):
+        self.clock = clock
+        self.active_fps = active_fps
+        self.max_idle_wait = max_idle_wait
+        self.idle_frames = 0
+        self.active_frames = 0
+
+    def wait(self, deadline=None, animating=False):
+        """Sleep until the next frame is due and return the pending events"""
+        if animating:
+            self.active_frames += 1
+            self.clock.tick(self.active_fps)
+            return pygame.event.get()
+
+        self.idle_frames += 1
+        timeout = self.max_idle_wait
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+
+        events = []
+        if timeout > 0:
+            # Round up: a 0 ms timeout would make event.wait() block forever
+            event = pygame.event.wait(max(1, math.ceil(timeout * 1000)))
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        # Keep the clock's frame timing meaningful across long sleeps
+        self.clock.tick()
+        return events
+
+# Compares idle CPU usage of the old fixed 60 FPS loop with the scheduler.
+# The offscreen driver really presents frames, so it is more representative than dummy.
+# Usage: python scheduler.py [seconds]
+if __name__ == "__main__":
+    import os
+    import sys
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    from test import Application
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    app = Application()
+    app.text_input.focused = True  # keep the cursor blinking, as when the user is idle in the box
+    app.text_input.target_alpha = app.text_input.border_alpha = 255
+
+    def measure(step):
+        frames = 0
+        wall_start = time.monotonic()
+        cpu_start = time.process_time()
+        while time.monotonic() - wall_start < seconds:
+            step()
+            frames += 1
+        wall = time.monotonic() - wall_start
+        return frames / wall, 100 * (time.process_time() - cpu_start) / wall
+
+    def fixed_step():
+        # The original loop: repaint and flip everything at a fixed 60 FPS
+        app.handle_events()
+        app.update()
+        app.full_redraw = True
+        app.draw()
+        app.clock.tick(60)
+
+    fixed_fps, fixed_cpu = measure(fixed_step)
+    idle_fps, idle_cpu = measure(app.run_frame)
+    print(f"Fixed 60 FPS loop: {fixed_fps:6.1f} frames/s, {fixed_cpu:5.1f}% CPU")
+    print(f"Idle scheduler:    {idle_fps:6.1f} frames/s, {idle_cpu:5.1f}% CPU")
+    pygame.quit()
@@ -1,26 +1,42 @@
-import pygame
-import sys
 import time
+# Taken before the heavy imports so time-to-first-frame covers them
+STARTED_AT = time.perf_counter()
+
+import contextlib
 import os
 import platform
+import sys
 
-# Import pyperclip for clipboard operations
-try:
-    import pyperclip
-    has_pyperclip = True
-except ImportError:
-    print("pyperclip module not found. Installing...")
+@contextlib.contextmanager
+def skipped_import(name):
+    """Make `import name` raise ImportError inside the block, and only there.
+
+    Used around `import pygame`: pygame.pkgdata imports pkg_resources (over
+    100 ms) only to locate pygame's bundled font and icon, and falls back to
+    plain file paths on ImportError. This runs at import time, before any
+    other thread exists, and the module can be imported normally afterwards.
+    Does nothing when the module is already loaded.
+    """
+    if name in sys.modules:
+        yield
+        return
+    sys.modules[name] = None
     try:
-        import subprocess
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyperclip"])
-        import pyperclip
-        has_pyperclip = True
-        print("pyperclip installed successfully!")
-    except Exception as e:
-        print(f"Could not install pyperclip: {e}")
-        print("For copy/paste functionality, please install pyperclip manually:")
-        print("pip install pyperclip")
-        has_pyperclip = False
+        yield
+    finally:
+        if name in sys.modules and sys.modules[name] is None:
+            del sys.modules[name]
+
+with skipped_import('pkg_resources'):
+    import pygame
+
+from clipboard import clipboard
+from frame_profiler import FrameProfiler
+from gap_buffer import GapBuffer
+from render_cache import fonts, render_cache
+from scheduler import FrameScheduler
+from text_layout import PrefixWidthCache
+
 # Theme colors - white, bright gray, and orange
 THEME_WHITE = (255, 255, 255)
 THEME_GRAY = (240, 240, 245)
@@ -29,11 +45,16 @@ THEME_ORANGE_LIGHT = (255, 160, 64)
 THEME_ORANGE_DARK = (220, 110, 0)
 THEME_TEXT = (55, 55, 55)
 
+# Posted by the automation thread to wake the main loop
+BRIDGE_EVENT = pygame.USEREVENT + 1
+
 class TextInput:
     def __init__(self, x, y, width, height, font_size=24, max_length=100):
         self.rect = pygame.Rect(x, y, width, height)
-        self.text = ""
-        self.font = pygame.font.Font(None, font_size)
+        self.font = fonts.get(font_size)
+        self.buffer = GapBuffer()
+        # Cached prefix widths used for hit testing and cursor/selection placement
+        self.layout = PrefixWidthCache(self.font, lambda: self.buffer)
         self.text_color = THEME_TEXT
         self.bg_color = THEME_WHITE
         self.border_color = (200, 200, 200)
@@ -50,30 +71,60 @@ class TextInput:
         # Cursor blinking
         self.cursor_visible = True
         self.cursor_toggle_time = 0.5  # seconds
-        self.last_toggle_time = time.time()
+        self.last_toggle_time = time.monotonic()
         
         # Focus state
         self.focused = False
         
+        # Modifier keys held, as reported by the last key event; mouse events
+        # carry no modifiers, and reading the live keyboard would ignore replayed input
+        self.key_mods = 0
+        
         # Animation for focus
         self.border_alpha = 0
         self.target_alpha = 0
+        self.alpha_speed = 900  # alpha units per second
+        self.last_update_time = time.monotonic()
+        # Longest time one update() advances the fade; the idle scheduler can
+        # sleep for up to a second before the first animated frame
+        self.max_step_time = 1 / 60
+        
+        # Dirty tracking: what the widget looked like when it was last drawn
+        self.edit_count = 0
+        self.drawn_state = None
+        self.cursor_rect = None
+        # The rendered text, kept here rather than in the shared render_cache so
+        # every edit doesn't push a static label out of it
+        self.text_surface = None
+        self.text_surface_edit = None
+    
+    @property
+    def text(self):
+        return str(self.buffer)
+    
+    @text.setter
+    def text(self, value):
+        # Wholesale replacement (e.g. clearing after submit) re-measures everything
+        self.buffer.set(value)
+        self.layout.reset(len(value))
+        self.edit_count += 1
+    
+    def insert_text(self, text):
+        """Insert text at the cursor and move the cursor past it"""
+        self.buffer.insert(self.cursor_pos, text)
+        self.layout.insert(self.cursor_pos, len(text))
+        self.edit_count += 1
+        self.cursor_pos += len(text)
+    
+    def delete_range(self, start, end):
+        """Delete text[start:end]"""
+        self.buffer.delete(start, end)
+        self.layout.delete(start, end)
+        self.edit_count += 1
     
     def get_char_position_from_mouse(self, x):
         """Determine character position based on mouse x coordinate"""
-        if x <= self.rect.x + 10:
-            return 0
-        
-        text_width = self.font.size(self.text)[0]
-        if x >= self.rect.x + 10 + text_width:
-            return len(self.text)
-        
-        x_rel = x - (self.rect.x + 10)
-        for i in range(len(self.text) + 1):
-            if self.font.size(self.text[:i])[0] >= x_rel:
-                return i - 1 if i > 0 else 0
-        
-        return len(self.text)
+        return self.layout.index_at(x - (self.rect.x + 10))
     
     def get_selected_text(self):
         """Get currently selected text"""
@@ -82,7 +133,7 @@ class TextInput:
         
         start = min(self.selection_start, self.cursor_pos)
         end = max(self.selection_start, self.cursor_pos)
-        return self.text[start:end]
+        return self.buffer[start:end]
     
     def delete_selected_text(self):
         """Delete the selected text"""
@@ -92,11 +143,16 @@ class TextInput:
         start = min(self.selection_start, self.cursor_pos)
         end = max(self.selection_start, self.cursor_pos)
         
-        self.text = self.text[:start] + self.text[end:]
+        self.delete_range(start, end)
         self.cursor_pos = start
         self.selection_start = None
     
     def handle_event(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            self.key_mods = event.mod
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            self.key_mods = 0  # the key-up events go to another window
+        
         if event.type == pygame.MOUSEBUTTONDOWN:
             prev_focus = self.focused
             self.focused = self.rect.collidepoint(event.pos)
@@ -109,7 +165,7 @@ class TextInput:
                 self.cursor_pos = self.get_char_position_from_mouse(event.pos[0])
                 
                 # Start selection on mouse down with shift key
-                if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                if self.key_mods & pygame.KMOD_SHIFT:
                     if self.selection_start is None:
                         self.selection_start = self.cursor_pos
                 else:
@@ -122,7 +178,8 @@ class TextInput:
 
         elif event.type == pygame.MOUSEMOTION:
             # Handle text selection with mouse drag
-            if self.selecting and pygame.mouse.get_pressed()[0]:
+            # Use the button state carried by the event so replayed input behaves the same
+            if self.selecting and event.buttons[0]:
                 if self.rect.collidepoint(event.pos):
                     self.cursor_pos = self.get_char_position_from_mouse(event.pos[0])
                     # If this is the first drag event after mouse down, set selection start
@@ -137,8 +194,8 @@ class TextInput:
                     self.selection_start = None  # Cancel selection if no movement
         
         if event.type == pygame.KEYDOWN and self.focused:
-            # Key modifiers
-            mods = pygame.key.get_mods()
+            # Key modifiers at the time of the key press
+            mods = event.mod
             ctrl_pressed = mods & (pygame.KMOD_CTRL | pygame.KMOD_META)  # Ctrl on Windows/Linux, Cmd on Mac
             shift_pressed = mods & pygame.KMOD_SHIFT
             
@@ -146,44 +203,40 @@ class TextInput:
             if ctrl_pressed:
                 if event.key == pygame.K_a:  # Select all
                     self.selection_start = 0
-                    self.cursor_pos = len(self.text)
+                    self.cursor_pos = len(self.buffer)
                     return False
                 elif event.key == pygame.K_c:  # Copy
                     selected_text = self.get_selected_text()
-                    if selected_text and has_pyperclip:
+                    if selected_text:
                         try:
-                            pyperclip.copy(selected_text)
+                            clipboard.copy(selected_text)
                         except Exception as e:
                             print(f"Copy failed: {e}")
                     return False
                 elif event.key == pygame.K_x:  # Cut
                     selected_text = self.get_selected_text()
-                    if selected_text and has_pyperclip:
+                    if selected_text:
                         try:
-                            pyperclip.copy(selected_text)
+                            clipboard.copy(selected_text)  # False without a clipboard; still cut
                             self.delete_selected_text()
                         except Exception as e:
                             print(f"Cut failed: {e}")
-                    elif selected_text:
-                        self.delete_selected_text()  # Still delete even if copy fails
                     return False
                 elif event.key == pygame.K_v:  # Paste
-                    if has_pyperclip:
-                        try:
-                            clipboard_text = pyperclip.paste()
-                            
+                    try:
+                        clipboard_text = clipboard.paste()
+                        if clipboard_text is not None:
                             # Delete selected text first if there's a selection
                             if self.selection_start is not None:
                                 self.delete_selected_text()
                             
                             # Limit pasted text to max length
-                            remaining_space = self.max_length - len(self.text)
+                            remaining_space = self.max_length - len(self.buffer)
                             if remaining_space > 0:
                                 clipboard_text = clipboard_text[:remaining_space]
-                                self.text = self.text[:self.cursor_pos] + clipboard_text + self.text[self.cursor_pos:]
-                                self.cursor_pos += len(clipboard_text)
-                        except Exception as e:
-                            print(f"Paste failed: {e}")
+                                self.insert_text(clipboard_text)
+                    except Exception as e:
+                        print(f"Paste failed: {e}")
                     return False
             
             # Handle normal keys
@@ -191,13 +244,13 @@ class TextInput:
                 if self.selection_start is not None:
                     self.delete_selected_text()
                 elif self.cursor_pos > 0:
-                    self.text = self.text[:self.cursor_pos - 1] + self.text[self.cursor_pos:]
+                    self.delete_range(self.cursor_pos - 1, self.cursor_pos)
                     self.cursor_pos -= 1
             elif event.key == pygame.K_DELETE:
                 if self.selection_start is not None:
                     self.delete_selected_text()
-                elif self.cursor_pos < len(self.text):
-                    self.text = self.text[:self.cursor_pos] + self.text[self.cursor_pos + 1:]
+                elif self.cursor_pos < len(self.buffer):
+                    self.delete_range(self.cursor_pos, self.cursor_pos + 1)
             elif event.key == pygame.K_LEFT:
                 if shift_pressed:
                     # Start selection or extend existing selection
@@ -216,14 +269,14 @@ class TextInput:
                     # Start selection or extend existing selection
                     if self.selection_start is None:
                         self.selection_start = self.cursor_pos
-                    self.cursor_pos = min(len(self.text), self.cursor_pos + 1)
+                    self.cursor_pos = min(len(self.buffer), self.cursor_pos + 1)
                 else:
                     # If there's a selection and we're not extending it, move to end of selection
                     if self.selection_start is not None:
                         self.cursor_pos = max(self.selection_start, self.cursor_pos)
                         self.selection_start = None
                     else:
-                        self.cursor_pos = min(len(self.text), self.cursor_pos + 1)
+                        self.cursor_pos = min(len(self.buffer), self.cursor_pos + 1)
             elif event.key == pygame.K_HOME:
                 if shift_pressed:
                     if self.selection_start is None:
@@ -236,9 +289,9 @@ class TextInput:
                 if shift_pressed:
                     if self.selection_start is None:
                         self.selection_start = self.cursor_pos
-                    self.cursor_pos = len(self.text)
+                    self.cursor_pos = len(self.buffer)
                 else:
-                    self.cursor_pos = len(self.text)
+                    self.cursor_pos = len(self.buffer)
                     self.selection_start = None
             elif event.key == pygame.K_RETURN:
                 # Return can trigger submit if needed
@@ -250,30 +303,59 @@ class TextInput:
                         self.delete_selected_text()
                     
                     # Add character if not at max length
-                    if len(self.text) < self.max_length:
-                        self.text = self.text[:self.cursor_pos] + event.unicode + self.text[self.cursor_pos:]
-                        self.cursor_pos += 1
+                    if len(self.buffer) < self.max_length:
+                        self.insert_text(event.unicode)
             
             # Reset cursor blink timer on any key press
             self.cursor_visible = True
-            self.last_toggle_time = time.time()
+            self.last_toggle_time = time.monotonic()
         
         return False  # No submission
     
     def update(self):
         # Update cursor blinking
-        current_time = time.time()
-        if current_time - self.last_toggle_time > self.cursor_toggle_time:
+        current_time = time.monotonic()
+        if current_time - self.last_toggle_time >= self.cursor_toggle_time:
             self.cursor_visible = not self.cursor_visible
             self.last_toggle_time = current_time
             
-        # Smooth animation for focus border
+        # Smooth animation for focus border, advanced by elapsed time rather than frames
+        step = self.alpha_speed * min(current_time - self.last_update_time, self.max_step_time)
+        self.last_update_time = current_time
         if self.border_alpha < self.target_alpha:
-            self.border_alpha = min(self.border_alpha + 15, self.target_alpha)
+            self.border_alpha = min(self.border_alpha + step, self.target_alpha)
         elif self.border_alpha > self.target_alpha:
-            self.border_alpha = max(self.border_alpha - 15, self.target_alpha)
+            self.border_alpha = max(self.border_alpha - step, self.target_alpha)
+    
+    def next_deadline(self):
+        """Monotonic time of the next cursor blink, or None when not focused"""
+        if not self.focused:
+            return None
+        return self.last_toggle_time + self.cursor_toggle_time
+    
+    def is_animating(self):
+        return self.border_alpha != self.target_alpha
+    
+    def visual_state(self):
+        return (self.edit_count, self.cursor_pos, self.selection_start, self.focused,
+                self.border_alpha, self.focused and self.cursor_visible)
+    
+    def get_bounds(self):
+        """Screen area the widget can paint, including the focus glow"""
+        return self.rect.inflate(6, 6)
+    
+    def get_dirty_rect(self):
+        """Area that changed since the last draw, or None if nothing did"""
+        state = self.visual_state()
+        if state == self.drawn_state:
+            return None
+        if self.drawn_state is not None and self.cursor_rect and state[:-1] == self.drawn_state[:-1]:
+            return self.cursor_rect  # Only the cursor blinked
+        return self.get_bounds()
     
     def draw(self, surface):
+        self.drawn_state = self.visual_state()
+        
         # Draw background with rounded corners
         pygame.draw.rect(surface, self.bg_color, self.rect, border_radius=5)
         
@@ -281,7 +363,7 @@ class TextInput:
         if self.focused:
             # Create a surface for the border with alpha
             border_color = list(self.focused_border_color)
-            border_color.append(self.border_alpha)  # Add alpha value
+            border_color.append(int(self.border_alpha))  # Add alpha value
             border_rect = self.rect.inflate(4, 4)  # Slightly larger rect for glow effect
             pygame.draw.rect(surface, border_color, border_rect, width=2, border_radius=7)
         
@@ -300,9 +382,9 @@ class TextInput:
             end = max(self.selection_start, self.cursor_pos)
             
             # Calculate selection rectangle
-            if start < len(self.text) and start != end:
-                start_x = self.rect.x + text_padding + self.font.size(self.text[:start])[0]
-                width = self.font.size(self.text[start:end])[0]
+            if start < len(self.buffer) and start != end:
+                start_x = self.rect.x + text_padding + self.layout.width_to(start)
+                width = self.layout.width_between(start, end)
                 
                 # Draw selection rectangle
                 select_rect = pygame.Rect(start_x, self.rect.y + 5, width, self.rect.height - 10)
@@ -310,19 +392,22 @@ class TextInput:
         
         # Draw text
         if self.text:
-            text_surface = self.font.render(self.text, True, self.text_color)
+            if self.text_surface_edit != self.edit_count:
+                self.text_surface = self.font.render(self.text, True, self.text_color)
+                self.text_surface_edit = self.edit_count
+            text_surface = self.text_surface
             text_rect = text_surface.get_rect(midleft=(self.rect.x + text_padding, self.rect.centery))
             
             # Make sure text doesn't overflow
             if text_rect.width > self.rect.width - (text_padding * 2):
                 # Calculate offset to show the cursor if it's at the end
-                if self.cursor_pos >= len(self.text) - 5:
+                if self.cursor_pos >= len(self.buffer) - 5:
                     # Show the end of the text with the cursor
                     offset = text_rect.width - (self.rect.width - (text_padding * 2))
                     text_rect.x -= offset
                 else:
                     # Show text centered around cursor position
-                    cursor_width = self.font.size(self.text[:self.cursor_pos])[0]
+                    cursor_width = self.layout.width_to(self.cursor_pos)
                     visible_width = self.rect.width - (text_padding * 2)
                     if cursor_width > visible_width / 2:
                         offset = cursor_width - (visible_width / 2)
@@ -335,14 +420,17 @@ class TextInput:
             surface.set_clip(original_clip)
         
         # Draw cursor when visible and focused
-        if self.focused and self.cursor_visible:
+        self.cursor_rect = None
+        if self.focused:
             if self.text:
-                cursor_x = self.rect.x + text_padding + self.font.size(self.text[:self.cursor_pos])[0]
+                cursor_x = self.rect.x + text_padding + self.layout.width_to(self.cursor_pos)
             else:
                 cursor_x = self.rect.x + text_padding
+            # Remember where the cursor goes so a blink only repaints this strip
+            self.cursor_rect = pygame.Rect(cursor_x - 2, self.rect.y + 4, 5, self.rect.height - 8)
             
             # Check if cursor is visible within the clipping area
-            if cursor_x >= clip_rect.left and cursor_x <= clip_rect.right:
+            if self.cursor_visible and cursor_x >= clip_rect.left and cursor_x <= clip_rect.right:
                 pygame.draw.line(
                     surface,
                     self.text_color,
@@ -375,7 +463,22 @@ class Button:
         self.shadow_alpha = 100
         
         # Font
-        self.font = pygame.font.Font(None, 26)  # Slightly larger font
+        self.font = fonts.get(26)  # Slightly larger font
+        
+        # Dirty tracking
+        self.drawn_state = None
+    
+    def visual_state(self):
+        return (self.text, self.hovered, self.pressed)
+    
+    def get_bounds(self):
+        """Screen area the widget can paint, including the drop shadow"""
+        return self.rect.inflate(2, 2).union(self.rect.move(0, self.shadow_offset + 1))
+    
+    def get_dirty_rect(self):
+        if self.visual_state() == self.drawn_state:
+            return None
+        return self.get_bounds()
     
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
@@ -394,6 +497,8 @@ class Button:
         return False
     
     def draw(self, surface):
+        self.drawn_state = self.visual_state()
+        
         # Determine current color based on state
         if self.pressed and self.hovered:
             color = self.pressed_color
@@ -424,25 +529,284 @@ class Button:
                            border_radius=self.corner_radius)
         
         # Draw text with slight shadow for depth
+        text_surface = render_cache.render(self.font, self.text, self.text_color)
         if self.pressed:
             # Text appears "pressed" by shifting down slightly
-            text_surface = self.font.render(self.text, True, self.text_color)
             text_rect = text_surface.get_rect(center=(self.rect.centerx, self.rect.centery + 1))
         else:
-            text_surface = self.font.render(self.text, True, self.text_color)
             text_rect = text_surface.get_rect(center=self.rect.center)
         
         # Add subtle text shadow for better readability
-        shadow_surface = self.font.render(self.text, True, (0, 0, 0, 128))
+        shadow_surface = render_cache.render(self.font, self.text, (0, 0, 0, 128))
         shadow_rect = shadow_surface.get_rect(center=(text_rect.centerx + 1, text_rect.centery + 1))
         surface.blit(shadow_surface, shadow_rect)
         surface.blit(text_surface, text_rect)
 
+class CompletionDropdown:
+    """Suggestion list shown under a TextInput.
+
+    Keyboard: Up/Down move the highlight, Tab takes the highlighted (or
+    first) suggestion, Enter takes it only when one is highlighted so plain
+    Enter still submits, Escape closes the list.
+    """
+
+    def __init__(self, anchor, row_height=26, max_rows=5, font_size=22):
+        self.anchor = anchor
+        self.row_height = row_height
+        self.max_rows = max_rows
+        self.font = fonts.get(font_size)
+        self.text_color = THEME_TEXT
+        self.bg_color = THEME_WHITE
+        self.border_color = (200, 200, 200)
+        self.highlight_color = (255, 228, 200)
+        self.items = []
+        self.highlighted = None
+        
+        # Dirty tracking
+        self.drawn_state = None
+        self.drawn_rect = None
+    
+    @property
+    def rect(self):
+        return pygame.Rect(self.anchor.x, self.anchor.bottom + 4, self.anchor.width,
+                           self.row_height * len(self.items))
+    
+    def set_items(self, items):
+        items = list(items[:self.max_rows])
+        if items != self.items:
+            self.items = items
+            self.highlighted = None
+    
+    def close(self):
+        self.set_items([])
+    
+    def row_at(self, pos):
+        rect = self.rect
+        if not rect.collidepoint(pos):
+            return None
+        return (pos[1] - rect.y) // self.row_height
+    
+    def visual_state(self):
+        return (tuple(self.items), self.highlighted)
+    
+    def get_bounds(self):
+        return self.rect.inflate(2, 2)
+    
+    def get_dirty_rect(self):
+        if self.visual_state() == self.drawn_state:
+            return None
+        return self.get_bounds()
+    
+    def handle_event(self, event):
+        """Return (handled, accepted item or None); handled events should not reach the input"""
+        if not self.items:
+            return False, None
+        if event.type == pygame.MOUSEMOTION:
+            row = self.row_at(event.pos)
+            self.highlighted = row
+            return row is not None, None
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            row = self.row_at(event.pos)
+            if row is None:
+                return False, None
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                return True, self.items[row]
+            return True, None
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_DOWN:
+                self.highlighted = 0 if self.highlighted is None else min(self.highlighted + 1, len(self.items) - 1)
+                return True, None
+            if event.key == pygame.K_UP:
+                self.highlighted = None if not self.highlighted else self.highlighted - 1
+                return True, None
+            if event.key == pygame.K_TAB:
+                return True, self.items[self.highlighted or 0]
+            if event.key == pygame.K_RETURN and self.highlighted is not None:
+                return True, self.items[self.highlighted]
+            if event.key == pygame.K_ESCAPE:
+                self.close()
+                return True, None
+        return False, None
+    
+    def draw(self, surface):
+        self.drawn_state = self.visual_state()
+        self.drawn_rect = self.rect
+        if not self.items:
+            return
+        
+        rect = self.rect
+        pygame.draw.rect(surface, self.bg_color, rect, border_radius=5)
+        for row, item in enumerate(self.items):
+            row_rect = pygame.Rect(rect.x, rect.y + row * self.row_height, rect.width, self.row_height)
+            if row == self.highlighted:
+                pygame.draw.rect(surface, self.highlight_color, row_rect, border_radius=5)
+            text_surface = render_cache.render(self.font, item, self.text_color)
+            # Long names are clipped to the row
+            area = pygame.Rect(0, 0, rect.width - 20, text_surface.get_height())
+            surface.blit(text_surface, text_surface.get_rect(midleft=(rect.x + 10, row_rect.centery)), area)
+        pygame.draw.rect(surface, self.border_color, rect, 1, border_radius=5)
+
+class ResultsList:
+    """Scrollable list of result rows that only renders the rows on screen.
+
+    Rows are kept as plain strings. Each visible row is drawn into a pooled
+    surface, and surfaces of rows scrolled out of view are reused for the
+    rows scrolled in, so there are never more row surfaces than fit in the
+    view. Rows can be appended while a job is still streaming them; past
+    max_rows they are counted in dropped instead of kept.
+    """
+
+    def __init__(self, x, y, width, height, row_height=22, font_size=20, max_rows=50000):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.row_height = row_height
+        self.font = fonts.get(font_size)
+        self.max_rows = max_rows
+        self.text_color = THEME_TEXT
+        self.bg_color = THEME_WHITE
+        self.stripe_color = (248, 246, 244)
+        self.border_color = (200, 200, 200)
+        self.thumb_color = THEME_ORANGE_LIGHT
+        self.placeholder_color = (170, 170, 170)
+        self.placeholder = "Results appear here"
+        self.scroll_step = 3 * row_height
+        
+        self.rows = []
+        self.dropped = 0
+        self.generation = 0  # bumped by clear() so old row surfaces are never reused as-is
+        self.scroll = 0  # pixels between the top of the first row and the top of the view
+        self.hovered = False
+        self.drag_offset = None  # mouse y within the scrollbar thumb while dragging it
+        
+        # Row surface pool: surfaces of rows on screen, and spares to draw new rows into
+        self.row_surfaces = {}
+        self.spare_surfaces = []
+        
+        # Dirty tracking
+        self.drawn_state = None
+    
+    @property
+    def view(self):
+        """Area the rows are drawn in, left of the scrollbar"""
+        return pygame.Rect(self.rect.x + 3, self.rect.y + 3, self.rect.width - 16, self.rect.height - 6)
+    
+    @property
+    def track(self):
+        return pygame.Rect(self.rect.right - 11, self.rect.y + 3, 8, self.rect.height - 6)
+    
+    def clear(self):
+        self.rows = []
+        self.dropped = 0
+        self.scroll = 0
+        self.generation += 1
+        self.spare_surfaces.extend(self.row_surfaces.values())
+        self.row_surfaces.clear()
+    
+    def append(self, rows):
+        room = self.max_rows - len(self.rows)
+        self.rows.extend(rows[:room])
+        self.dropped += max(0, len(rows) - room)
+    
+    def max_scroll(self):
+        return max(0, len(self.rows) * self.row_height - self.view.height)
+    
+    def scroll_to(self, pixels):
+        self.scroll = int(min(max(pixels, 0), self.max_scroll()))
+    
+    def thumb_rect(self):
+        """The scrollbar thumb, or None when every row fits"""
+        max_scroll = self.max_scroll()
+        if not max_scroll:
+            return None
+        track = self.track
+        height = max(20, track.height * self.view.height // (len(self.rows) * self.row_height))
+        y = track.y + (track.height - height) * self.scroll // max_scroll
+        return pygame.Rect(track.x, y, track.width, height)
+    
+    def handle_event(self, event):
+        """Return True when the event scrolled the list (it should go no further)"""
+        if event.type == pygame.MOUSEMOTION:
+            self.hovered = self.rect.collidepoint(event.pos)
+            if self.drag_offset is not None:
+                track = self.track
+                thumb = self.thumb_rect()
+                if thumb is not None and track.height > thumb.height:
+                    fraction = (event.pos[1] - self.drag_offset - track.y) / (track.height - thumb.height)
+                    self.scroll_to(fraction * self.max_scroll())
+                return True
+        elif event.type == pygame.MOUSEWHEEL and self.hovered:
+            self.scroll_to(self.scroll - event.y * self.scroll_step)
+            return True
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.track.collidepoint(event.pos):
+            thumb = self.thumb_rect()
+            if thumb is not None:
+                if thumb.collidepoint(event.pos):
+                    self.drag_offset = event.pos[1] - thumb.y
+                else:
+                    # Clicking the track pages towards the click
+                    page = self.view.height if event.pos[1] > thumb.y else -self.view.height
+                    self.scroll_to(self.scroll + page)
+            return True
+        elif event.type == pygame.MOUSEBUTTONUP and self.drag_offset is not None:
+            self.drag_offset = None
+            return True
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN) and self.rows:
+            page = self.view.height - self.row_height
+            self.scroll_to(self.scroll + (page if event.key == pygame.K_PAGEDOWN else -page))
+            return True
+        return False
+    
+    def visual_state(self):
+        return (self.generation, len(self.rows), self.scroll)
+    
+    def get_bounds(self):
+        return self.rect
+    
+    def get_dirty_rect(self):
+        if self.visual_state() == self.drawn_state:
+            return None
+        return self.get_bounds()
+    
+    def row_surface(self, index, width):
+        surface = self.row_surfaces.get(index)
+        if surface is None:
+            surface = self.spare_surfaces.pop() if self.spare_surfaces else pygame.Surface((width, self.row_height))
+            surface.fill(self.stripe_color if index % 2 else self.bg_color)
+            text_surface = self.font.render(self.rows[index], True, self.text_color)
+            surface.blit(text_surface, (8, (self.row_height - text_surface.get_height()) // 2))
+            self.row_surfaces[index] = surface
+        return surface
+    
+    def draw(self, surface):
+        self.drawn_state = self.visual_state()
+        pygame.draw.rect(surface, self.bg_color, self.rect, border_radius=5)
+        
+        view = self.view
+        first = self.scroll // self.row_height
+        end = min(len(self.rows), (self.scroll + view.height) // self.row_height + 1)
+        # Rows that scrolled out of view give their surfaces back to the pool
+        for index in [index for index in self.row_surfaces if not first <= index < end]:
+            self.spare_surfaces.append(self.row_surfaces.pop(index))
+        
+        clip = surface.get_clip()
+        surface.set_clip(view)
+        for index in range(first, end):
+            surface.blit(self.row_surface(index, view.width), (view.x, view.y + index * self.row_height - self.scroll))
+        surface.set_clip(clip)
+        
+        if not self.rows:
+            text_surface = render_cache.render(self.font, self.placeholder, self.placeholder_color)
+            surface.blit(text_surface, text_surface.get_rect(center=view.center))
+        
+        thumb = self.thumb_rect()
+        if thumb is not None:
+            pygame.draw.rect(surface, self.thumb_color, thumb, border_radius=4)
+        pygame.draw.rect(surface, self.border_color, self.rect, 1, border_radius=5)
+
 class Application:
     def __init__(self):
-        # Initialize pygame modules
-        # Initialize pygame modules
-        pygame.init()
+        # Only the pygame modules the window uses; pygame.init() would also
+        # open the audio device and joysticks
+        pygame.display.init()
         pygame.font.init()
         # Setup window with title
         self.screen = pygame.display.set_mode((800, 600))
@@ -460,27 +824,71 @@ class Application:
         self.bg_color = THEME_GRAY
         
         # UI components with improved positioning
-        self.text_input = TextInput(200, 260, 400, 40)
-        self.submit_button = Button(340, 320, 120, 40, "Submit")
+        self.text_input = TextInput(200, 110, 400, 40)
+        self.submit_button = Button(340, 170, 120, 40, "Submit")
+        self.results = ResultsList(60, 280, 680, 300)
+        self.results_job = None
+        
+        # Course and item name completion, learned from the local sync store
+        # once the first frame is up (see start_background_work)
+        self.completer = None
+        self.dropdown = CompletionDropdown(self.text_input.rect)
+        self.completed_state = None
         
         # App title
-        self.title_font = pygame.font.Font(None, 36)
+        self.title_font = fonts.get(36)
         self.title_text = "Brightspace Bot"
         
         # Status message
-        self.status_font = pygame.font.Font(None, 20)
+        self.status_font = fonts.get(20)
         self.status_text = "Ready"
         self.status_color = (100, 100, 100)
-        self.status_timer = 0
+        self.status_expires_at = None
+        
+        # Browser automation, created by ensure_bridge() on the first submit
+        self.bridge = None
+        self.session = None
         
-        # Clock for frame rate
+        # Dirty-rect rendering: the whole window is only repainted when needed
+        self.full_redraw = True
+        self.drawn_status = None
+        self.status_rect = None
+        
+        # Clock for frame rate; the scheduler sleeps until input or the next deadline
         self.clock = pygame.time.Clock()
+        self.scheduler = FrameScheduler(self.clock)
         self.running = True
+        
+        # Milliseconds from importing this module to the first frame on screen
+        self.first_frame_ms = None
+        
+        # Frame-time overlay, toggled with F3 (or on from the start with BRIGHTSPACE_FRAME_PROFILE=1)
+        self.profiler = FrameProfiler()
+        self.profiler.enabled = os.environ.get('BRIGHTSPACE_FRAME_PROFILE') == '1'
+        self.profile_path = os.environ.get('BRIGHTSPACE_FRAME_PROFILE_PATH', 'frame_profile.json')
     
-    def handle_events(self):
-        for event in pygame.event.get():
+    def handle_events(self, events=None):
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.full_redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle()
+                self.full_redraw = True  # paint over (or under) the overlay
+                continue
+            
+            # The suggestion list sits on top of the other widgets, so it sees events first
+            handled, choice = self.dropdown.handle_event(event)
+            if choice is not None:
+                self.accept_completion(choice)
+            if handled:
+                continue
+            
+            if self.results.handle_event(event):
+                continue
             
             # Check for text input events
             submission = self.text_input.handle_event(event)
@@ -491,81 +899,243 @@ class Application:
             if self.submit_button.handle_event(event):
                 self.on_submit()
     
+    def accept_completion(self, name):
+        self.text_input.text = name
+        self.text_input.cursor_pos = len(name)
+        self.text_input.selection_start = None
+        self.dropdown.close()
+        self.completed_state = (self.text_input.edit_count, self.text_input.focused)
+    
+    def update_completions(self):
+        """Refresh the suggestions after the input text or focus changed"""
+        state = (self.text_input.edit_count, self.text_input.focused)
+        if state == self.completed_state:
+            return
+        self.completed_state = state
+        text = self.text_input.get_text()
+        items = []
+        if self.completer is not None and self.text_input.focused and text.strip():
+            items = self.completer.complete(text)
+        if len(items) == 1 and items[0] == text:
+            items = []  # Nothing left to complete
+        self.dropdown.set_items(items)
+    
     def on_submit(self):
-        # This is where we'll integrate with browser automation later
         submitted_text = self.text_input.get_text()
         if submitted_text:
             print(f"Submitted: {submitted_text}")
-            # Update status message
-            self.status_text = f"Sent: {submitted_text[:20]}{'...' if len(submitted_text) > 20 else ''}"
-            self.status_color = (50, 120, 50)  # Green for success
-            self.status_timer = 3  # Display for 3 seconds
+            if self.completer is not None:
+                self.completer.bump(submitted_text)
+            # Queue the request for the automation thread; results arrive in update()
+            command = submitted_text.strip().lower()
+            self.ensure_bridge()
+            if command in ("sync", "sync full"):
+                full = command == "sync full"
+                self.bridge.submit("sync", lambda progress: self.session.sync(progress, full=full))
+            elif command.startswith("download "):
+                urls = submitted_text.split()[1:]
+                self.bridge.submit("download", lambda progress: self.session.download(urls, progress))
+            else:
+                # Matches stream into the results list as 'rows' updates
+                self.results.clear()
+                self.results_job = self.bridge.submit(
+                    "query", lambda progress: self.session.query(submitted_text, progress))
+            self.set_status(f"Sent: {submitted_text[:20]}{'...' if len(submitted_text) > 20 else ''}",
+                            (50, 120, 50), 0)
             
-            # Placeholder for future browser integration
-            # For now, just clear the input after submission
+            # Clear the input after submission
             self.text_input.text = ""
             self.text_input.cursor_pos = 0
         else:
             # Show error if empty submission
-            self.status_text = "Error: Cannot submit empty text"
-            self.status_color = (180, 50, 50)  # Red for error
-            self.status_timer = 3  # Display for 3 seconds
+            self.set_status("Error: Cannot submit empty text", (180, 50, 50), 3)
+    
+    def set_status(self, text, color, duration):
+        """Show a status message; a duration of 0 keeps it until replaced"""
+        self.status_text = text
+        self.status_color = color
+        self.status_expires_at = time.monotonic() + duration if duration else None
+    
+    def ensure_bridge(self):
+        if self.bridge is None:
+            # Imported here: asyncio and the backend are not needed to show the window
+            from automation_bridge import AutomationBridge, BrightspaceSession
+            # Browser automation runs on its own asyncio thread; it wakes the
+            # main loop with BRIDGE_EVENT whenever it has something to report
+            self.bridge = AutomationBridge(notify=lambda: pygame.event.post(pygame.event.Event(BRIDGE_EVENT)))
+            self.session = BrightspaceSession()
+        return self.bridge
+    
+    def start_background_work(self):
+        """Startup work that can wait until the window is showing; run() calls it after the first flip"""
+        if self.completer is not None:
+            return
+        from autocomplete import NameCompleter
+        self.completer = NameCompleter()
+        self.completer.start_loading()
+    
+    def handle_bridge_updates(self):
+        if self.bridge is None:
+            return
+        for kind, job_id, payload in self.bridge.poll():
+            if kind == 'progress':
+                self.set_status(str(payload), (100, 100, 100), 0)
+            elif kind == 'rows':
+                if job_id == self.results_job:
+                    self.results.append(payload)
+            elif kind == 'done':
+                if self.completer is not None:
+                    self.completer.refresh()  # pick up names the job just synced
+                summaries = [self.session.cache_summary(), self.session.traffic_summary()]
+                message = " · ".join([str(payload)] + [summary for summary in summaries if summary])
+                if job_id == self.results_job and self.results.dropped:
+                    message += f" (first {len(self.results.rows)} shown)"
+                self.set_status(message, (50, 120, 50), 3)  # Green for success
+            else:
+                self.set_status(str(payload), (180, 50, 50), 3)  # Red for error
     
     def update(self):
         # Update text input
         self.text_input.update()
+        self.update_completions()
+        
+        # Pick up progress and results from the automation thread
+        self.handle_bridge_updates()
         
-        # Update status message timer
-        if self.status_timer > 0:
-            self.status_timer -= 1/60  # 60 FPS
-            if self.status_timer <= 0:
-                self.status_text = "Ready"
-                self.status_color = (100, 100, 100)
+        # Reset the status message once it expires
+        if self.status_expires_at is not None and time.monotonic() >= self.status_expires_at:
+            self.set_status("Ready", (100, 100, 100), 0)
+    
+    def next_deadline(self):
+        """Earliest monotonic time at which something on screen changes by itself"""
+        deadlines = [d for d in (self.text_input.next_deadline(), self.status_expires_at) if d is not None]
+        return min(deadlines) if deadlines else None
+    
+    def is_animating(self):
+        return self.text_input.is_animating()
+    
+    def get_hint_text(self):
+        if clipboard.is_installed():
+            if platform.system() == 'Darwin':  # macOS
+                return "Tip: Use ⌘+V to paste, ⌘+C to copy selected text"
+            return "Tip: Use Ctrl+V to paste, Ctrl+C to copy selected text"
+        return "Tip: Install pyperclip for clipboard support"
+    
+    def draw_status(self):
+        """Draw the status message and return the area it covers"""
+        self.drawn_status = (self.status_text, self.status_color)
+        status_surface = render_cache.render(self.status_font, self.status_text, self.status_color)
+        status_rect = status_surface.get_rect(center=(400, 230))
+        self.screen.blit(status_surface, status_rect)
+        return status_rect
     
     def draw(self):
-        # Clear screen
-        self.screen.fill(self.bg_color)
+        widgets = (self.text_input, self.submit_button, self.results)
         
-        # Draw title
-        title_surface = self.title_font.render(self.title_text, True, THEME_ORANGE)
-        title_rect = title_surface.get_rect(center=(400, 150))
-        self.screen.blit(title_surface, title_rect)
+        # Opening, closing or resizing the suggestion list uncovers other widgets
+        if self.dropdown.rect != self.dropdown.drawn_rect:
+            self.full_redraw = True
         
-        # Draw components
-        self.text_input.draw(self.screen)
-        self.submit_button.draw(self.screen)
+        if self.full_redraw:
+            # Clear screen
+            self.screen.fill(self.bg_color)
+            
+            # Draw title
+            title_surface = render_cache.render(self.title_font, self.title_text, THEME_ORANGE)
+            title_rect = title_surface.get_rect(center=(400, 70))
+            self.screen.blit(title_surface, title_rect)
+            
+            # Draw components
+            for widget in widgets:
+                widget.draw(self.screen)
+            
+            # Draw status message
+            self.status_rect = self.draw_status()
+            
+            # Draw hint text
+            hint_surface = render_cache.render(self.status_font, self.get_hint_text(), (150, 150, 150))
+            hint_rect = hint_surface.get_rect(center=(400, 255))
+            self.screen.blit(hint_surface, hint_rect)
+            
+            self.dropdown.draw(self.screen)
+            
+            if self.profiler.enabled:
+                self.profiler.draw(self.screen)
+            
+            # Update display
+            pygame.display.flip()
+            self.full_redraw = False
+            if self.first_frame_ms is None:
+                self.first_frame_ms = (time.perf_counter() - STARTED_AT) * 1000
+            return
         
-        # Draw status message
-        status_surface = self.status_font.render(self.status_text, True, self.status_color)
-        status_rect = status_surface.get_rect(center=(400, 380))
-        self.screen.blit(status_surface, status_rect)
+        # Repaint only the widgets whose appearance changed
+        dirty_rects = []
+        for widget in widgets:
+            dirty_rect = widget.get_dirty_rect()
+            if dirty_rect:
+                self.screen.fill(self.bg_color, widget.get_bounds())
+                widget.draw(self.screen)
+                dirty_rects.append(dirty_rect)
+        
+        if (self.status_text, self.status_color) != self.drawn_status:
+            self.screen.fill(self.bg_color, self.status_rect)
+            new_rect = self.draw_status()
+            dirty_rects.append(new_rect.union(self.status_rect))
+            self.status_rect = new_rect
+        
+        # Keep the suggestion list on top of whatever was repainted under it
+        bounds = self.dropdown.get_bounds()
+        if self.dropdown.items and (self.dropdown.get_dirty_rect() or bounds.collidelist(dirty_rects) != -1):
+            self.dropdown.draw(self.screen)
+            dirty_rects.append(bounds)
+        
+        if self.profiler.enabled and self.profiler.is_due():
+            dirty_rects.append(self.profiler.draw(self.screen))
         
-        # Draw hint text
-        # Draw hint text
-        if has_pyperclip:
-            hint_text = "Tip: Use Ctrl+V to paste, Ctrl+C to copy selected text"
-            if platform.system() == 'Darwin':  # macOS
-                hint_text = "Tip: Use ⌘+V to paste, ⌘+C to copy selected text"
-        else:
-            hint_text = "Tip: Install pyperclip for clipboard support"
-            
-        # Render the hint text surface
-        hint_surface = self.status_font.render(hint_text, True, (150, 150, 150))
-        hint_rect = hint_surface.get_rect(center=(400, 410))
-        self.screen.blit(hint_surface, hint_rect)
         # Update display
-        pygame.display.flip()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+    
+    def run_frame(self):
+        if not self.profiler.enabled:
+            events = self.scheduler.wait(self.next_deadline(), self.is_animating())
+            self.handle_events(events)
+            self.update()
+            self.draw()
+            return
+        
+        start = time.perf_counter()
+        events = self.scheduler.wait(self.next_deadline(), self.is_animating())
+        waited = time.perf_counter()
+        self.handle_events(events)
+        handled = time.perf_counter()
+        self.update()
+        updated = time.perf_counter()
+        self.draw()
+        drawn = time.perf_counter()
+        self.profiler.record(waited - start, handled - waited, updated - handled, drawn - updated)
     
     def run(self):
         try:
+            # Show the window right away instead of after the scheduler's first wait
+            self.draw()
+            self.start_background_work()
+            if self.profiler.enabled:
+                print(f"First frame after {self.first_frame_ms:.1f} ms")
             while self.running:
-                self.handle_events()
-                self.update()
-                self.draw()
-                self.clock.tick(60)  # 60 FPS
+                self.run_frame()
         except Exception as e:
             print(f"Error: {e}")
         finally:
+            if self.bridge is not None and self.bridge.thread is not None:
+                try:
+                    self.bridge.run_sync(self.session.close(), timeout=5)
+                except Exception as e:
+                    print(f"Error closing browser session: {e}")
+                self.bridge.stop()
+            if self.profiler.count:
+                print(f"Frame profile written to {self.profiler.dump(self.profile_path)}")
             pygame.quit()
             sys.exit()
 
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from automation_bridge import AutomationBridge
+
+def wait_for(bridge, kind, job_id, timeout=5):
+    """Drain updates until (kind, job_id) arrives and return its payload"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for update_kind, update_id, payload in bridge.poll():
+            if (update_kind, update_id) == (kind, job_id):
+                return payload
+        time.sleep(0.01)
+    raise AssertionError(f"no {kind} update for job {job_id}")
+
+def test_jobs_run_in_submission_order():
+    bridge = AutomationBridge()
+    order = []
+
+    def job(name, delay):
+        async def run(progress):
+            await asyncio.sleep(delay)
+            order.append(name)
+            return name
+        return run
+
+    try:
+        bridge.submit("slow", job("slow", 0.05))
+        last = bridge.submit("fast", job("fast", 0))
+        assert wait_for(bridge, 'done', last) == "fast"
+    finally:
+        bridge.stop()
+    assert order == ["slow", "fast"]
+
+def test_failed_job_reports_error_and_bridge_keeps_running():
+    bridge = AutomationBridge()
+
+    async def broken(progress):
+        raise RuntimeError("tab closed")
+
+    async def fine(progress):
+        progress.rows(["row 1", "row 2"])
+        return "ok"
+
+    try:
+        failed = bridge.submit("broken", broken)
+        assert wait_for(bridge, 'error', failed) == "broken failed: tab closed"
+        job_id = bridge.submit("fine", fine)
+        updates = []
+        deadline = time.monotonic() + 5
+        while ('done', job_id, "ok") not in updates and time.monotonic() < deadline:
+            updates.extend(bridge.poll())
+            time.sleep(0.01)
+    finally:
+        bridge.stop()
+    assert ('rows', job_id, ["row 1", "row 2"]) in updates
+    assert ('done', job_id, "ok") in updates
+    assert bridge.pending == 0
+
+def test_notify_runs_on_the_bridge_thread():
+    threads = []
+    bridge = AutomationBridge(notify=lambda: threads.append(threading.current_thread().name))
+
+    async def job(progress):
+        return None
+
+    try:
+        wait_for(bridge, 'done', bridge.submit("job", job))
+    finally:
+        bridge.stop()
+    assert threads and set(threads) == {"automation-bridge"}
+
+def test_pending_settles_while_jobs_finish_during_submission():
+    bridge = AutomationBridge()
+    job_ids = []
+
+    async def job(progress):
+        return None
+
+    try:
+        # The worker finishes jobs on the bridge thread while more are submitted here
+        for _ in range(1000):
+            job_ids.append(bridge.submit("job", job))
+        done = set()
+        deadline = time.monotonic() + 5
+        while len(done) < len(job_ids) and time.monotonic() < deadline:
+            done.update(job_id for kind, job_id, _ in bridge.poll() if kind == 'done')
+            time.sleep(0.01)
+    finally:
+        bridge.stop()
+    assert bridge.pending == 0
+
+def test_slow_job_does_not_block_frames():
+    from test import Application
+
+    async def slow_job(progress):
+        for step in range(5):
+            progress(f"Step {step + 1}/5")
+            await asyncio.sleep(0.2)  # stands in for a CDP round trip
+        time.sleep(0.2)  # blocking work only stalls the bridge thread
+        return "Slow job finished"
+
+    app = Application()
+    assert app.bridge is None  # created on first use, not at startup
+    app.ensure_bridge().submit("slow job", slow_job)
+    frame_times = []
+    deadline = time.perf_counter() + 2
+    try:
+        while time.perf_counter() < deadline:
+            frame_start = time.perf_counter()
+            app.handle_events()
+            app.update()
+            app.draw()
+            frame_times.append((time.perf_counter() - frame_start) * 1000)
+            app.clock.tick(60)
+    finally:
+        app.bridge.stop()
+    assert max(frame_times) < 16
+    assert app.status_text.startswith("Slow job finished")
@@ -0,0 +1,107 @@
+import bisect
+
+class PrefixWidthCache:
+    """Memoized pixel widths of every prefix of a single line of text.
+
+    widths[i] is font.size(text[:i])[0], measured the first time it is
+    needed. An edit at position p leaves every prefix shorter than p intact,
+    so only widths from p onwards are thrown away. The cache also behaves as
+    a read-only sequence, which lets hit testing bisect straight over it.
+
+    pygame positions glyphs with sub-pixel hinting, so summing per-glyph
+    advances drifts by several pixels over a long line; measuring real
+    prefixes keeps the cursor exactly where the text is rendered.
+    """
+
+    def __init__(self, font, get_text):
+        self.font = font
+        self.get_text = get_text
+        self.widths = [0]
+
+    def __len__(self):
+        return len(self.widths)
+
+    def __getitem__(self, index):
+        return self.width_to(index)
+
+    def reset(self, length):
+        self.widths = [0] + [None] * length
+
+    def insert(self, index, length):
+        self._invalidate(index, len(self.widths) - 1 + length)
+
+    def delete(self, start, end):
+        self._invalidate(start, len(self.widths) - 1 - (end - start))
+
+    def _invalidate(self, index, new_length):
+        # Prefixes up to and including index are unchanged by the edit
+        del self.widths[index + 1:]
+        self.widths.extend([None] * (new_length - index))
+
+    def width_to(self, index):
+        """Width in pixels of text[:index]"""
+        index = max(0, min(index, len(self.widths) - 1))
+        width = self.widths[index]
+        if width is None:
+            width = self.font.size(self.get_text()[:index])[0]
+            self.widths[index] = width
+        return width
+
+    def width_between(self, start, end):
+        return self.width_to(end) - self.width_to(start)
+
+    def total_width(self):
+        return self.width_to(len(self.widths) - 1)
+
+    def index_at(self, x):
+        """Character index for an x offset, matching TextInput's hit testing"""
+        if x <= 0:
+            return 0
+        length = len(self.widths) - 1
+        if x >= self.total_width():
+            return length
+        i = bisect.bisect_left(self, x, 0, length + 1)
+        return i - 1 if i > 0 else 0
+
+# Microbenchmark: linear font.size scan vs. bisect over the prefix cache.
+# Usage: SDL_VIDEODRIVER=dummy python text_layout.py
+if __name__ == "__main__":
+    import os
+    import random
+    import string
+    import timeit
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+
+    pygame.init()
+    font = pygame.font.Font(None, 24)
+
+    def linear_hit(text, x_rel):
+        for i in range(len(text) + 1):
+            if font.size(text[:i])[0] >= x_rel:
+                return i - 1 if i > 0 else 0
+        return len(text)
+
+    for length in (100, 1000, 5000):
+        text = ''.join(random.choice(string.ascii_letters + ' ') for _ in range(length))
+        cache = PrefixWidthCache(font, lambda: text)
+        cache.reset(length)
+        xs = [random.uniform(1, cache.total_width() - 1) for _ in range(20)]
+        mismatches = sum(linear_hit(text, x) != cache.index_at(x) for x in xs)
+
+        # A drag-select: many hits against the same text
+        cache.reset(length)
+        linear = timeit.timeit(lambda: [linear_hit(text, x) for x in xs], number=1) / len(xs)
+        cached = timeit.timeit(lambda: [cache.index_at(x) for x in xs], number=1) / len(xs)
+
+        # Typing in the middle, then re-measuring what draw() needs
+        def edit():
+            cache.insert(length // 2, 1)
+            cache.delete(length // 2, length // 2 + 1)
+            cache.width_to(length // 2 - 5)
+            cache.width_to(length // 2)
+        edit_time = timeit.timeit(edit, number=50) / 50
+        print(f"{length:>5} chars: linear {linear * 1000:9.3f} ms/hit, bisect {cached * 1000:7.3f} ms/hit, "
+              f"mid-text edit + re-measure {edit_time * 1e6:7.1f} us, mismatches {mismatches}/{len(xs)}")
+    pygame.quit()
@@ -0,0 +1,341 @@
+"""Headless benchmark for the frontend hot paths.
+
+Runs Application under SDL's dummy video driver, replays synthetic or
+recorded event streams frame by frame and reports per-frame and per-phase
+p50/p99 times, events/second and allocations as JSON.
+
+Usage:
+    python ui_benchmark.py [--out results.json] [--replay recording.json]
+    python ui_benchmark.py --record recording.json     # record a live session
+    python ui_benchmark.py --compare old.json new.json
+    python ui_benchmark.py --only typing --startup-runs 20   # time to first frame
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+import test as app_module
+from test import Application
+
+PHASES = ('handle_events', 'update', 'draw')
+
+class MemoryClipboard:
+    """In-process clipboard so paste scenarios don't depend on the desktop"""
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def copy(self, text):
+        self.text = text
+
+    def paste(self):
+        return self.text
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def key_event(key, unicode="", mod=0):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=mod, scancode=0)
+
+def motion_event(pos, buttons=(0, 0, 0)):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=buttons)
+
+def wheel_event(y):
+    return pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=y, flipped=False, precise_x=0.0, precise_y=float(y))
+
+def button_event(event_type, pos):
+    return pygame.event.Event(event_type, pos=pos, button=1)
+
+def focus_frames(app):
+    point = app.text_input.rect.center
+    return [[button_event(pygame.MOUSEBUTTONDOWN, point), button_event(pygame.MOUSEBUTTONUP, point)]]
+
+# Synthetic scenarios: each returns a list of frames, each frame a list of events
+def typing_scenario(app, chars=600):
+    text = "the quick brown fox jumps over the lazy dog "
+    frames = focus_frames(app)
+    for i in range(chars):
+        frames.append([key_event(0, text[i % len(text)])])
+        if i % 40 == 39:
+            frames.append([key_event(pygame.K_BACKSPACE)] * 5)
+    return frames
+
+def drag_select_scenario(app, sweeps=20):
+    rect = app.text_input.rect
+    app.text_input.text = "drag select over a long line of text " * 50
+    frames = []
+    for _ in range(sweeps):
+        frames.append([button_event(pygame.MOUSEBUTTONDOWN, (rect.x + 12, rect.centery))])
+        for x in range(rect.x + 12, rect.right - 5, 4):
+            frames.append([motion_event((x, rect.centery), buttons=(1, 0, 0))])
+        frames.append([button_event(pygame.MOUSEBUTTONUP, (rect.right - 6, rect.centery))])
+    return frames
+
+def paste_burst_scenario(app, pastes=60):
+    app_module.clipboard.backend = MemoryClipboard("pasted assignment prompt text " * 20)
+    frames = focus_frames(app)
+    for i in range(pastes):
+        frames.append([key_event(pygame.K_v, "v", pygame.KMOD_CTRL)] * 3)
+        if i % 10 == 9:
+            frames.append([key_event(pygame.K_a, "a", pygame.KMOD_CTRL), key_event(pygame.K_DELETE)])
+    return frames
+
+def hover_storm_scenario(app, frames_count=300, events_per_frame=20):
+    rect = app.submit_button.rect
+    frames = []
+    for i in range(frames_count):
+        frame = []
+        for j in range(events_per_frame):
+            inside = (i + j) % 2 == 0
+            frame.append(motion_event(rect.center if inside else (rect.x - 30, rect.y - 30)))
+        frames.append(frame)
+    return frames
+
+def results_scroll_scenario(app, rows=20000, batches=50):
+    rect = app.results.rect
+    app.results.clear()
+    frames = [[motion_event(rect.center)]]
+    # Rows stream in while the user scrolls, as they do from a running query
+    for i in range(batches):
+        app.results.append([f"Assignment {i * (rows // batches) + j}: problem set, due Friday 11:59pm"
+                            for j in range(rows // batches)])
+    for i in range(400):
+        frames.append([wheel_event(-1 if i < 300 else 3)])
+    thumb = app.results.thumb_rect()
+    frames.append([button_event(pygame.MOUSEBUTTONDOWN, thumb.center)])
+    for y in range(thumb.centery, rect.bottom, 2):
+        frames.append([motion_event((thumb.centerx, y), buttons=(1, 0, 0))])
+    frames.append([button_event(pygame.MOUSEBUTTONUP, (thumb.centerx, rect.bottom))])
+    return frames
+
+SCENARIOS = {
+    'typing': typing_scenario,
+    'drag_select': drag_select_scenario,
+    'paste_burst': paste_burst_scenario,
+    'hover_storm': hover_storm_scenario,
+    'list_scroll': results_scroll_scenario,
+}
+
+def make_app(max_length=100000):
+    app = Application()
+    # Long inputs are what makes the hot paths interesting
+    app.text_input.max_length = max_length
+    app.draw()
+    return app
+
+def run_frames(app, frames, track_allocations=False):
+    """Replay frames and return per-frame timings (ms) and allocation sizes (bytes)"""
+    timings = {phase: [] for phase in PHASES}
+    totals = []
+    allocations = []
+    if track_allocations:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    for events in frames:
+        if track_allocations:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        app.handle_events(events)
+        t1 = time.perf_counter()
+        app.update()
+        t2 = time.perf_counter()
+        app.draw()
+        t3 = time.perf_counter()
+        if track_allocations:
+            allocations.append(tracemalloc.get_traced_memory()[1] - base)
+        timings['handle_events'].append((t1 - t0) * 1000)
+        timings['update'].append((t2 - t1) * 1000)
+        timings['draw'].append((t3 - t2) * 1000)
+        totals.append((t3 - t0) * 1000)
+    wall = time.perf_counter() - wall_start
+    if track_allocations:
+        tracemalloc.stop()
+    return timings, totals, allocations, wall
+
+def benchmark(name, build_frames):
+    # Timing and allocation tracking are separate passes: tracemalloc distorts timings
+    app = make_app()
+    frames = build_frames(app)
+    timings, totals, _, wall = run_frames(app, frames)
+
+    app = make_app()
+    frames = build_frames(app)
+    _, _, allocations, _ = run_frames(app, frames, track_allocations=True)
+
+    event_count = sum(len(frame) for frame in frames)
+    result = {
+        'frames': len(frames),
+        'events': event_count,
+        'events_per_sec': event_count / wall if wall else 0.0,
+        'frame_p50_ms': percentile(totals, 50),
+        'frame_p99_ms': percentile(totals, 99),
+        'frame_max_ms': max(totals) if totals else 0.0,
+        'alloc_p50_bytes': percentile(allocations, 50),
+        'alloc_p99_bytes': percentile(allocations, 99),
+    }
+    for phase in PHASES:
+        result[f'{phase}_p50_ms'] = percentile(timings[phase], 50)
+        result[f'{phase}_p99_ms'] = percentile(timings[phase], 99)
+    print(f"{name:>12}: {result['frames']:5d} frames, p50 {result['frame_p50_ms']:7.3f} ms, "
+          f"p99 {result['frame_p99_ms']:7.3f} ms, {result['events_per_sec']:10.0f} events/s, "
+          f"alloc p99 {result['alloc_p99_bytes'] / 1024:8.1f} KiB")
+    return result
+
+# Run in a fresh interpreter per measurement: startup cost is mostly imports
+STARTUP_SCRIPT = """
+import test
+app = test.Application()
+app.draw()
+print(app.first_frame_ms, flush=True)
+app.start_background_work()
+app.completer.loading.join()
+"""
+
+def startup_benchmark(runs=5):
+    """Time to first frame: from importing test.py, and from spawning the process"""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    first_frame = []
+    from_spawn = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', STARTUP_SCRIPT], env=env, stdout=subprocess.PIPE,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), text=True)
+        line = process.stdout.readline()
+        from_spawn.append((time.perf_counter() - start) * 1000)
+        process.wait()
+        first_frame.append(float(line))
+    result = {
+        'runs': runs,
+        'first_frame_p50_ms': percentile(first_frame, 50),
+        'first_frame_max_ms': max(first_frame),
+        'from_spawn_p50_ms': percentile(from_spawn, 50),
+    }
+    print(f"{'startup':>12}: first frame p50 {result['first_frame_p50_ms']:7.1f} ms after import, "
+          f"{result['from_spawn_p50_ms']:7.1f} ms after spawn ({runs} runs)")
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def serialize_event(event):
+    attrs = {}
+    for key, value in event.dict.items():
+        if isinstance(value, (int, float, str, bool)) or value is None:
+            attrs[key] = value
+        elif isinstance(value, (tuple, list)):
+            attrs[key] = list(value)
+    return {'type': event.type, 'attrs': attrs}
+
+def deserialize_event(data):
+    attrs = {key: tuple(value) if isinstance(value, list) else value
+             for key, value in data['attrs'].items()}
+    return pygame.event.Event(data['type'], **attrs)
+
+def load_recording(path):
+    with open(path) as f:
+        recorded = json.load(f)
+    return lambda app: [[deserialize_event(e) for e in frame] for frame in recorded['frames']]
+
+def record(path):
+    """Run the interactive app and save every frame's events for later replay"""
+    os.environ.pop('SDL_VIDEODRIVER', None)
+    app = Application()
+    frames = []
+    handle_events = app.handle_events
+
+    def recording_handle_events(events=None):
+        if events is None:
+            events = pygame.event.get()
+        frames.append([serialize_event(e) for e in events if e.type != pygame.QUIT])
+        handle_events(events)
+    app.handle_events = recording_handle_events
+
+    try:
+        while app.running:
+            app.run_frame()
+    finally:
+        with open(path, 'w') as f:
+            json.dump({'frames': [frame for frame in frames if frame]}, f)
+        print(f"Recorded {len(frames)} frames to {path}")
+        pygame.quit()
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    if 'startup' in old and 'startup' in new:
+        before, after = old['startup']['first_frame_p50_ms'], new['startup']['first_frame_p50_ms']
+        change = (after - before) / before * 100 if before else 0.0
+        flag = "  ⚠️ regression" if change > 10 else ""
+        print(f"{'startup':>12} {'first_frame_p50_ms':>16}: {before:10.3f} -> {after:10.3f} ({change:+6.1f}%){flag}")
+    for name, new_result in new['scenarios'].items():
+        old_result = old['scenarios'].get(name)
+        if not old_result:
+            continue
+        for metric in ('frame_p50_ms', 'frame_p99_ms', 'alloc_p99_bytes'):
+            before, after = old_result[metric], new_result[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            flag = "  ⚠️ regression" if change > 10 else ""
+            print(f"{name:>12} {metric:>16}: {before:10.3f} -> {after:10.3f} ({change:+6.1f}%){flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frontend benchmark")
+    parser.add_argument('--out', default='bench_output.json', help="where to write the JSON results")
+    parser.add_argument('--replay', action='append', default=[], help="recorded event file to replay")
+    parser.add_argument('--only', action='append', default=[], help="run only these scenarios")
+    parser.add_argument('--record', help="record a live session to this file instead of benchmarking")
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help="fresh processes to time to first frame (0 skips)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.record:
+        record(args.record)
+        return
+
+    scenarios = {name: build for name, build in SCENARIOS.items() if not args.only or name in args.only}
+    for path in args.replay:
+        scenarios[os.path.basename(path)] = load_recording(path)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'scenarios': {},
+    }
+    if args.startup_runs:
+        results['startup'] = startup_benchmark(args.startup_runs)
+    for name, build in scenarios.items():
+        results['scenarios'][name] = benchmark(name, build)
+    pygame.quit()
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()